@@ -0,0 +1,105 @@
+import json
+import time
+
+from metrics import register_metrics_source
+
+
+PROTOCOL_JSON = "json"
+PROTOCOL_MSGPACK = "msgpack"
+
+# Short keys for the msgpack frames; the viewer expands them back before handling a message.
+COMPACT_KEYS = {
+    "type": "t",
+    "intent": "i",
+    "slide": "s",
+    "bbox": "b",
+    "section": "c",
+    "title": "h",
+    "imageInd": "x",
+    "content": "n",
+    "targetType": "y",
+    "preview": "p",
+    "seq": "q",
+    "phase": "f",
+    "epoch": "e",
+}
+EXPANDED_KEYS = {short: key for key, short in COMPACT_KEYS.items()}
+
+protocol_counters = {
+    PROTOCOL_JSON: {"frames": 0, "messages": 0, "bytes": 0, "encode_ms": 0.0},
+    PROTOCOL_MSGPACK: {"frames": 0, "messages": 0, "bytes": 0, "encode_ms": 0.0},
+}
+
+
+def _get_ormsgpack():
+    try:
+        import ormsgpack
+    except ImportError:
+        return None
+    return ormsgpack
+
+
+def negotiate_protocol(requested: str | None) -> str:
+    """The viewer opts in with ?protocol=msgpack; anything else, or a missing codec, keeps JSON."""
+    if (requested or "").strip().lower() == PROTOCOL_MSGPACK and _get_ormsgpack() is not None:
+        return PROTOCOL_MSGPACK
+    return PROTOCOL_JSON
+
+
+def compact_payload(payload: dict) -> dict:
+    # Empty fields and the default preview=False are left out; the viewer treats missing keys the same way.
+    compacted = {}
+    for key, value in payload.items():
+        if value is None or (key == "preview" and value is False):
+            continue
+        compacted[COMPACT_KEYS.get(key, key)] = value
+    return compacted
+
+
+def expand_payload(payload: dict) -> dict:
+    return {EXPANDED_KEYS.get(key, key): value for key, value in payload.items()}
+
+
+def encode_json(payload: dict) -> str:
+    started_at = time.perf_counter()
+    # Same encoding as Starlette's send_json, so the JSON path is byte-for-byte what it was.
+    text = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    _record(PROTOCOL_JSON, 1, len(text.encode("utf-8")), started_at)
+    return text
+
+
+def encode_msgpack_frame(payloads: list[dict]) -> bytes:
+    """One binary frame carrying every payload as an array of compact maps."""
+    started_at = time.perf_counter()
+    frame = _get_ormsgpack().packb([compact_payload(payload) for payload in payloads])
+    _record(PROTOCOL_MSGPACK, len(payloads), len(frame), started_at)
+    return frame
+
+
+def decode_msgpack_frame(frame: bytes) -> list[dict]:
+    return [expand_payload(payload) for payload in _get_ormsgpack().unpackb(frame)]
+
+
+def _record(protocol: str, messages: int, size: int, started_at: float):
+    counters = protocol_counters[protocol]
+    counters["frames"] += 1
+    counters["messages"] += messages
+    counters["bytes"] += size
+    counters["encode_ms"] += (time.perf_counter() - started_at) * 1000
+
+
+def _protocol_metrics() -> dict:
+    snapshot = {}
+    for protocol, counters in protocol_counters.items():
+        messages = counters["messages"]
+        snapshot[protocol] = {
+            "frames": counters["frames"],
+            "messages": messages,
+            "bytes": counters["bytes"],
+            "bytes_per_message": round(counters["bytes"] / messages, 1) if messages else None,
+            "encode_us_per_message": round(counters["encode_ms"] * 1000 / messages, 2) if messages else None,
+        }
+    return snapshot
+
+
+register_metrics_source("viewer_protocol", _protocol_metrics)
@@ -0,0 +1,334 @@
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from metrics import register_metrics_source
+
+
+STT_TARGET_SAMPLE_RATE = int(os.getenv("STT_TARGET_SAMPLE_RATE", "16000"))
+# The frontend's ScriptProcessor sends 48 kHz unless the client says otherwise with ?sample_rate=.
+STT_DEFAULT_CLIENT_SAMPLE_RATE = int(os.getenv("STT_DEFAULT_CLIENT_SAMPLE_RATE", "48000"))
+STT_FRAME_MS = int(os.getenv("STT_FRAME_MS", "100"))
+SUPPORTED_CLIENT_SAMPLE_RATES = {8000, 16000, 22050, 24000, 32000, 44100, 48000}
+RESAMPLER_TAPS = 63
+
+STT_VAD_ENABLED = os.getenv("STT_VAD_ENABLED", "true").lower() == "true"
+# A window is speech above max(STT_VAD_THRESHOLD_DB, noise floor + STT_VAD_NOISE_MARGIN_DB), in dBFS.
+STT_VAD_THRESHOLD_DB = float(os.getenv("STT_VAD_THRESHOLD_DB", "-50"))
+STT_VAD_NOISE_MARGIN_DB = float(os.getenv("STT_VAD_NOISE_MARGIN_DB", "12"))
+# Zero-crossing rate bounds: below the minimum is hum, above the fricative rate quieter windows still count.
+STT_VAD_ZCR_MIN = float(os.getenv("STT_VAD_ZCR_MIN", "0.01"))
+STT_VAD_FRICATIVE_ZCR = float(os.getenv("STT_VAD_FRICATIVE_ZCR", "0.3"))
+STT_VAD_FRICATIVE_MARGIN_DB = float(os.getenv("STT_VAD_FRICATIVE_MARGIN_DB", "6"))
+STT_VAD_WINDOW_MS = int(os.getenv("STT_VAD_WINDOW_MS", "20"))
+STT_VAD_MIN_SPEECH_WINDOWS = int(os.getenv("STT_VAD_MIN_SPEECH_WINDOWS", "2"))
+# The hangover keeps up to STT_VAD_HANGOVER_MS after speech for quiet word endings, but once a frame is back
+# within STT_VAD_QUIET_MARGIN_DB of the noise floor only STT_VAD_QUIET_HANGOVER_MS more is forwarded.
+STT_VAD_HANGOVER_MS = int(os.getenv("STT_VAD_HANGOVER_MS", "600"))
+STT_VAD_QUIET_HANGOVER_MS = int(os.getenv("STT_VAD_QUIET_HANGOVER_MS", "100"))
+STT_VAD_QUIET_MARGIN_DB = float(os.getenv("STT_VAD_QUIET_MARGIN_DB", "4"))
+STT_VAD_PREROLL_MS = int(os.getenv("STT_VAD_PREROLL_MS", "200"))
+# One silent frame is still forwarded this often, so the recognizer stream does not time out.
+STT_VAD_KEEPALIVE_MS = int(os.getenv("STT_VAD_KEEPALIVE_MS", "4000"))
+
+audio_totals = {
+    "streams": 0,
+    "messages_in": 0,
+    "bytes_in": 0,
+    "requests_out": 0,
+    "bytes_out": 0,
+    "frames_suppressed": 0,
+    "bytes_suppressed": 0,
+    "audio_seconds": 0.0,
+    "process_ms": 0.0,
+}
+
+
+def _lowpass_taps(source_rate: int, target_rate: int, taps: int = RESAMPLER_TAPS) -> np.ndarray:
+    # Windowed-sinc low-pass just under the lower Nyquist frequency, so decimation does not alias.
+    cutoff = 0.45 * min(source_rate, target_rate) / source_rate
+    positions = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * positions) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class StreamingResampler:
+    """Vectorized FIR low-pass plus decimation or linear interpolation, carrying filter state across chunks."""
+
+    def __init__(self, source_rate: int, target_rate: int):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.passthrough = source_rate == target_rate
+        self.taps = _lowpass_taps(source_rate, target_rate)
+        self.history = np.zeros(len(self.taps) - 1, dtype=np.float32)
+        self.integer_factor = source_rate // target_rate if source_rate % target_rate == 0 else 0
+        self.step = source_rate / target_rate
+        # Position of the next output sample, relative to the start of the next filtered chunk.
+        self.position = 0.0
+        self.last_filtered = np.float32(0.0)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.passthrough or not len(samples):
+            return samples
+
+        buffered = np.concatenate((self.history, samples.astype(np.float32)))
+        self.history = buffered[-(len(self.taps) - 1):]
+        filtered = np.convolve(buffered, self.taps, mode="valid")
+
+        if self.integer_factor:
+            start = int(self.position)
+            output = filtered[start :: self.integer_factor]
+            self.position = start + len(output) * self.integer_factor - len(filtered)
+            return output
+
+        # Fractional ratios (44.1 kHz and friends): interpolate between filtered samples, with the last
+        # sample of the previous chunk at index -1.
+        positions = np.arange(self.position, len(filtered) - 1 + 1e-9, self.step)
+        if not len(positions):
+            self.position -= len(filtered)
+            self.last_filtered = filtered[-1]
+            return np.empty(0, dtype=np.float32)
+        output = np.interp(positions, np.arange(-1, len(filtered)), np.concatenate(([self.last_filtered], filtered)))
+        self.position = positions[-1] + self.step - len(filtered)
+        self.last_filtered = filtered[-1]
+        return output.astype(np.float32)
+
+
+class FrameCoalescer:
+    """Regroups arbitrarily sized PCM chunks into fixed frame_ms requests."""
+
+    def __init__(self, sample_rate: int, frame_ms: int):
+        self.frame_bytes = max(2, int(sample_rate * frame_ms / 1000) * 2)
+        self.buffer = bytearray()
+
+    def push(self, pcm: bytes) -> list[bytes]:
+        self.buffer.extend(pcm)
+        frames = []
+        while len(self.buffer) >= self.frame_bytes:
+            frames.append(bytes(self.buffer[: self.frame_bytes]))
+            del self.buffer[: self.frame_bytes]
+        return frames
+
+    def flush(self) -> list[bytes]:
+        if not self.buffer:
+            return []
+        frame = bytes(self.buffer)
+        self.buffer.clear()
+        return [frame]
+
+
+class VoiceActivityGate:
+    """
+    Energy and zero-crossing voice activity gate over coalesced frames.
+
+    Each frame is split into STT_VAD_WINDOW_MS windows scored in one vectorized pass. Frames after speech
+    are kept for the hangover so the recognizer still hears the pause that ends an utterance; the hangover
+    is cut short once a frame sits at the noise floor. The last few silent frames are held as pre-roll and
+    released in front of the next onset.
+    """
+
+    def __init__(self, sample_rate: int, frame_ms: int):
+        self.window = max(1, int(sample_rate * STT_VAD_WINDOW_MS / 1000))
+        self.hangover_frames = max(0, round(STT_VAD_HANGOVER_MS / frame_ms))
+        self.quiet_hangover_frames = max(0, round(STT_VAD_QUIET_HANGOVER_MS / frame_ms))
+        self.keepalive_frames = max(1, round(STT_VAD_KEEPALIVE_MS / frame_ms))
+        self.preroll = deque(maxlen=max(0, round(STT_VAD_PREROLL_MS / frame_ms)))
+        self.noise_floor_db = None
+        # How far the loudest window of the last frame rose above the noise floor.
+        self.peak_margin_db = 0.0
+        self.hangover_left = 0
+        self.silent_run = 0
+
+    def _window_scores(self, samples: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        count = max(1, len(samples) // self.window)
+        windows = samples[: count * self.window].astype(np.float32).reshape(count, -1) / 32768.0
+        energy_db = 10 * np.log10(np.mean(windows**2, axis=1) + 1e-10)
+        zcr = np.mean(np.signbit(windows[:, 1:]) != np.signbit(windows[:, :-1]), axis=1)
+        return energy_db, zcr
+
+    def is_speech(self, frame: bytes) -> bool:
+        samples = np.frombuffer(frame, dtype="<i2")
+        if len(samples) < 2:
+            return False
+        energy_db, zcr = self._window_scores(samples)
+
+        # The quietest window tracks the room: follow it straight down, drift slowly up so speech
+        # (which always has gaps between syllables) cannot drag the floor with it.
+        quietest = float(energy_db.min())
+        if self.noise_floor_db is None or quietest < self.noise_floor_db:
+            self.noise_floor_db = quietest
+        else:
+            self.noise_floor_db += 0.02 * (quietest - self.noise_floor_db)
+        self.peak_margin_db = float(energy_db.max()) - self.noise_floor_db
+
+        threshold = max(STT_VAD_THRESHOLD_DB, self.noise_floor_db + STT_VAD_NOISE_MARGIN_DB)
+        voiced = (energy_db > threshold) & (zcr >= STT_VAD_ZCR_MIN)
+        fricative = (energy_db > threshold - STT_VAD_FRICATIVE_MARGIN_DB) & (zcr >= STT_VAD_FRICATIVE_ZCR)
+        return int(np.count_nonzero(voiced | fricative)) >= min(STT_VAD_MIN_SPEECH_WINDOWS, len(energy_db))
+
+    def push(self, frame: bytes) -> tuple[list[bytes], list[bytes]]:
+        """Returns (frames to send, frames suppressed)."""
+        if self.is_speech(frame):
+            sent = [*self.preroll, frame]
+            self.preroll.clear()
+            self.hangover_left = self.hangover_frames
+            self.silent_run = 0
+            return sent, []
+
+        if self.hangover_left > 0 and self.peak_margin_db < STT_VAD_QUIET_MARGIN_DB:
+            # Nothing above the room noise: the utterance is over, so only a short closing pause is sent.
+            self.hangover_left = min(self.hangover_left, self.quiet_hangover_frames)
+        if self.hangover_left > 0:
+            self.hangover_left -= 1
+            return [frame], []
+
+        self.silent_run += 1
+        if self.silent_run % self.keepalive_frames == 0:
+            return [frame], []
+
+        if not self.preroll.maxlen:
+            return [], [frame]
+        dropped = [self.preroll[0]] if len(self.preroll) == self.preroll.maxlen else []
+        self.preroll.append(frame)
+        return [], dropped
+
+    def flush(self) -> list[bytes]:
+        """Pre-roll left at the end of a stream never precedes speech, so it is suppressed."""
+        dropped = list(self.preroll)
+        self.preroll.clear()
+        return dropped
+
+
+def resolve_client_sample_rate(requested: int | str | None) -> int:
+    try:
+        rate = int(requested) if requested else STT_DEFAULT_CLIENT_SAMPLE_RATE
+    except (TypeError, ValueError):
+        rate = STT_DEFAULT_CLIENT_SAMPLE_RATE
+    return rate if rate in SUPPORTED_CLIENT_SAMPLE_RATES else STT_DEFAULT_CLIENT_SAMPLE_RATE
+
+
+class AudioPipeline:
+    """
+    Turns the client's LINEAR16 WebSocket messages into ~STT_FRAME_MS recognizer requests at the target rate.
+
+    Clients that already send the target rate skip resampling and are only coalesced. With STT_VAD_ENABLED,
+    silent frames are gated out before they reach the recognizer.
+    """
+
+    def __init__(
+        self,
+        client_sample_rate: int,
+        target_sample_rate: int = STT_TARGET_SAMPLE_RATE,
+        frame_ms: int = STT_FRAME_MS,
+        vad_enabled: bool = STT_VAD_ENABLED,
+    ):
+        self.client_sample_rate = client_sample_rate
+        # Never upsample: a client below the target rate is recognized at its own rate.
+        self.output_sample_rate = min(client_sample_rate, target_sample_rate)
+        self.resampler = StreamingResampler(client_sample_rate, self.output_sample_rate)
+        self.coalescer = FrameCoalescer(self.output_sample_rate, frame_ms)
+        self.gate = VoiceActivityGate(self.output_sample_rate, frame_ms) if vad_enabled else None
+        self.odd_byte = b""
+        self.stats = {
+            "messages_in": 0,
+            "bytes_in": 0,
+            "requests_out": 0,
+            "bytes_out": 0,
+            "frames_suppressed": 0,
+            "bytes_suppressed": 0,
+            "process_ms": 0.0,
+        }
+        audio_totals["streams"] += 1
+
+    def _count_out(self, frames: list[bytes]) -> list[bytes]:
+        self.stats["requests_out"] += len(frames)
+        self.stats["bytes_out"] += sum(len(frame) for frame in frames)
+        return frames
+
+    def _count_suppressed(self, frames: list[bytes]):
+        self.stats["frames_suppressed"] += len(frames)
+        self.stats["bytes_suppressed"] += sum(len(frame) for frame in frames)
+
+    def _gate(self, frames: list[bytes]) -> list[bytes]:
+        if self.gate is None:
+            return frames
+        sent = []
+        for frame in frames:
+            kept, dropped = self.gate.push(frame)
+            sent.extend(kept)
+            self._count_suppressed(dropped)
+        return sent
+
+    def process(self, data: bytes) -> list[bytes]:
+        started_at = time.perf_counter()
+        self.stats["messages_in"] += 1
+        self.stats["bytes_in"] += len(data)
+
+        data = self.odd_byte + data
+        usable = len(data) - len(data) % 2
+        self.odd_byte = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype="<i2")
+
+        if self.resampler.passthrough:
+            pcm = samples.tobytes()
+        else:
+            resampled = self.resampler.process(samples)
+            pcm = np.clip(np.rint(resampled), -32768, 32767).astype("<i2").tobytes()
+
+        frames = self._count_out(self._gate(self.coalescer.push(pcm)))
+        self.stats["process_ms"] += (time.perf_counter() - started_at) * 1000
+        return frames
+
+    def flush(self) -> list[bytes]:
+        frames = self._gate(self.coalescer.flush())
+        if self.gate is not None:
+            self._count_suppressed(self.gate.flush())
+        return self._count_out(frames)
+
+    def report(self) -> dict:
+        audio_seconds = self.stats["bytes_in"] / (2 * self.client_sample_rate)
+        minutes = audio_seconds / 60 if audio_seconds else 0.0
+        per_minute = {
+            f"{name}_per_minute": round(self.stats[name] / minutes, 1) if minutes else None
+            for name in ("messages_in", "bytes_in", "requests_out", "bytes_out")
+        }
+        return {
+            "client_sample_rate": self.client_sample_rate,
+            "output_sample_rate": self.output_sample_rate,
+            "audio_seconds": round(audio_seconds, 2),
+            **self.stats,
+            "suppressed_fraction": _suppressed_fraction(self.stats),
+            **per_minute,
+            "process_ms": round(self.stats["process_ms"], 2),
+        }
+
+    def close(self) -> dict:
+        """Adds this stream's counters to the process totals reported by /metrics and returns its report."""
+        report = self.report()
+        for name, value in self.stats.items():
+            audio_totals[name] += value
+        audio_totals["audio_seconds"] += report["audio_seconds"]
+        return report
+
+
+def _suppressed_fraction(counters: dict) -> float | None:
+    produced = counters["bytes_out"] + counters["bytes_suppressed"]
+    return round(counters["bytes_suppressed"] / produced, 3) if produced else None
+
+
+def _audio_metrics() -> dict:
+    totals = audio_totals
+    minutes = totals["audio_seconds"] / 60
+    return {
+        **{name: round(value, 2) if isinstance(value, float) else value for name, value in totals.items()},
+        "bytes_in_per_minute": round(totals["bytes_in"] / minutes, 1) if minutes else None,
+        "bytes_out_per_minute": round(totals["bytes_out"] / minutes, 1) if minutes else None,
+        "messages_in_per_minute": round(totals["messages_in"] / minutes, 1) if minutes else None,
+        "requests_out_per_minute": round(totals["requests_out"] / minutes, 1) if minutes else None,
+        "suppressed_fraction": _suppressed_fraction(totals),
+    }
+
+
+register_metrics_source("stt_audio", _audio_metrics)
@@ -0,0 +1,85 @@
+"""Bytes and serialization CPU per viewer action: JSON text frames against compact msgpack frames.
+
+Payloads have the shape `_send_action` produces for highlight/navigate/inspect actions. The msgpack
+path is measured both with one action per frame (live sends) and with batched frames (pending flush).
+
+Usage (from orato-be/):
+    python -m benchmarks.action_protocol --actions 5000 --batch-sizes 1 8
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import print_report
+
+
+def _sample_actions(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    actions = []
+    for index in range(count):
+        intent = rng.choice(["highlight", "highlight", "highlight", "navigate", "inspect", "zoom"])
+        x0, y0 = rng.uniform(20, 600), rng.uniform(20, 400)
+        payload = {
+            "type": "action",
+            "intent": intent,
+            "slide": rng.randint(1, 60),
+            "bbox": [round(x0, 2), round(y0, 2), round(x0 + rng.uniform(40, 300), 2), round(y0 + rng.uniform(12, 80), 2)],
+            "section": rng.choice(["Introduction", "Gradient Descent", "Convergence", ""]),
+            "title": rng.choice(["Learning rate schedules", "Momentum update rule", "Loss surface", "Slide 12"]),
+            "imageInd": rng.randint(0, 3) if intent == "inspect" else 0,
+            "content": None,
+            "targetType": "image" if intent == "inspect" else "text",
+            "preview": rng.random() < 0.4,
+        }
+        if rng.random() < 0.3:
+            payload["seq"] = index
+            payload["phase"] = rng.choice(["provisional", "correction", "final"])
+        actions.append(payload)
+    return actions
+
+
+def _measure(actions: list[dict], encode, batch_size: int) -> dict:
+    started_at = time.perf_counter()
+    total_bytes = 0
+    frames = 0
+    for start in range(0, len(actions), batch_size):
+        frame = encode(actions[start : start + batch_size])
+        total_bytes += len(frame)
+        frames += 1
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    return {
+        "frames": frames,
+        "bytes_per_action": round(total_bytes / len(actions), 1),
+        "encode_us_per_action": round(elapsed_ms * 1000 / len(actions), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actions", type=int, default=5000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from action_protocol import compact_payload, decode_msgpack_frame, encode_json, encode_msgpack_frame
+
+    actions = _sample_actions(args.actions, args.seed)
+    report = {
+        "actions": args.actions,
+        "json_per_frame": _measure(actions, lambda batch: encode_json(batch[0]).encode("utf-8"), 1),
+    }
+    for batch_size in args.batch_sizes:
+        report[f"msgpack_batch_{batch_size}"] = _measure(actions, encode_msgpack_frame, batch_size)
+
+    decoded = decode_msgpack_frame(encode_msgpack_frame(actions[:200]))
+    expected = [
+        {key: value for key, value in action.items() if value is not None and not (key == "preview" and value is False)}
+        for action in actions[:200]
+    ]
+    report["round_trip_ok"] = decoded == expected
+    report["compact_example"] = compact_payload(actions[0])
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
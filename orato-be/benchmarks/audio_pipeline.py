@@ -0,0 +1,96 @@
+"""Bytes and gRPC requests per minute of audio sent to the recognizer, before and after the STT audio stage.
+
+Synthetic speech is chunked the way the frontend's ScriptProcessor sends it (4096 samples per WebSocket
+message) and pushed through `AudioPipeline` with the voice activity gate off (`benchmarks.voice_activity`
+covers the gate). The report compares the raw 48 kHz forwarding the STT socket used to do with server-side
+downsampling, and with a client that already sends 16 kHz. Tone checks confirm that in-band audio survives
+resampling and content above the new Nyquist frequency is filtered out.
+
+Usage (from orato-be/):
+    python -m benchmarks.audio_pipeline --seconds 120 --frame-ms 100
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import print_report
+from benchmarks.synthetic import synthetic_speech
+
+
+CLIENT_CHUNK_SAMPLES = 4096
+
+
+def _messages(samples: np.ndarray, chunk_samples: int) -> list[bytes]:
+    return [samples[start : start + chunk_samples].tobytes() for start in range(0, len(samples), chunk_samples)]
+
+
+def _run(messages: list[bytes], client_rate: int, target_rate: int, frame_ms: int) -> tuple[dict, bytes]:
+    from audio_pipeline import AudioPipeline
+
+    audio = AudioPipeline(client_rate, target_rate, frame_ms, vad_enabled=False)
+    frames = []
+    for message in messages:
+        frames.extend(audio.process(message))
+    frames.extend(audio.flush())
+    report = audio.close()
+    report["process_us_per_message"] = round(report.pop("process_ms") * 1000 / max(1, len(messages)), 2)
+    return report, b"".join(frames)
+
+
+def _tone_gain_db(frequency: float, client_rate: int, target_rate: int) -> float:
+    seconds = 1.0
+    t = np.arange(int(seconds * client_rate)) / client_rate
+    tone = (np.sin(2 * np.pi * frequency * t) * 10000).astype("<i2")
+    _, output = _run(_messages(tone, CLIENT_CHUNK_SAMPLES), client_rate, target_rate, 100)
+    resampled = np.frombuffer(output, dtype="<i2").astype(np.float64)
+    steady = resampled[len(resampled) // 4 : -len(resampled) // 4]
+    rms_in = 10000 / np.sqrt(2)
+    return round(20 * np.log10(max(np.sqrt(np.mean(steady**2)), 1e-9) / rms_in), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=120.0)
+    parser.add_argument("--frame-ms", type=int, default=100)
+    parser.add_argument("--target-rate", type=int, default=16000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    speech_48k, _ = synthetic_speech(args.seconds, 48000, seed=args.seed)
+    speech_16k, _ = synthetic_speech(args.seconds, 16000, seed=args.seed)
+    messages_48k = _messages(speech_48k, CLIENT_CHUNK_SAMPLES)
+
+    # Before: every WebSocket message became one StreamingRecognizeRequest at the client's rate.
+    raw_bytes = sum(len(message) for message in messages_48k)
+    minutes = args.seconds / 60
+    before = {
+        "requests_out_per_minute": round(len(messages_48k) / minutes, 1),
+        "bytes_out_per_minute": round(raw_bytes / minutes, 1),
+        "ms_per_request": round(CLIENT_CHUNK_SAMPLES / 48, 1),
+    }
+
+    downsampled, _ = _run(messages_48k, 48000, args.target_rate, args.frame_ms)
+    native, _ = _run(_messages(speech_16k, CLIENT_CHUNK_SAMPLES // 3), 16000, args.target_rate, args.frame_ms)
+
+    print_report(
+        {
+            "audio_seconds": args.seconds,
+            "frame_ms": args.frame_ms,
+            "before_raw_48k": before,
+            "after_downsampled_48k": downsampled,
+            "after_native_16k_client": native,
+            "bytes_reduction": round(1 - downsampled["bytes_out"] / raw_bytes, 3),
+            "tone_gain_db": {
+                "1000_hz": _tone_gain_db(1000, 48000, args.target_rate),
+                "3400_hz": _tone_gain_db(3400, 48000, args.target_rate),
+                "9000_hz": _tone_gain_db(9000, 48000, args.target_rate),
+                "15000_hz": _tone_gain_db(15000, 48000, args.target_rate),
+                "1000_hz_from_44100": _tone_gain_db(1000, 44100, args.target_rate),
+                "12000_hz_from_44100": _tone_gain_db(12000, 44100, args.target_rate),
+            },
+        }
+    )
+
+
+if __name__ == "__main__":
+    main()
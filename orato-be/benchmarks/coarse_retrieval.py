@@ -0,0 +1,99 @@
+"""Compares coarse-to-fine slide retrieval with flat block retrieval on large synthetic decks.
+
+Usage (from orato-be/):
+    python -m benchmarks.coarse_retrieval --slides 100 400 --queries 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.synthetic import synthetic_deck, synthetic_queries
+
+
+def _match_key(pipeline, result, intent: str = "highlight"):
+    """The block `retrieve` would pick from these results, so a flipped score direction shows up as a disagreement."""
+    if not result:
+        return None
+    doc = pipeline._select_best_match(pipeline._filter_results(result, intent, None))
+    if doc is None:
+        return None
+    return doc.metadata.get("slide"), tuple(doc.metadata.get("bbox") or ())
+
+
+def run_benchmark(slide_counts: list[int], query_count: int, k: int, shortlist: int) -> dict:
+    from ingestion_pipeline import (
+        build_slide_documents,
+        chunk_documents,
+        convert_to_documents,
+        create_slide_index,
+        create_vector_db,
+    )
+    import retreival_pipeline as pipeline
+
+    report = {"k": k, "shortlist": shortlist, "decks": []}
+
+    for slide_count in slide_counts:
+        doc_id = f"bench_{slide_count}"
+        parsed_data = synthetic_deck(slide_count)
+        create_vector_db(chunk_documents(convert_to_documents(parsed_data)), doc_id)
+        slide_index = create_slide_index(build_slide_documents(parsed_data), doc_id)
+        vector_db = pipeline.load_vector_db(doc_id)
+
+        queries = synthetic_queries(parsed_data, query_count)
+        for item in queries[:5]:
+            vector_db.similarity_search_with_score(item["query"], k=k)
+
+        flat_ms, coarse_ms = [], []
+        agreement = flat_hits = coarse_hits = 0
+        for item in queries:
+            started_at = time.perf_counter()
+            flat = vector_db.similarity_search_with_score(item["query"], k=k)
+            flat_ms.append((time.perf_counter() - started_at) * 1000)
+
+            started_at = time.perf_counter()
+            coarse = pipeline._coarse_to_fine_search(
+                vector_db,
+                slide_index,
+                item["query"],
+                k=k,
+                shortlist_size=shortlist,
+            )
+            coarse_ms.append((time.perf_counter() - started_at) * 1000)
+
+            flat_key, coarse_key = _match_key(pipeline, flat), _match_key(pipeline, coarse)
+            agreement += int(flat_key == coarse_key)
+            flat_hits += int(bool(flat_key) and flat_key[0] == item["slide"])
+            coarse_hits += int(bool(coarse_key) and coarse_key[0] == item["slide"])
+
+        report["decks"].append(
+            {
+                "slides": slide_count,
+                "queries": len(queries),
+                "flat": summarize_latencies(flat_ms),
+                "coarse_to_fine": summarize_latencies(coarse_ms),
+                "top1_agreement": round(agreement / len(queries), 4),
+                "flat_source_slide_hit_rate": round(flat_hits / len(queries), 4),
+                "coarse_source_slide_hit_rate": round(coarse_hits / len(queries), 4),
+            }
+        )
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, nargs="+", default=[100, 400])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--shortlist", type=int, default=6)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="orato-bench-") as chroma_dir:
+        os.environ["CHROMA_DIR"] = chroma_dir
+        print_report(run_benchmark(args.slides, args.queries, args.k, args.shortlist))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compares compact float16/int8 document indexes with full-precision Chroma search.
+
+Usage (from orato-be/):
+    python -m benchmarks.compact_index --slides 50 200 --queries 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.synthetic import synthetic_deck, synthetic_queries
+
+
+def _top1(results):
+    if not results:
+        return None
+    doc, _ = results[0]
+    return doc.page_content, doc.metadata.get("slide"), tuple(doc.metadata.get("bbox") or ())
+
+
+def run_benchmark(slide_counts: list[int], query_count: int, k: int) -> dict:
+    from compact_index import CompactVectorIndex
+    from ingestion_pipeline import chunk_documents, convert_to_documents, create_vector_db
+    import retreival_pipeline as pipeline
+
+    model = pipeline._get_embedding_model()
+    report = {"k": k, "documents": []}
+
+    for slide_count in slide_counts:
+        doc_id = f"bench_compact_{slide_count}"
+        parsed_data = synthetic_deck(slide_count, seed=slide_count)
+        create_vector_db(chunk_documents(convert_to_documents(parsed_data)), doc_id)
+        vector_db = pipeline.load_vector_db(doc_id)
+
+        queries = synthetic_queries(parsed_data, query_count)
+        query_vectors = [model.embed_query(item["query"]) for item in queries]
+
+        chroma_ms, reference = [], []
+        for vector in query_vectors:
+            started_at = time.perf_counter()
+            results = pipeline._search_by_vector(vector_db, vector, k=k)
+            chroma_ms.append((time.perf_counter() - started_at) * 1000)
+            reference.append(_top1(results))
+
+        entry = {"slides": slide_count, "full_precision_chroma": summarize_latencies(chroma_ms), "compact": {}}
+        for precision in ["float16", "int8"]:
+            compact = CompactVectorIndex.from_chroma(vector_db, precision=precision, embedding_model=model)
+            compact_ms, agreement = [], 0
+            for vector, expected in zip(query_vectors, reference):
+                started_at = time.perf_counter()
+                results = compact.similarity_search_by_vector_with_distances(vector, k=k)
+                compact_ms.append((time.perf_counter() - started_at) * 1000)
+                agreement += int(_top1(results) == expected)
+
+            entry["vectors"] = len(compact)
+            entry["float32_bytes"] = compact.float32_nbytes
+            entry["compact"][precision] = {
+                "bytes": compact.nbytes,
+                "bytes_per_vector": round(compact.nbytes / max(1, len(compact)), 1),
+                "ratio_vs_float32": round(compact.nbytes / max(1, compact.float32_nbytes), 3),
+                "top1_agreement": round(agreement / max(1, len(queries)), 4),
+                "latency": summarize_latencies(compact_ms),
+            }
+
+        report["documents"].append(entry)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slides", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="orato-bench-") as chroma_dir:
+        os.environ["CHROMA_DIR"] = chroma_dir
+        print_report(run_benchmark(args.slides, args.queries, args.k))
+
+
+if __name__ == "__main__":
+    main()
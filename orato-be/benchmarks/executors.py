@@ -0,0 +1,79 @@
+"""Live command latency while uploads are being ingested, for the shared to_thread pool and the named executors.
+
+Ingestion jobs are pure-Python CPU burns standing in for parsing and chunking. Live jobs are short
+CPU tasks standing in for retrieve/preview_highlight, issued at a fixed rate while ingestion runs.
+
+Usage (from orato-be/):
+    python -m benchmarks.executors --uploads 4 --upload-ms 1500 --live 60
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+
+
+def _burn(duration_ms: float) -> float:
+    deadline = time.perf_counter() + duration_ms / 1000
+    total = 0.0
+    while time.perf_counter() < deadline:
+        total += sum(index * index for index in range(200))
+    return total
+
+
+async def _scenario(args: argparse.Namespace, run_live, run_ingestion) -> dict:
+    ingestion = [asyncio.create_task(run_ingestion(_burn, args.upload_ms)) for _ in range(args.uploads)]
+    await asyncio.sleep(0.05)
+
+    live_ms = []
+    for _ in range(args.live):
+        started_at = time.perf_counter()
+        await run_live(_burn, args.live_ms)
+        live_ms.append((time.perf_counter() - started_at) * 1000)
+        await asyncio.sleep(args.live_gap_ms / 1000)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*ingestion)
+    return {
+        "live": summarize_latencies(live_ms),
+        "ingestion_tail_ms": round((time.perf_counter() - started_at) * 1000, 1),
+    }
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    from executors import NamedExecutor
+
+    report = {"config": vars(args)}
+
+    async def shared(fn, *fn_args):
+        return await asyncio.to_thread(fn, *fn_args)
+
+    report["shared_to_thread"] = await _scenario(args, shared, shared)
+
+    for kind in ("thread", "process"):
+        live = NamedExecutor("live", "thread", 4)
+        ingestion = NamedExecutor("ingestion", kind, args.ingestion_workers, args.nice)
+        await ingestion.run(_burn, 1.0)  # start worker processes before measuring
+        result = await _scenario(args, live.run, ingestion.run)
+        result["executors"] = {"live": live.metrics(), "ingestion": ingestion.metrics()}
+        report[f"named_ingestion_{kind}"] = result
+        live.shutdown()
+        ingestion.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--upload-ms", type=float, default=1500.0)
+    parser.add_argument("--ingestion-workers", type=int, default=2)
+    parser.add_argument("--live", type=int, default=60)
+    parser.add_argument("--live-ms", type=float, default=5.0)
+    parser.add_argument("--live-gap-ms", type=float, default=40.0)
+    parser.add_argument("--nice", type=int, default=10)
+    args = parser.parse_args()
+    print_report(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Measures library-wide search latency as a user's library grows, against querying each document index in turn.
+
+Usage (from orato-be/):
+    python -m benchmarks.library_search --sizes 10 50 100 250 500 --queries 50
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.synthetic import synthetic_deck, synthetic_queries
+
+
+def run_benchmark(sizes: list[int], slides_per_doc: int, query_count: int, k: int, scan_max_docs: int) -> dict:
+    from ingestion_pipeline import (
+        ReusableEmbeddings,
+        _get_embedding_model,
+        chunk_documents,
+        convert_to_documents,
+        create_vector_db,
+    )
+    from library_index import add_document_to_library, search_library
+    from retreival_pipeline import load_vector_db
+
+    owner_id = "bench_user"
+    model = _get_embedding_model()
+    report = {"slides_per_doc": slides_per_doc, "k": k, "libraries": []}
+    doc_ids: list[str] = []
+    decks: dict[str, dict] = {}
+
+    for size in sorted(sizes):
+        ingest_started_at = time.perf_counter()
+        while len(doc_ids) < size:
+            doc_id = f"bench_doc_{len(doc_ids)}"
+            parsed_data = synthetic_deck(slides_per_doc, seed=len(doc_ids) + 1)
+            chunks = chunk_documents(convert_to_documents(parsed_data))
+            embeddings = ReusableEmbeddings(model)
+            create_vector_db(chunks, doc_id, embedding_model=embeddings)
+            add_document_to_library(chunks, doc_id, owner_id, embedding_model=embeddings)
+            doc_ids.append(doc_id)
+            decks[doc_id] = parsed_data
+        ingest_ms = (time.perf_counter() - ingest_started_at) * 1000
+
+        queries = []
+        for doc_id in doc_ids[:: max(1, len(doc_ids) // query_count)][:query_count]:
+            item = synthetic_queries(decks[doc_id], 1, seed=len(queries))[0]
+            queries.append({**item, "doc_id": doc_id})
+        search_library(owner_id, queries[0]["query"], k=k)
+
+        library_ms = []
+        source_hits = 0
+        for item in queries:
+            started_at = time.perf_counter()
+            hits = search_library(owner_id, item["query"], k=k)
+            library_ms.append((time.perf_counter() - started_at) * 1000)
+            source_hits += int(any(hit["docId"] == item["doc_id"] for hit in hits))
+
+        entry = {
+            "documents": len(doc_ids),
+            "ingest_ms_for_new_documents": round(ingest_ms, 1),
+            "library_search": summarize_latencies(library_ms),
+            "source_document_in_top_k": round(source_hits / len(queries), 4),
+        }
+
+        if len(doc_ids) <= scan_max_docs:
+            scan_ms = []
+            for item in queries:
+                started_at = time.perf_counter()
+                for doc_id in doc_ids:
+                    load_vector_db(doc_id).similarity_search_with_score(item["query"], k=k)
+                scan_ms.append((time.perf_counter() - started_at) * 1000)
+            entry["per_document_scan"] = summarize_latencies(scan_ms)
+
+        report["libraries"].append(entry)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 100, 250, 500])
+    parser.add_argument("--slides-per-doc", type=int, default=12)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--scan-max-docs", type=int, default=100, help="Skip the per-document scan above this size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="orato-bench-") as chroma_dir:
+        os.environ["CHROMA_DIR"] = chroma_dir
+        print_report(run_benchmark(args.sizes, args.slides_per_doc, args.queries, args.k, args.scan_max_docs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Measures connection setup versus total latency of LLM calls: per-call clients against the shared pooled clients.
+
+Usage (from orato-be/):
+    python -m benchmarks.llm_client --requests 100 --latency-ms 40 --handshake-delay-ms 60
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.mock_llm_server import MockServerConfig, start_mock_server
+
+
+class ConnectTracer:
+    """Collects time spent in TCP/TLS connection setup through httpx's trace extension."""
+
+    def __init__(self):
+        self.connect_ms = 0.0
+        self._started: dict[str, float] = {}
+
+    def _record(self, event_name: str):
+        for step in ("connect_tcp", "start_tls"):
+            if event_name == f"connection.{step}.started":
+                self._started[step] = time.perf_counter()
+            elif event_name == f"connection.{step}.complete" and step in self._started:
+                self.connect_ms += (time.perf_counter() - self._started.pop(step)) * 1000
+
+    def sync_hook(self, event_name, info):
+        self._record(event_name)
+
+    async def async_hook(self, event_name, info):
+        self._record(event_name)
+
+
+def _measure(fn, count: int) -> dict:
+    totals, connects = [], []
+    for _ in range(count):
+        tracer = ConnectTracer()
+        started_at = time.perf_counter()
+        fn(tracer)
+        totals.append((time.perf_counter() - started_at) * 1000)
+        connects.append(tracer.connect_ms)
+    return {"total": summarize_latencies(totals), "connect": summarize_latencies(connects)}
+
+
+async def _measure_async(fn, count: int) -> dict:
+    totals, connects = [], []
+    for _ in range(count):
+        tracer = ConnectTracer()
+        started_at = time.perf_counter()
+        await fn(tracer)
+        totals.append((time.perf_counter() - started_at) * 1000)
+        connects.append(tracer.connect_ms)
+    return {"total": summarize_latencies(totals), "connect": summarize_latencies(connects)}
+
+
+def run_benchmark(request_count: int, latency_ms: float, handshake_delay_ms: float) -> dict:
+    server, base_url = start_mock_server(config=MockServerConfig(latency_ms, handshake_delay_ms))
+    os.environ.update({"LLM_API_KEY": "mock", "LLM_BASE_URL": base_url, "LLM_REASONING_ENABLED": "true"})
+    for name in ("GEMINI_API_KEY", "OPENAI_API_KEY", "GEMINI_BASE_URL", "OPENAI_BASE_URL", "GEMINI_MODEL"):
+        os.environ.pop(name, None)
+
+    import llm_reasoner
+    from llm_reasoner import LLMCommandReasoner
+
+    reasoner = LLMCommandReasoner()
+    payload = reasoner._build_reason_payload("highlight the architecture components", 3, "doc_focus_score=2")
+    url = f"{base_url}/chat/completions"
+    headers = reasoner._headers()
+    report = {"latency_ms": latency_ms, "handshake_delay_ms": handshake_delay_ms, "modes": {}}
+
+    def per_call_client(tracer):
+        with httpx.Client(timeout=10) as client:
+            client.post(url, headers=headers, json=payload, extensions={"trace": tracer.sync_hook}).raise_for_status()
+
+    def pooled_sync(tracer):
+        llm_reasoner._get_sync_client().post(
+            url, headers=headers, json=payload, timeout=10, extensions={"trace": tracer.sync_hook}
+        ).raise_for_status()
+
+    before = server.stats.snapshot()
+    report["modes"]["per_call_client"] = _measure(per_call_client, request_count)
+    middle = server.stats.snapshot()
+    report["modes"]["pooled_sync_client"] = _measure(pooled_sync, request_count)
+    after = server.stats.snapshot()
+    report["modes"]["per_call_client"]["connections"] = middle["connections"] - before["connections"]
+    report["modes"]["pooled_sync_client"]["connections"] = after["connections"] - middle["connections"]
+
+    async def run_async_modes():
+        async def pooled_async(tracer):
+            response = await llm_reasoner._get_async_client().post(
+                url, headers=headers, json=payload, timeout=10, extensions={"trace": tracer.async_hook}
+            )
+            response.raise_for_status()
+
+        start = server.stats.snapshot()
+        report["modes"]["pooled_async_client"] = await _measure_async(pooled_async, request_count)
+        report["modes"]["pooled_async_client"]["connections"] = server.stats.snapshot()["connections"] - start["connections"]
+
+        areason_ms = []
+        for _ in range(request_count):
+            started_at = time.perf_counter()
+            decision = await reasoner.areason("highlight the architecture components", 3, "doc_focus_score=2")
+            areason_ms.append((time.perf_counter() - started_at) * 1000)
+            assert decision is not None
+        report["modes"]["reasoner_areason"] = {"total": summarize_latencies(areason_ms)}
+
+        concurrent_started_at = time.perf_counter()
+        await asyncio.gather(*(reasoner.areason("next slide", 3) for _ in range(request_count)))
+        report["modes"]["reasoner_areason_concurrent"] = {
+            "requests": request_count,
+            "wall_ms": round((time.perf_counter() - concurrent_started_at) * 1000, 3),
+        }
+        await llm_reasoner.close_shared_clients()
+
+    asyncio.run(run_async_modes())
+    report["http2"] = llm_reasoner._http2_available()
+    report["server"] = server.stats.snapshot()
+    server.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--handshake-delay-ms", type=float, default=60.0)
+    args = parser.parse_args()
+    print_report(run_benchmark(args.requests, args.latency_ms, args.handshake_delay_ms))
+
+
+if __name__ == "__main__":
+    main()
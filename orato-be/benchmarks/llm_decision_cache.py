@@ -0,0 +1,92 @@
+"""Replays the same spoken commands across several simulated sessions with the LLM decision cache off and on.
+
+Reports provider calls, reasoning latency and an estimate of prompt tokens saved, using the local mock endpoint.
+
+Usage (from orato-be/):
+    python -m benchmarks.llm_decision_cache --sessions 10 --latency-ms 300
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.mock_llm_server import MockServerConfig, start_mock_server
+
+
+SESSION_COMMANDS = [
+    "what does this diagram show",
+    "go back to the architecture",
+    "can you explain what this means here",
+    "what is this part about",
+    "okay does everyone understand this",
+    "show me the thing we talked about earlier",
+]
+
+
+async def _run_sessions(reasoner, sessions: int) -> tuple[list[float], int]:
+    import retreival_pipeline as pipeline
+
+    latencies = []
+    prompt_chars = 0
+    for session_index in range(sessions):
+        state = {"active_page": 3, "recent_utterances": [], "doc_focus_score": 1}
+        for command in SESSION_COMMANDS:
+            # Recent utterances differ per session; only the stable part of the context is in the cache key.
+            state["recent_utterances"] = [f"session {session_index} warmup remark", command]
+            session_context = pipeline._build_session_context(state)
+            prompt_chars += len(str(reasoner._build_reason_payload(command, 3, session_context)["messages"]))
+            started_at = time.perf_counter()
+            await reasoner.areason(
+                command,
+                current_slide=3,
+                session_context=session_context,
+                cache_context=pipeline._build_decision_cache_context(state),
+            )
+            latencies.append((time.perf_counter() - started_at) * 1000)
+    return latencies, prompt_chars
+
+
+def run_benchmark(sessions: int, latency_ms: float) -> dict:
+    server, base_url = start_mock_server(config=MockServerConfig(latency_ms=latency_ms))
+    os.environ.update({"LLM_API_KEY": "mock", "LLM_BASE_URL": base_url, "LLM_REASONING_ENABLED": "true"})
+    for name in ("GEMINI_API_KEY", "OPENAI_API_KEY", "GEMINI_BASE_URL", "OPENAI_BASE_URL", "GEMINI_MODEL"):
+        os.environ.pop(name, None)
+
+    import llm_reasoner
+
+    reasoner = llm_reasoner.LLMCommandReasoner()
+    cache = llm_reasoner.DECISION_CACHE
+    report = {"sessions": sessions, "commands_per_session": len(SESSION_COMMANDS), "latency_ms": latency_ms, "modes": {}}
+
+    async def run_modes():
+        for mode, max_size in (("cache_off", 0), ("cache_on", cache.max_size or 2048)):
+            cache.max_size = max_size
+            cache.clear()
+            requests_before = server.stats.snapshot()["requests"]
+            latencies, prompt_chars = await _run_sessions(reasoner, sessions)
+            provider_calls = server.stats.snapshot()["requests"] - requests_before
+            report["modes"][mode] = {
+                "reasoning": summarize_latencies(latencies),
+                "provider_calls": provider_calls,
+                # Rough 4-characters-per-token estimate of the prompt tokens actually sent.
+                "estimated_prompt_tokens": round(prompt_chars / 4 * provider_calls / max(len(latencies), 1)),
+            }
+        report["cache"] = cache.metrics()
+        await llm_reasoner.close_shared_clients()
+
+    asyncio.run(run_modes())
+    server.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    args = parser.parse_args()
+    print_report(run_benchmark(args.sessions, args.latency_ms))
+
+
+if __name__ == "__main__":
+    main()
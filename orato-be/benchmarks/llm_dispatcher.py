@@ -0,0 +1,94 @@
+"""Coalescing and priority behaviour of the shared LLM dispatcher, against the local mock LLM server.
+
+Scenario 1 fires the same live command from several sessions at once and counts provider requests.
+Scenario 2 queues a burst of lecture summaries and then issues live commands, reporting live latency
+with priority scheduling against a plain FIFO limit of the same size.
+
+Usage (from orato-be/):
+    python -m benchmarks.llm_dispatcher --latency-ms 300 --sessions 12 --summaries 24 --live 12
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.mock_llm_server import MockServerConfig, start_mock_server
+
+
+async def _timed(coroutine) -> float:
+    started_at = time.perf_counter()
+    await coroutine
+    return (time.perf_counter() - started_at) * 1000
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    server, base_url = start_mock_server(config=MockServerConfig(latency_ms=args.latency_ms, decision_mode="rules"))
+    os.environ.update({"LLM_API_KEY": "mock", "LLM_BASE_URL": base_url, "LLM_REASONING_ENABLED": "true"})
+    for name in ("GEMINI_API_KEY", "OPENAI_API_KEY", "GEMINI_BASE_URL", "OPENAI_BASE_URL", "GEMINI_MODEL"):
+        os.environ.pop(name, None)
+
+    import llm_reasoner
+
+    llm_reasoner.DECISION_CACHE.max_size = 0
+    reasoner = llm_reasoner.LLMCommandReasoner()
+    report = {"latency_ms": args.latency_ms, "max_concurrency": args.max_concurrency}
+
+    async def coalescing():
+        llm_reasoner.DISPATCHER = llm_reasoner.LLMDispatcher(args.max_concurrency, 2, 0, 1)
+        before = server.stats.snapshot()["requests"]
+        latencies = await asyncio.gather(
+            *(_timed(reasoner.areason("what does this diagram show", 4, "doc_focus_score=2")) for _ in range(args.sessions))
+        )
+        report["coalescing"] = {
+            "sessions": args.sessions,
+            "provider_requests": server.stats.snapshot()["requests"] - before,
+            "latency": summarize_latencies(list(latencies)),
+            "dispatcher": llm_reasoner.DISPATCHER.metrics(),
+        }
+
+    async def contention(mode: str, reserved_slots: int, live_priority: int):
+        dispatcher = llm_reasoner.LLMDispatcher(args.max_concurrency, reserved_slots, 0, 1)
+        dispatcher.PRIORITY_LIVE = live_priority
+        llm_reasoner.DISPATCHER = dispatcher
+        summaries = [
+            asyncio.create_task(
+                _timed(reasoner.asummarize_lecture(f"Lecture {index}", f"speech {index}", "Slide 1: Overview"))
+            )
+            for index in range(args.summaries)
+        ]
+        await asyncio.sleep(0.01)
+        live = await asyncio.gather(
+            *(_timed(reasoner.areason(f"explain the part about topic {index}", 2)) for index in range(args.live))
+        )
+        summary_ms = await asyncio.gather(*summaries)
+        report[mode] = {
+            "live": summarize_latencies(list(live)),
+            "summaries": summarize_latencies(list(summary_ms)),
+        }
+
+    async def run_all():
+        await coalescing()
+        await contention("fifo", 0, llm_reasoner.LLMDispatcher.PRIORITY_BACKGROUND)
+        await contention("priority", args.reserved_slots, llm_reasoner.LLMDispatcher.PRIORITY_LIVE)
+        await llm_reasoner.close_shared_clients()
+
+    asyncio.run(run_all())
+    report["server"] = server.stats.snapshot()
+    server.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--sessions", type=int, default=12)
+    parser.add_argument("--summaries", type=int, default=24)
+    parser.add_argument("--live", type=int, default=12)
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--reserved-slots", type=int, default=2)
+    print_report(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Drives analyze_query and summarize_lecture against the local mock LLM server.
+
+Reports reasoning latency, how often the regex fallback was used (errors, timeouts, open breaker),
+summary latency, and the circuit breaker state, without an API key or network access.
+
+Usage (from orato-be/):
+    python -m benchmarks.llm_reasoning --latency-ms 400 --latency-distribution lognormal --latency-jitter-ms 200 \
+        --error-rate 0.1 --hang-rate 0.05 --rounds 5
+"""
+import argparse
+import os
+import time
+from collections import Counter
+from pathlib import Path
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.mock_llm_server import add_mock_arguments, config_from_args, start_mock_server
+from benchmarks.replay_transcript import load_transcript
+
+
+DEFAULT_TRANSCRIPT = Path(__file__).with_name("transcripts") / "sample_lecture.jsonl"
+
+
+def run_benchmark(args: argparse.Namespace) -> dict:
+    server, base_url = start_mock_server(config=config_from_args(args))
+    os.environ.update(
+        {
+            "LLM_API_KEY": "mock",
+            "LLM_BASE_URL": base_url,
+            "LLM_REASONING_ENABLED": "true",
+            "LLM_TIMEOUT_SECONDS": str(args.timeout_seconds),
+        }
+    )
+    for name in ("GEMINI_API_KEY", "OPENAI_API_KEY", "GEMINI_BASE_URL", "OPENAI_BASE_URL", "GEMINI_MODEL"):
+        os.environ.pop(name, None)
+
+    import llm_reasoner
+    import retreival_pipeline as pipeline
+
+    if not args.cache:
+        llm_reasoner.DECISION_CACHE.max_size = 0
+    pipeline.COMMAND_REASONER.stream_decisions = args.stream
+
+    utterances = [
+        str(event.get("text") or "")
+        for event in load_transcript(args.transcript)
+        if event.get("type") == "final" and event.get("text")
+    ]
+
+    reasoning_ms: list[float] = []
+    sources: Counter = Counter()
+    intents: Counter = Counter()
+    for _ in range(args.rounds):
+        state = {"active_page": 1, "recent_utterances": [], "doc_focus_score": 0}
+        for utterance in utterances:
+            started_at = time.perf_counter()
+            analysis = pipeline.analyze_query(utterance, state["active_page"], state, True)
+            reasoning_ms.append((time.perf_counter() - started_at) * 1000)
+            sources[analysis.get("reasoning_source", "regex")] += 1
+            intents[analysis.get("intent", "unknown")] += 1
+            state["recent_utterances"] = (state["recent_utterances"] + [utterance])[-6:]
+
+    breaker_stats = llm_reasoner.REASONING_BREAKER.metrics()
+    llm_attempts = breaker_stats["calls"] + breaker_stats["short_circuited"]
+    llm_fallbacks = breaker_stats["failures"] + breaker_stats["short_circuited"]
+
+    summary_ms: list[float] = []
+    summary_fallbacks = 0
+    lecture_text = " ".join(utterances)
+    for _ in range(args.summaries):
+        started_at = time.perf_counter()
+        summary = pipeline.COMMAND_REASONER.summarize_lecture("Sample lecture", lecture_text, "Slide 1: Overview")
+        summary_ms.append((time.perf_counter() - started_at) * 1000)
+        summary_fallbacks += summary is None
+
+    report = {
+        "mock": {
+            "latency_ms": args.latency_ms,
+            "latency_distribution": args.latency_distribution,
+            "latency_jitter_ms": args.latency_jitter_ms,
+            "error_rate": args.error_rate,
+            "hang_rate": args.hang_rate,
+            "decision_mode": args.decision_mode,
+        },
+        "timeout_seconds": args.timeout_seconds,
+        "streaming": args.stream,
+        "analyze_query": {
+            "latency": summarize_latencies(reasoning_ms),
+            "reasoning_source": dict(sources),
+            # Utterances routed to the LLM that ended on the regex parser (error, timeout or open breaker).
+            "llm_attempts": llm_attempts,
+            "llm_fallbacks": llm_fallbacks,
+            "fallback_rate": round(llm_fallbacks / max(llm_attempts, 1), 4),
+            "intents": dict(intents),
+        },
+        "summarize_lecture": {
+            "latency": summarize_latencies(summary_ms),
+            "fallbacks": summary_fallbacks,
+        },
+        "circuit_breaker": llm_reasoner.REASONING_BREAKER.metrics(),
+        "decision_cache": llm_reasoner.DECISION_CACHE.metrics(),
+        "server": server.stats.snapshot(),
+    }
+    server.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_mock_arguments(parser)
+    parser.add_argument("--transcript", default=str(DEFAULT_TRANSCRIPT))
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--summaries", type=int, default=3)
+    parser.add_argument("--timeout-seconds", type=float, default=8.0)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM decision cache enabled.")
+    print_report(run_benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Time-to-decision of LLM reasoning with and without streaming, against a mock that emits tokens with a delay.
+
+Usage (from orato-be/):
+    python -m benchmarks.llm_streaming --latency-ms 150 --token-delay-ms 15 --requests 10
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.mock_llm_server import MockServerConfig, start_mock_server
+
+
+def _decision(intent, target_slide=None, refers_to_document=True, search_query=""):
+    return {
+        "intent": intent,
+        "confidence": 0.9,
+        "direct_command": intent in {"next", "prev", "clear", "zoom_in", "zoom_out"},
+        "refers_to_document": refers_to_document,
+        "target_slide": target_slide,
+        "search_query": search_query,
+        "target_type": "auto",
+    }
+
+
+SCENARIOS = {
+    "direct_next": ("move on to the next one", _decision("next")),
+    "navigate_slide": ("take us to slide five", _decision("navigate", target_slide=5)),
+    "non_document": ("okay does everyone understand this", _decision("navigate", refers_to_document=False)),
+    "semantic_highlight": (
+        "show where it talks about the encoder attention layers",
+        _decision("highlight", search_query="encoder attention layers in the transformer architecture"),
+    ),
+}
+
+
+def run_benchmark(request_count: int, latency_ms: float, token_delay_ms: float, chunk_chars: int) -> dict:
+    config = MockServerConfig(latency_ms=latency_ms, token_delay_ms=token_delay_ms, chunk_chars=chunk_chars)
+    server, base_url = start_mock_server(config=config)
+    os.environ.update({"LLM_API_KEY": "mock", "LLM_BASE_URL": base_url, "LLM_REASONING_ENABLED": "true"})
+    for name in ("GEMINI_API_KEY", "OPENAI_API_KEY", "GEMINI_BASE_URL", "OPENAI_BASE_URL", "GEMINI_MODEL"):
+        os.environ.pop(name, None)
+
+    import llm_reasoner
+
+    llm_reasoner.DECISION_CACHE.max_size = 0
+    reasoner = llm_reasoner.LLMCommandReasoner()
+    report = {
+        "latency_ms": latency_ms,
+        "token_delay_ms": token_delay_ms,
+        "chunk_chars": chunk_chars,
+        "scenarios": {},
+    }
+
+    async def run_scenarios():
+        for name, (transcript, decision) in SCENARIOS.items():
+            config.decision = decision
+            scenario = {}
+            for mode, streaming in (("buffered", False), ("streaming", True)):
+                reasoner.stream_decisions = streaming
+                latencies = []
+                for _ in range(request_count):
+                    started_at = time.perf_counter()
+                    result = await reasoner.areason(transcript, current_slide=3)
+                    latencies.append((time.perf_counter() - started_at) * 1000)
+                    assert result is not None and result.intent == decision["intent"]
+                scenario[mode] = summarize_latencies(latencies)
+            scenario["p50_speedup"] = round(
+                scenario["buffered"]["p50_ms"] / max(scenario["streaming"]["p50_ms"], 1e-6), 2
+            )
+            report["scenarios"][name] = scenario
+        await llm_reasoner.close_shared_clients()
+
+    asyncio.run(run_scenarios())
+    report["server"] = server.stats.snapshot()
+    server.shutdown()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--token-delay-ms", type=float, default=15.0)
+    parser.add_argument("--chunk-chars", type=int, default=4)
+    args = parser.parse_args()
+    print_report(run_benchmark(args.requests, args.latency_ms, args.token_delay_ms, args.chunk_chars))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Concurrent presenter load test against a running backend.
+
+Each simulated presenter opens the viewer socket (/ws/{client_id}) and the STT socket (/ws/stt/{client_id}).
+It streams synthetic microphone audio in the frontend's 4096-sample messages and sends the script's
+page changes as `state_update` messages. Concurrency ramps through the given levels, and every level
+runs for --step-seconds.
+
+Start the backend with the replay recognizer so transcripts follow the same script as this tool:
+    STT_BACKEND=replay STT_REPLAY_LOOP=true STT_REPLAY_SCRIPT=benchmarks/transcripts/sample_lecture.jsonl \
+        uvicorn main:app --port 8000
+
+For each level the report covers command-to-action latency (from when the replayed final is due to
+the first non-preview action that follows it), actions per presenter, and the server's event-loop lag
+and CPU/RSS. It also gives the deltas of queued and dropped pending actions and of dropped finals,
+read from /metrics. Actions need --doc-id to name an indexed document; without one, only the socket,
+audio and page traffic is exercised.
+
+Usage (from orato-be/):
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --doc-id <doc_id> --concurrency 1 4 16 --step-seconds 30
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.synthetic import synthetic_speech
+
+
+CLIENT_CHUNK_SAMPLES = 4096
+
+
+def _ws_base(url: str) -> str:
+    if url.startswith("https://"):
+        return "wss://" + url[len("https://") :]
+    return "ws://" + url.removeprefix("http://")
+
+
+def _mint_token(email: str) -> str:
+    # Signed with this environment's SECRET_KEY, which must match the server's.
+    from auth import create_access_token
+
+    return create_access_token({"sub": email})
+
+
+class Presenter:
+    """One paired viewer and STT connection."""
+
+    def __init__(self, index: int, args: argparse.Namespace, token: str, script: list[dict], page_events: list[dict], audio: list[bytes]):
+        self.client_id = f"load{index}_{args.doc_id or 'none'}"
+        self.args = args
+        self.token = token
+        self.script = script
+        self.page_events = page_events
+        self.audio = audio
+        self.audio_offset = index * 37 % max(1, len(audio))
+        self.actions: list[tuple[float, dict]] = []
+        self.messages = 0
+        self.stt_opened_at = None
+        self.errors: list[str] = []
+
+    async def _receive_viewer(self, viewer):
+        from action_protocol import decode_msgpack_frame
+
+        async for message in viewer:
+            received_at = time.perf_counter()
+            if isinstance(message, bytes):
+                payloads = decode_msgpack_frame(message)
+            elif message == "pong":
+                continue
+            else:
+                payloads = [json.loads(message)]
+            for payload in payloads:
+                self.messages += 1
+                if payload.get("type") == "action" and not payload.get("preview"):
+                    self.actions.append((received_at, payload))
+
+    async def _send_pages(self, viewer, started_at: float):
+        cycle = (self.script[-1]["at"] + 1.0) if self.script else 0.0
+        offset = 0.0
+        while self.page_events:
+            for event in self.page_events:
+                delay = started_at + (offset + event["at"]) / self.args.replay_speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await viewer.send(
+                    json.dumps({"type": "state_update", "activePage": event["page"], "viewerMode": event.get("viewerMode", "document")})
+                )
+            offset += cycle
+
+    async def _stream_audio(self, stt):
+        interval = CLIENT_CHUNK_SAMPLES / self.args.sample_rate
+        index = self.audio_offset
+        sent = 0
+        while True:
+            delay = self.stt_opened_at + sent * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await stt.send(self.audio[index % len(self.audio)])
+            index += 1
+            sent += 1
+
+    async def run(self, stop: asyncio.Event):
+        import websockets
+
+        base = _ws_base(self.args.url)
+        viewer_url = f"{base}/ws/{self.client_id}?token={self.token}&protocol={self.args.protocol}"
+        stt_url = f"{base}/ws/stt/{self.client_id}?sample_rate={self.args.sample_rate}"
+        try:
+            async with websockets.connect(viewer_url, max_size=None) as viewer:
+                receiver = asyncio.create_task(self._receive_viewer(viewer))
+                async with websockets.connect(stt_url, max_size=None) as stt:
+                    self.stt_opened_at = time.perf_counter()
+                    workers = [
+                        asyncio.create_task(self._stream_audio(stt)),
+                        asyncio.create_task(self._send_pages(viewer, self.stt_opened_at)),
+                    ]
+                    await stop.wait()
+                    for worker in workers:
+                        worker.cancel()
+                    await asyncio.gather(*workers, return_exceptions=True)
+                # Leave the viewer open briefly so actions for the last finals can still arrive.
+                await asyncio.sleep(self.args.drain_seconds)
+                receiver.cancel()
+                await asyncio.gather(receiver, return_exceptions=True)
+        except Exception as exc:
+            self.errors.append(f"{type(exc).__name__}: {exc}")
+
+    def command_latencies_ms(self) -> list[float]:
+        """Pairs each action with the latest final that was due before it arrived."""
+        finals = [event["at"] for event in self.script if event.get("type") == "final"]
+        if self.stt_opened_at is None or not finals:
+            return []
+        cycle = self.script[-1]["at"] + 1.0
+        latencies, last_final_due = [], None
+        for received_at, _ in self.actions:
+            elapsed = (received_at - self.stt_opened_at) * self.args.replay_speed
+            loops, position = divmod(elapsed, cycle)
+            due = [at for at in finals if at <= position]
+            if due:
+                final_at = loops * cycle + due[-1]
+            elif loops:
+                final_at = (loops - 1) * cycle + finals[-1]
+            else:
+                continue
+            if final_at == last_final_due:
+                continue
+            last_final_due = final_at
+            latencies.append((elapsed - final_at) / self.args.replay_speed * 1000)
+        return latencies
+
+
+async def _fetch_metrics(client, url: str) -> dict:
+    try:
+        response = await client.get(f"{url}/metrics")
+        response.raise_for_status()
+        return response.json()
+    except Exception as exc:
+        print(f"Could not read {url}/metrics: {exc}")
+        return {}
+
+
+def _delta(before: dict, after: dict, source: str, *names: str) -> dict:
+    old, new = before.get(source) or {}, after.get(source) or {}
+    return {name: (new.get(name) or 0) - (old.get(name) or 0) for name in names if name in new}
+
+
+async def _run_level(concurrency: int, args, token, script, page_events, audio, http) -> dict:
+    before = await _fetch_metrics(http, args.url)
+    started_at = time.perf_counter()
+    stop = asyncio.Event()
+    presenters = [Presenter(index, args, token, script, page_events, audio) for index in range(concurrency)]
+    tasks = []
+    for presenter in presenters:
+        tasks.append(asyncio.create_task(presenter.run(stop)))
+        await asyncio.sleep(args.stagger_ms / 1000)
+
+    await asyncio.sleep(args.step_seconds)
+    during = await _fetch_metrics(http, args.url)
+    stop.set()
+    await asyncio.gather(*tasks)
+    after = await _fetch_metrics(http, args.url)
+    elapsed_s = time.perf_counter() - started_at
+
+    latencies = [value for presenter in presenters for value in presenter.command_latencies_ms()]
+    runtime_before, runtime_during = before.get("runtime") or {}, during.get("runtime") or {}
+    cpu_delta = (runtime_during.get("cpu_seconds") or 0) - (runtime_before.get("cpu_seconds") or 0)
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed_s, 1),
+        "connection_errors": [error for presenter in presenters for error in presenter.errors][:5],
+        "command_to_action": summarize_latencies(latencies),
+        "actions_per_presenter": round(sum(len(presenter.actions) for presenter in presenters) / concurrency, 1),
+        "viewer_messages": sum(presenter.messages for presenter in presenters),
+        "server": {
+            # CPU over the steady part of the level, sampled before the sockets start closing.
+            "cpu_percent": round(cpu_delta / args.step_seconds * 100, 1) if runtime_during else None,
+            "rss_mb": runtime_during.get("rss_mb"),
+            "threads": runtime_during.get("threads"),
+            "loop_lag_p50_ms": runtime_during.get("loop_lag_p50_ms"),
+            "loop_lag_p95_ms": runtime_during.get("loop_lag_p95_ms"),
+            "loop_lag_p99_ms": runtime_during.get("loop_lag_p99_ms"),
+            "loop_lag_window_max_ms": runtime_during.get("loop_lag_window_max_ms"),
+        },
+        "pending_actions": _delta(before, after, "session_store", "queued", "dropped", "flushed"),
+        "stt_pipeline": _delta(before, after, "stt_pipeline", "finals_queued", "finals_processed", "finals_dropped", "interims_cancelled"),
+        "stt_audio": _delta(before, after, "stt_audio", "requests_out", "bytes_out", "bytes_suppressed"),
+    }
+
+
+async def _main(args: argparse.Namespace) -> dict:
+    import httpx
+
+    from stt_backends import load_replay_script
+
+    script = load_replay_script(args.script)
+    page_events = [
+        event
+        for event in (json.loads(line) for line in open(args.script, encoding="utf-8") if line.strip())
+        if event.get("type") == "page"
+    ] if args.script.endswith(".jsonl") else []
+
+    speech, _ = synthetic_speech(args.audio_seconds, args.sample_rate, seed=args.seed)
+    audio = [speech[start : start + CLIENT_CHUNK_SAMPLES].tobytes() for start in range(0, len(speech), CLIENT_CHUNK_SAMPLES)]
+    token = args.token or _mint_token(args.email)
+
+    levels = []
+    async with httpx.AsyncClient(timeout=10.0) as http:
+        for concurrency in args.concurrency:
+            print(f"Running {concurrency} presenters for {args.step_seconds:.0f} s")
+            level = await _run_level(concurrency, args, token, script, page_events, audio, http)
+            levels.append(level)
+            await asyncio.sleep(args.cooldown_seconds)
+
+    if args.doc_id and not any(level["actions_per_presenter"] for level in levels):
+        print(f"No actions arrived; is {args.doc_id} indexed and is the server running STT_BACKEND=replay?")
+    return {
+        "url": args.url,
+        "doc_id": args.doc_id or None,
+        "script": args.script,
+        "protocol": args.protocol,
+        "sample_rate": args.sample_rate,
+        "levels": levels,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--doc-id", default="")
+    parser.add_argument("--token", default="", help="Viewer JWT; minted with this environment's SECRET_KEY when empty.")
+    parser.add_argument("--email", default="loadtest@orato.local")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--step-seconds", type=float, default=30.0)
+    parser.add_argument("--stagger-ms", type=float, default=50.0)
+    parser.add_argument("--drain-seconds", type=float, default=2.0)
+    parser.add_argument("--cooldown-seconds", type=float, default=3.0)
+    parser.add_argument("--script", default="benchmarks/transcripts/sample_lecture.jsonl", help="Must match the server's STT_REPLAY_SCRIPT.")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="Must match the server's STT_REPLAY_SPEED.")
+    parser.add_argument("--protocol", choices=["json", "msgpack"], default="json")
+    parser.add_argument("--sample-rate", type=int, choices=[16000, 48000], default=48000)
+    parser.add_argument("--audio-seconds", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print_report(asyncio.run(_main(args)))
+
+
+if __name__ == "__main__":
+    main()
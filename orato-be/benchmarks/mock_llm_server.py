@@ -0,0 +1,306 @@
+"""Local OpenAI-compatible stand-in for the `/chat/completions` calls made by LLMCommandReasoner.
+
+Run it standalone and point the backend at it to exercise reasoning offline:
+    python -m benchmarks.mock_llm_server --port 8089 --latency-ms 400 --latency-distribution lognormal --error-rate 0.05
+    LLM_API_KEY=mock LLM_BASE_URL=http://127.0.0.1:8089/v1 uvicorn main:app
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CANNED_DECISION = {
+    "intent": "highlight",
+    "confidence": 0.86,
+    "direct_command": False,
+    "refers_to_document": True,
+    "target_slide": None,
+    "search_query": "architecture components",
+    "target_type": "text",
+}
+
+CANNED_SUMMARY = "\n".join(
+    [
+        "Lecture Overview",
+        "- Mock summary produced by the local stand-in server.",
+        "Key Concepts",
+        "- Concept one",
+        "Teacher Emphasis",
+        "- Emphasis one",
+        "Document Connections",
+        "- Page 1",
+        "Study Notes",
+        "- Review the highlighted concepts.",
+    ]
+)
+
+CANNED_SEGMENT_NOTES = "\n".join(
+    [
+        "- Mock note condensed by the local stand-in server.",
+        "- Second point from this segment.",
+    ]
+)
+
+
+@dataclass
+class MockServerConfig:
+    latency_ms: float = 0.0
+    # Extra delay on the first request of every TCP connection, standing in for TLS setup to a real provider.
+    handshake_delay_ms: float = 0.0
+    # Streaming responses (`stream: true`) emit `chunk_chars` characters every `token_delay_ms`.
+    token_delay_ms: float = 0.0
+    chunk_chars: int = 4
+    decision: dict | None = None
+    # "canned" answers with `decision` (or CANNED_DECISION); "rules" derives it from the transcript via parse_command.
+    decision_mode: str = "canned"
+    # fixed, uniform (latency +/- jitter), normal (sigma = jitter) or lognormal (median = latency, sigma = jitter / latency).
+    latency_distribution: str = "fixed"
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    # Fraction of requests that stall for `hang_ms`, long enough to hit the client timeout.
+    hang_rate: float = 0.0
+    hang_ms: float = 30000.0
+    seed: int | None = None
+
+
+@dataclass
+class MockServerStats:
+    requests: int = 0
+    connections: int = 0
+    streams_cancelled: int = 0
+    errors: int = 0
+    hangs: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "streams_cancelled": self.streams_cancelled,
+                "errors": self.errors,
+                "hangs": self.hangs,
+            }
+
+
+def _write_chunk(wfile, data: bytes):
+    wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+    wfile.flush()
+
+
+def _stream_event(model: str, delta: dict, finish_reason=None) -> bytes:
+    event = {
+        "id": "mock-completion",
+        "object": "chat.completion.chunk",
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(event)}\n\n".encode("utf-8")
+
+
+def _sample_latency_ms(config: MockServerConfig, rng: random.Random) -> float:
+    base = config.latency_ms
+    jitter = config.latency_jitter_ms
+    if base <= 0 and jitter <= 0:
+        return 0.0
+    if config.latency_distribution == "uniform":
+        return max(0.0, rng.uniform(base - jitter, base + jitter))
+    if config.latency_distribution == "normal":
+        return max(0.0, rng.gauss(base, jitter))
+    if config.latency_distribution == "lognormal" and base > 0:
+        return rng.lognormvariate(math.log(base), jitter / base if jitter else 0.0)
+    return base
+
+
+def _rule_based_decision(transcript: str) -> dict:
+    from retreival_pipeline import parse_command
+
+    parsed = parse_command(transcript)
+    return {
+        "intent": parsed["intent"],
+        "confidence": 0.9,
+        "direct_command": parsed["is_direct"],
+        "refers_to_document": parsed["refers_to_document"],
+        "target_slide": parsed["target_slide"],
+        "search_query": parsed["clean_query"],
+        "target_type": parsed["target_type"],
+    }
+
+
+def _request_transcript(request: dict) -> str:
+    messages = request.get("messages") or []
+    user_message = str(messages[-1].get("content") or "") if messages else ""
+    match = re.search(r"^Transcript:\s*(.*)$", user_message, re.MULTILINE)
+    return match.group(1).strip() if match else user_message
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self._handshake_pending = True
+        with self.server.stats.lock:
+            self.server.stats.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, content: str, model: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        config = self.server.config
+        step = max(1, config.chunk_chars)
+        try:
+            for index in range(0, len(content), step):
+                if config.token_delay_ms > 0:
+                    time.sleep(config.token_delay_ms / 1000)
+                _write_chunk(self.wfile, _stream_event(model, {"content": content[index:index + step]}))
+            _write_chunk(self.wfile, _stream_event(model, {}, "stop"))
+            _write_chunk(self.wfile, b"data: [DONE]\n\n")
+            _write_chunk(self.wfile, b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading once its decision was settled.
+            with self.server.stats.lock:
+                self.server.stats.streams_cancelled += 1
+            self.close_connection = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        config = self.server.config
+        with self.server.lock:
+            roll = self.server.rng.random()
+            delay_ms = _sample_latency_ms(config, self.server.rng)
+        with self.server.stats.lock:
+            self.server.stats.requests += 1
+
+        if self._handshake_pending:
+            delay_ms += config.handshake_delay_ms
+            self._handshake_pending = False
+        if roll < config.hang_rate:
+            with self.server.stats.lock:
+                self.server.stats.hangs += 1
+            delay_ms += config.hang_ms
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000)
+
+        if roll >= 1 - config.error_rate:
+            with self.server.stats.lock:
+                self.server.stats.errors += 1
+            self._send_json(config.error_status, {"error": {"message": "mock provider error", "code": config.error_status}})
+            return
+
+        system_prompt = str((request.get("messages") or [{}])[0].get("content") or "")
+        if "lecture summaries" in system_prompt:
+            content = CANNED_SUMMARY
+        elif "running summary" in system_prompt:
+            content = CANNED_SEGMENT_NOTES
+        elif config.decision_mode == "rules":
+            content = json.dumps(_rule_based_decision(_request_transcript(request)))
+        else:
+            content = json.dumps(config.decision or CANNED_DECISION)
+        if request.get("stream"):
+            self._send_stream(content, request.get("model", "mock"))
+            return
+
+        if config.token_delay_ms > 0:
+            # A buffered completion still takes the full generation time before anything is sent.
+            chunk_count = -(-len(content) // max(1, config.chunk_chars))
+            time.sleep(chunk_count * config.token_delay_ms / 1000)
+        self._send_json(
+            200,
+            {
+                "id": "mock-completion",
+                "object": "chat.completion",
+                "model": request.get("model", "mock"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            },
+        )
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, config: MockServerConfig | None = None):
+    """Starts the stand-in on a background thread and returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), MockLLMHandler)
+    server.daemon_threads = True
+    server.config = config or MockServerConfig()
+    server.stats = MockServerStats()
+    server.rng = random.Random(server.config.seed)
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "normal", "lognormal"], default="fixed")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--token-delay-ms", type=float, default=0.0)
+    parser.add_argument("--chunk-chars", type=int, default=4)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--hang-ms", type=float, default=30000.0)
+    parser.add_argument("--decision-mode", choices=["canned", "rules"], default="rules")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> MockServerConfig:
+    return MockServerConfig(
+        latency_ms=args.latency_ms,
+        token_delay_ms=args.token_delay_ms,
+        chunk_chars=args.chunk_chars,
+        decision_mode=args.decision_mode,
+        latency_distribution=args.latency_distribution,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        hang_rate=args.hang_rate,
+        hang_ms=args.hang_ms,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_mock_server(args.host, args.port, config_from_args(args))
+    print(f"Mock LLM server listening on {base_url} (LLM_API_KEY=mock LLM_BASE_URL={base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        print(json.dumps(server.stats.snapshot()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""Minimal RESP2 stand-in for the Redis commands used by RedisSessionStore.
+
+It keeps everything in memory, ignores key expiry and implements only hashes, lists and pub/sub,
+which is enough to run several backend workers against one store offline:
+    python -m benchmarks.mock_redis_server --port 6390
+    SESSION_STORE_URL=redis://127.0.0.1:6390/0 uvicorn main:app --workers 2
+"""
+import argparse
+import asyncio
+import json
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass
+class MockRedisStats:
+    connections: int = 0
+    commands: int = 0
+    published: int = 0
+    delivered: int = 0
+    unknown_commands: list[str] = field(default_factory=list)
+
+    def snapshot(self) -> dict:
+        return {
+            "connections": self.connections,
+            "commands": self.commands,
+            "published": self.published,
+            "delivered": self.delivered,
+            "unknown_commands": sorted(set(self.unknown_commands)),
+        }
+
+
+def _bulk(value: bytes | None) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(items: list[bytes]) -> bytes:
+    return b"*%d\r\n" % len(items) + b"".join(items)
+
+
+def _integer(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+OK = b"+OK\r\n"
+
+
+class MockRedisServer:
+    def __init__(self):
+        self.hashes: dict[bytes, dict[bytes, bytes]] = {}
+        self.lists: dict[bytes, list[bytes]] = {}
+        self.channels: dict[bytes, set[asyncio.StreamWriter]] = {}
+        self.stats = MockRedisStats()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.server: asyncio.AbstractServer | None = None
+        self.thread: threading.Thread | None = None
+        # Open connection handlers, cancelled on stop so none outlives the loop.
+        self.handlers: set[asyncio.Task] = set()
+
+    async def _read_command(self, reader: asyncio.StreamReader) -> list[bytes] | None:
+        header = await reader.readline()
+        if not header:
+            return None
+        if not header.startswith(b"*"):
+            return header.strip().split()
+
+        parts = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            parts.append((await reader.readexactly(length + 2))[:-2])
+        return parts
+
+    def _subscribe(self, writer: asyncio.StreamWriter, subscribed: set[bytes], channels: list[bytes]) -> bytes:
+        replies = []
+        for channel in channels:
+            subscribed.add(channel)
+            self.channels.setdefault(channel, set()).add(writer)
+            replies.append(_array([_bulk(b"subscribe"), _bulk(channel), _integer(len(subscribed))]))
+        return b"".join(replies)
+
+    def _unsubscribe(self, writer: asyncio.StreamWriter, subscribed: set[bytes], channels: list[bytes]) -> bytes:
+        replies = []
+        for channel in channels or sorted(subscribed):
+            subscribed.discard(channel)
+            listeners = self.channels.get(channel)
+            if listeners is not None:
+                listeners.discard(writer)
+                if not listeners:
+                    self.channels.pop(channel, None)
+            replies.append(_array([_bulk(b"unsubscribe"), _bulk(channel), _integer(len(subscribed))]))
+        if not replies:
+            replies.append(_array([_bulk(b"unsubscribe"), _bulk(None), _integer(0)]))
+        return b"".join(replies)
+
+    def _publish(self, channel: bytes, message: bytes) -> int:
+        listeners = list(self.channels.get(channel, ()))
+        frame = _array([_bulk(b"message"), _bulk(channel), _bulk(message)])
+        for listener in listeners:
+            listener.write(frame)
+        self.stats.published += 1
+        self.stats.delivered += len(listeners)
+        return len(listeners)
+
+    def _execute(self, name: str, args: list[bytes]) -> bytes:
+        if name == "PING":
+            return _bulk(args[0]) if args else b"+PONG\r\n"
+        if name in {"CLIENT", "SELECT", "FLUSHALL"}:
+            if name == "FLUSHALL":
+                self.hashes.clear()
+                self.lists.clear()
+            return OK
+        if name == "EXPIRE":
+            return _integer(int(args[0] in self.hashes or args[0] in self.lists))
+        if name == "HSET":
+            table = self.hashes.setdefault(args[0], {})
+            added = 0
+            for index in range(1, len(args) - 1, 2):
+                added += args[index] not in table
+                table[args[index]] = args[index + 1]
+            return _integer(added)
+        if name == "HGETALL":
+            table = self.hashes.get(args[0], {})
+            return _array([_bulk(item) for pair in table.items() for item in pair])
+        if name == "DEL":
+            removed = 0
+            for key in args:
+                removed += (self.hashes.pop(key, None) is not None) + (self.lists.pop(key, None) is not None)
+            return _integer(removed)
+        if name == "RPUSH":
+            items = self.lists.setdefault(args[0], [])
+            items.extend(args[1:])
+            return _integer(len(items))
+        if name in {"LRANGE", "LTRIM"}:
+            items = self.lists.get(args[0], [])
+            start, stop = int(args[1]), int(args[2])
+            start = max(start + len(items), 0) if start < 0 else start
+            stop = stop + len(items) if stop < 0 else stop
+            selected = items[start : stop + 1]
+            if name == "LRANGE":
+                return _array([_bulk(item) for item in selected])
+            if selected:
+                self.lists[args[0]] = selected
+            else:
+                self.lists.pop(args[0], None)
+            return OK
+        if name == "PUBLISH":
+            return _integer(self._publish(args[0], args[1]))
+
+        self.stats.unknown_commands.append(name)
+        return b"-ERR unknown command '%s'\r\n" % name.encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self.handlers.add(task)
+        self.stats.connections += 1
+        subscribed: set[bytes] = set()
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if not command:
+                    break
+                self.stats.commands += 1
+                name, args = command[0].decode().upper(), command[1:]
+                if name == "QUIT":
+                    writer.write(OK)
+                    break
+                if name == "SUBSCRIBE":
+                    writer.write(self._subscribe(writer, subscribed, args))
+                elif name == "UNSUBSCRIBE":
+                    writer.write(self._unsubscribe(writer, subscribed, args))
+                else:
+                    writer.write(self._execute(name, args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # Only stop() cancels handlers; end quietly instead of having the stream server log the task.
+            pass
+        finally:
+            self._unsubscribe(writer, subscribed, [])
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.handlers.discard(task)
+
+    async def _shutdown(self):
+        self.server.close()
+        for task in list(self.handlers):
+            task.cancel()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serves on a background thread with its own event loop and returns the redis:// URL."""
+        started = threading.Event()
+
+        def _run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, host, port))
+            started.set()
+            self.loop.run_forever()
+            self.loop.close()
+
+        self.thread = threading.Thread(target=_run, daemon=True)
+        self.thread.start()
+        started.wait()
+        bound_port = self.server.sockets[0].getsockname()[1]
+        return f"redis://{host}:{bound_port}/0"
+
+    def stop(self):
+        if self.loop is None or self.loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+def start_mock_redis(host: str = "127.0.0.1", port: int = 0) -> tuple[MockRedisServer, str]:
+    server = MockRedisServer()
+    return server, server.start(host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+
+    server, url = start_mock_redis(args.host, args.port)
+    print(f"Mock Redis server listening on {url} (SESSION_STORE_URL={url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(json.dumps(server.stats.snapshot()))
+
+
+if __name__ == "__main__":
+    main()
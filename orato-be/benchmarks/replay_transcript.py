@@ -0,0 +1,202 @@
+"""Replays a recorded transcript through the live retrieval path and reports per-stage latency.
+
+A transcript is JSONL with one event per line, in the format written by the STT socket when
+STT_TRANSCRIPT_RECORD_DIR is set:
+    {"at": 12.4, "type": "page", "page": 3, "viewerMode": "document"}
+    {"at": 13.0, "type": "interim", "text": "highlight the main"}
+    {"at": 13.6, "type": "final", "text": "highlight the main architecture components"}
+
+Usage (from orato-be/):
+    python -m benchmarks.replay_transcript <doc_id> benchmarks/transcripts/sample_lecture.jsonl --llm stub
+"""
+import argparse
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from benchmarks.common import print_report, summarize_latencies
+
+
+class StubCommandReasoner:
+    """Stands in for LLMCommandReasoner: echoes the regex decision after a fixed delay."""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.is_available = True
+        self.can_reason = True
+        self.calls = 0
+
+    def reason(self, transcript, current_slide=None, session_context="", cache_context=None):
+        from llm_reasoner import LLMCommandDecision
+        from retreival_pipeline import parse_command
+
+        self.calls += 1
+        time.sleep(self.latency_ms / 1000)
+        regex_decision = parse_command(transcript)
+        return LLMCommandDecision(
+            intent=regex_decision["intent"],
+            direct_command=regex_decision["is_direct"],
+            target_slide=regex_decision["target_slide"],
+            search_query=regex_decision["clean_query"],
+            target_type=regex_decision["target_type"],
+            confidence=0.9,
+            refers_to_document=regex_decision["refers_to_document"],
+        )
+
+
+def load_transcript(path: str) -> list[dict]:
+    events = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if line:
+            events.append(json.loads(line))
+
+    events.sort(key=lambda event: float(event.get("at", 0.0)))
+    if events:
+        origin = float(events[0].get("at", 0.0))
+        for event in events:
+            event["at"] = float(event.get("at", 0.0)) - origin
+    return events
+
+
+def replay(doc_id: str, events: list[dict], speed: float, llm_mode: str, llm_latency_ms: float) -> dict:
+    import retreival_pipeline as pipeline
+    from websocket_routes import (
+        _append_recent_utterance,
+        _remember_document_focus,
+        _should_process_interim_preview,
+        _update_doc_focus_score,
+    )
+
+    stub = None
+    if llm_mode == "off":
+        pipeline.COMMAND_REASONER.enabled = False
+    elif llm_mode == "stub":
+        stub = StubCommandReasoner(llm_latency_ms)
+        pipeline.COMMAND_REASONER = stub
+
+    load_started_at = time.perf_counter()
+    vector_db = pipeline.load_vector_db(doc_id)
+    load_ms = (time.perf_counter() - load_started_at) * 1000
+
+    state = {
+        "active_page": 1,
+        "last_preview_transcript": "",
+        "last_preview_signature": None,
+        "last_preview_at": 0.0,
+        "recent_utterances": [],
+        "transcript_history": [],
+        "doc_focus_score": 0,
+        "viewer_mode": "document",
+    }
+    stages: dict[str, list[float]] = defaultdict(list)
+    by_intent: dict[str, dict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+    counts: dict[str, int] = defaultdict(int)
+    replay_started_at = time.perf_counter()
+
+    for event in events:
+        if speed > 0:
+            delay = event["at"] / speed - (time.perf_counter() - replay_started_at)
+            if delay > 0:
+                time.sleep(delay)
+
+        event_type = event.get("type")
+        counts[event_type] += 1
+
+        if event_type == "page":
+            state["active_page"] = int(event.get("page") or 1)
+            state["viewer_mode"] = str(event.get("viewerMode") or "document")
+            state["last_preview_transcript"] = ""
+            state["last_preview_signature"] = None
+            state["last_preview_at"] = 0.0
+            continue
+
+        transcript = str(event.get("text") or "")
+        current_slide = state.get("active_page", 1)
+
+        if event_type == "interim":
+            if not _should_process_interim_preview(state, transcript):
+                counts["interim_skipped"] += 1
+                continue
+
+            started_at = time.perf_counter()
+            preview = pipeline.preview_highlight(transcript, vector_db, 2, current_slide, state)
+            stages["preview_highlight"].append((time.perf_counter() - started_at) * 1000)
+            if preview:
+                counts["preview_actions"] += 1
+                _remember_document_focus(state, preview)
+            continue
+
+        if event_type != "final":
+            continue
+
+        _append_recent_utterance(state, transcript)
+        state["last_preview_transcript"] = ""
+        state["last_preview_signature"] = None
+        state["last_preview_at"] = 0.0
+
+        started_at = time.perf_counter()
+        analysis = pipeline.analyze_query(transcript, current_slide, state, False)
+        analyze_ms = (time.perf_counter() - started_at) * 1000
+        intent = analysis.get("intent", "unknown")
+        stages["analyze_query"].append(analyze_ms)
+        by_intent[intent]["analyze_query"].append(analyze_ms)
+
+        _update_doc_focus_score(state, analysis.get("refers_to_document", True))
+        if not analysis.get("refers_to_document", True):
+            counts["ignored_non_document"] += 1
+            by_intent[intent]["final_total"].append(analyze_ms)
+            stages["final_total"].append(analyze_ms)
+            continue
+
+        started_at = time.perf_counter()
+        action = pipeline.retrieve(transcript, vector_db, 8, current_slide, state, analysis)
+        retrieve_ms = (time.perf_counter() - started_at) * 1000
+        stages["retrieve"].append(retrieve_ms)
+        stages["final_total"].append(analyze_ms + retrieve_ms)
+        by_intent[intent]["retrieve"].append(retrieve_ms)
+        by_intent[intent]["final_total"].append(analyze_ms + retrieve_ms)
+        if action:
+            counts["final_actions"] += 1
+            _remember_document_focus(state, action)
+
+    return {
+        "doc_id": doc_id,
+        "llm_mode": llm_mode,
+        "llm_calls": stub.calls if stub else 0,
+        "speed": speed,
+        "index_load_ms": round(load_ms, 3),
+        "events": dict(counts),
+        "stages": {name: summarize_latencies(values) for name, values in stages.items()},
+        "intents": {
+            intent: {name: summarize_latencies(values) for name, values in intent_stages.items()}
+            for intent, intent_stages in sorted(by_intent.items())
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("doc_id", help="Document whose Chroma index should be loaded")
+    parser.add_argument("transcript", help="Path to a JSONL transcript recording")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed; 0 replays without waiting")
+    parser.add_argument("--llm", choices=["off", "stub", "live"], default="off")
+    parser.add_argument("--llm-latency-ms", type=float, default=600.0, help="Delay of the stub reasoner")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the transcript this many times")
+    args = parser.parse_args()
+
+    events = load_transcript(args.transcript)
+    if args.repeat > 1:
+        duration = (events[-1]["at"] + 1.0) if events else 0.0
+        events = [
+            {**event, "at": event["at"] + duration * round_index}
+            for round_index in range(args.repeat)
+            for event in events
+        ]
+
+    print_report(replay(args.doc_id, events, args.speed, args.llm, args.llm_latency_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Session state and action delivery across workers through the shared session store.
+
+Two RedisSessionStore instances stand in for the viewer worker and the STT worker. The benchmark
+checks that their field-level writes do not clobber each other. It reports state pull/push latency,
+the latency of cross-worker action delivery over pub/sub, and the queue path used while the viewer
+is offline, next to the in-process store. It runs against the local RESP stand-in unless --url is given.
+
+Usage (from orato-be/):
+    python -m benchmarks.session_store --actions 500
+    python -m benchmarks.session_store --url redis://127.0.0.1:6379/15
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.mock_redis_server import start_mock_redis
+
+
+def _sample_state(turn: int) -> dict:
+    return {
+        "active_page": 1,
+        "viewer_mode": "document",
+        "doc_focus_score": turn % 5,
+        "recent_utterances": [f"utterance {index}" for index in range(max(turn - 6, 0), turn)],
+        "transcript_history": [f"utterance {index}" for index in range(max(turn - 80, 0), turn)],
+        "last_focus_text": f"focus text {turn}",
+        "action_seq": turn,
+    }
+
+
+async def _time_state_sync(store, client_id: str, turns: int) -> dict:
+    state = _sample_state(0)
+    pull_ms, push_ms = [], []
+    for turn in range(1, turns + 1):
+        started_at = time.perf_counter()
+        await store.pull(client_id, state)
+        pull_ms.append((time.perf_counter() - started_at) * 1000)
+
+        state.update(_sample_state(turn))
+        started_at = time.perf_counter()
+        await store.push(client_id, state)
+        push_ms.append((time.perf_counter() - started_at) * 1000)
+    return {"pull": summarize_latencies(pull_ms), "push": summarize_latencies(push_ms)}
+
+
+async def _check_field_merge(viewer_store, stt_store, client_id: str) -> dict:
+    viewer_state, stt_state = _sample_state(3), _sample_state(3)
+    await viewer_store.pull(client_id, viewer_state)
+    await viewer_store.push(client_id, viewer_state)
+    await stt_store.pull(client_id, stt_state)
+
+    viewer_state["active_page"] = 7
+    stt_state["doc_focus_score"] = 4
+    await viewer_store.push(client_id, viewer_state)
+    await stt_store.push(client_id, stt_state)
+    await stt_store.pull(client_id, stt_state)
+    await viewer_store.pull(client_id, viewer_state)
+
+    return {
+        "stt_sees_viewer_page": stt_state["active_page"] == 7,
+        "viewer_sees_stt_focus": viewer_state["doc_focus_score"] == 4,
+        "stt_focus_kept": stt_state["doc_focus_score"] == 4,
+    }
+
+
+async def _time_delivery(sender, receiver, client_id: str, actions: int) -> dict:
+    received: dict[int, float] = {}
+    done = asyncio.Event()
+
+    async def _deliver(payload: dict):
+        received[payload["seq"]] = time.perf_counter()
+        if len(received) == actions:
+            done.set()
+
+    await receiver.subscribe(client_id, _deliver)
+    sent_at = {}
+    undelivered = 0
+    for seq in range(actions):
+        sent_at[seq] = time.perf_counter()
+        undelivered += not await sender.publish(client_id, {"type": "action", "seq": seq, "slide": seq % 20})
+    await asyncio.wait_for(done.wait(), timeout=30)
+    await receiver.unsubscribe(client_id)
+
+    return {
+        "actions": actions,
+        "publish_without_receiver": undelivered,
+        "delivery": summarize_latencies([(received[seq] - sent_at[seq]) * 1000 for seq in received]),
+    }
+
+
+async def _time_offline_queue(store, client_id: str, actions: int) -> dict:
+    started_at = time.perf_counter()
+    for seq in range(actions):
+        if not await store.publish(client_id, {"type": "action", "seq": seq}):
+            await store.queue_pending(client_id, {"type": "action", "seq": seq})
+    queue_ms = (time.perf_counter() - started_at) * 1000
+    flushed = await store.take_pending(client_id)
+    return {
+        "actions": actions,
+        "kept_for_reconnect": [payload["seq"] for payload in flushed],
+        "mean_queue_ms": round(queue_ms / actions, 4),
+    }
+
+
+async def _run(args: argparse.Namespace, url: str) -> dict:
+    from session_store import InProcessSessionStore, RedisSessionStore
+
+    in_process = InProcessSessionStore()
+    viewer_store, stt_store = RedisSessionStore(url), RedisSessionStore(url)
+    run_id = f"bench{int(time.time() * 1000)}"
+    try:
+        return {
+            "url": url,
+            "in_process": {
+                "state_sync": await _time_state_sync(in_process, f"{run_id}_local", args.turns),
+                "offline_queue": await _time_offline_queue(in_process, f"{run_id}_local", 20),
+            },
+            "redis": {
+                "field_merge": await _check_field_merge(viewer_store, stt_store, f"{run_id}_merge"),
+                "state_sync": await _time_state_sync(stt_store, f"{run_id}_sync", args.turns),
+                "cross_worker": await _time_delivery(stt_store, viewer_store, f"{run_id}_live", args.actions),
+                "offline_queue": await _time_offline_queue(stt_store, f"{run_id}_offline", 20),
+                "viewer_metrics": viewer_store.metrics(),
+                "stt_metrics": stt_store.metrics(),
+            },
+        }
+    finally:
+        await viewer_store.close()
+        await stt_store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="", help="Real Redis URL; defaults to the local stand-in server")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--actions", type=int, default=500)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_mock_redis()
+    try:
+        report = asyncio.run(_run(args, url))
+        if server is not None:
+            report["stand_in"] = server.stats.snapshot()
+    finally:
+        if server is not None:
+            server.stop()
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
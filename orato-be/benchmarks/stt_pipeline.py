@@ -0,0 +1,131 @@
+"""Inline STT result handling against the per-session pipeline, with simulated slow retrieval.
+
+A synthetic stream sends growing interim transcripts and then a final per utterance. The stand-in
+preview and retrieval functions sleep in the thread pool like the real Chroma calls. The report
+covers how late each STT response was read, the time from a final to its action, and how many
+previews were sent after the final of their utterance had already arrived.
+
+Usage (from orato-be/):
+    python -m benchmarks.stt_pipeline --utterances 10 --preview-ms 300 --retrieve-ms 450
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+
+
+WORDS = "today we compare gradient descent with momentum and look at the convergence plot on this slide".split()
+
+
+def _build_stream(utterances: int, interims: int, interim_gap_ms: float, final_gap_ms: float) -> list[tuple[float, bool, str]]:
+    events, at_ms = [], 0.0
+    for utterance in range(utterances):
+        for step in range(1, interims + 1):
+            at_ms += interim_gap_ms
+            words = WORDS[: 4 + step * 2]
+            events.append((at_ms, False, f"{utterance} " + " ".join(words)))
+        at_ms += final_gap_ms
+        events.append((at_ms, True, f"{utterance} " + " ".join(WORDS)))
+    return events
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent: list[tuple[float, dict]] = []
+
+    async def send_text(self, text: str):
+        self.sent.append((time.perf_counter(), json.loads(text)))
+
+
+async def _run_mode(mode: str, args: argparse.Namespace) -> dict:
+    import websocket_routes
+
+    client_id = f"bench_{mode}"
+    socket = RecordingSocket()
+    websocket_routes.active_connections[client_id] = websocket_routes.ViewerConnection(socket, "json")
+    websocket_routes.client_states[client_id] = websocket_routes._new_client_state()
+
+    def preview_highlight(transcript, vector_db, k, current_slide, state):
+        time.sleep(args.preview_ms / 1000)
+        return {"intent": "highlight", "slide": 1, "bbox": [0, 0, 1, 1], "section": "", "title": transcript}
+
+    def retrieve(transcript, vector_db, k, current_slide, state, analysis):
+        time.sleep(args.retrieve_ms / 1000)
+        return {"intent": "highlight", "slide": 2, "bbox": [0, 0, 1, 1], "section": "", "title": transcript}
+
+    def plan_command(transcript, state, prefer_llm):
+        return {"intent": "highlight", "refers_to_document": True}, False
+
+    pipeline = websocket_routes.SessionPipeline(client_id, object(), plan_command, None, preview_highlight, retrieve)
+    stream = _build_stream(args.utterances, args.interims, args.interim_gap_ms, args.final_gap_ms)
+    read_lag_ms, final_arrivals = [], {}
+
+    started_at = time.perf_counter()
+    for at_ms, is_final, transcript in stream:
+        arrival = started_at + at_ms / 1000
+        delay = arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        read_lag_ms.append(max(time.perf_counter() - arrival, 0.0) * 1000)
+
+        if is_final:
+            final_arrivals[transcript] = arrival
+            if mode == "inline":
+                await pipeline._handle_final(transcript)
+            else:
+                pipeline.submit_final(transcript)
+        elif mode == "inline":
+            user_state = websocket_routes.client_states[client_id]
+            if websocket_routes._should_process_interim_preview(user_state, transcript):
+                await pipeline._handle_interim(transcript)
+        else:
+            pipeline.submit_interim(transcript)
+
+    await pipeline.close()
+    finished_ms = (time.perf_counter() - started_at) * 1000
+
+    final_latency_ms = [
+        (sent_at - final_arrivals[payload["title"]]) * 1000
+        for sent_at, payload in socket.sent
+        if not payload.get("preview") and payload.get("title") in final_arrivals
+    ]
+    utterance_finals = {transcript.split()[0]: arrival for transcript, arrival in final_arrivals.items()}
+    previews = [(sent_at, payload) for sent_at, payload in socket.sent if payload.get("preview")]
+    stale_previews = sum(
+        1 for sent_at, payload in previews if sent_at >= utterance_finals.get(payload["title"].split()[0], float("inf"))
+    )
+    websocket_routes.active_connections.pop(client_id, None)
+    return {
+        "stream_read_lag": summarize_latencies(read_lag_ms),
+        "final_to_action": summarize_latencies(final_latency_ms),
+        "previews_sent": len(previews),
+        "previews_after_final": stale_previews,
+        "stream_ms": round(stream[-1][0], 1),
+        "finished_ms": round(finished_ms, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=10)
+    parser.add_argument("--interims", type=int, default=6)
+    parser.add_argument("--interim-gap-ms", type=float, default=150.0)
+    parser.add_argument("--final-gap-ms", type=float, default=100.0)
+    parser.add_argument("--preview-ms", type=float, default=300.0)
+    parser.add_argument("--retrieve-ms", type=float, default=450.0)
+    args = parser.parse_args()
+
+    report = {"config": vars(args)}
+    for mode in ("inline", "pipeline"):
+        report[mode] = asyncio.run(_run_mode(mode, args))
+
+    import websocket_routes
+
+    report["pipeline_metrics"] = websocket_routes._pipeline_metrics()
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""A long lecture over a recognizer with a stream duration limit, with and without stream rotation.
+
+A scripted stand-in for Google streaming recognition hears words by the position of each audio frame in
+the lecture; the frame index is stamped into its first samples. Like the real service, it fails any
+stream older than --limit-seconds. It finalizes an utterance shortly after the utterance ends, or on
+half-close with whatever it heard. Time is compressed by --speed: limits and rotation thresholds are
+divided by it, and audio still carries its real duration.
+
+"before" runs a single stream that gives up on the first error, as the STT socket did. The "after"
+variants run `RotatingSpeechBackend` with proactive (after-final) and forced mid-utterance rotation.
+The report gives completed audio, lost and duplicated words, and rotation counters.
+
+Usage (from orato-be/):
+    python -m benchmarks.stt_rotation --minutes 90 --speed 100
+"""
+import argparse
+import asyncio
+import difflib
+import random
+import time
+
+import numpy as np
+
+from benchmarks.common import print_report
+
+
+SAMPLE_RATE = 16000
+FRAME_S = 0.1
+VOCABULARY = (
+    "gradient descent momentum learning rate schedule convex loss surface minimum batch epoch weight update "
+    "matrix vector projection eigenvalue basis kernel attention layer token embedding softmax entropy "
+    "probability prior posterior sample variance bias regularization dropout overfitting validation"
+).split()
+
+
+def _lecture(minutes: float, seed: int) -> list[tuple[float, float, list[str]]]:
+    rng = random.Random(seed)
+    utterances, at = [], 1.0
+    while at < minutes * 60:
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(4, 18))]
+        duration = len(words) / rng.uniform(2.2, 3.0)
+        utterances.append((at, at + duration, words))
+        at += duration + rng.uniform(0.5, 2.0)
+    return utterances
+
+
+def _frame(index: int) -> bytes:
+    samples = np.zeros(int(SAMPLE_RATE * FRAME_S), dtype="<i2")
+    samples[0], samples[1] = index & 0x7FFF, index >> 15
+    return samples.tobytes()
+
+
+def _frame_index(frame: bytes) -> int:
+    samples = np.frombuffer(frame[:4], dtype="<i2")
+    return int(samples[0]) | (int(samples[1]) << 15)
+
+
+def _make_backend(utterances, limit_s: float, **rotation):
+    from stt_backends import RotatingSpeechBackend, SpeechResult
+
+    words_by_frame: dict[int, list[tuple[int, str]]] = {}
+    for number, (start, end, words) in enumerate(utterances):
+        for position, word in enumerate(words):
+            at = start + position * (end - start) / len(words)
+            words_by_frame.setdefault(int(at / FRAME_S), []).append((number, word))
+
+    class ScriptedRecognizer(RotatingSpeechBackend):
+        async def _recognize(self, frames, sample_rate):
+            opened_at = time.monotonic()
+            heard: list[str] = []
+            open_utterance = None
+            received_s = 0.0
+
+            def final():
+                text = " ".join(heard)
+                return SpeechResult(text[:1].upper() + text[1:] + ".", True), received_s
+
+            while True:
+                frame = await frames.get()
+                if frame is None:
+                    break
+                if time.monotonic() - opened_at > limit_s:
+                    raise RuntimeError("Exceeded maximum allowed stream duration of 305 seconds.")
+                index = _frame_index(frame)
+                received_s += FRAME_S
+                for number, word in words_by_frame.get(index, []):
+                    if open_utterance is not None and number != open_utterance:
+                        yield final()
+                        heard = []
+                    open_utterance = number
+                    heard.append(word)
+                    yield SpeechResult(" ".join(heard), False), None
+                if open_utterance is not None and index * FRAME_S >= utterances[open_utterance][1] + 0.3:
+                    yield final()
+                    heard, open_utterance = [], None
+            if heard:
+                yield final()
+
+    return ScriptedRecognizer(**rotation)
+
+
+async def _run(utterances, args, **rotation) -> dict:
+    from stt_backends import _normalized_words, stream_counters
+
+    for name in stream_counters:
+        stream_counters[name] = 0.0 if isinstance(stream_counters[name], float) else 0
+    backend = _make_backend(utterances, args.limit_seconds / args.speed, **rotation)
+    total_frames = int((utterances[-1][1] + 2.0) / FRAME_S)
+    sent = {"frames": 0}
+
+    async def audio():
+        started_at = time.perf_counter()
+        for index in range(total_frames):
+            if index % 10 == 0:
+                delay = started_at + index * FRAME_S / args.speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            sent["frames"] = index + 1
+            yield _frame(index)
+
+    finals, error = [], None
+    try:
+        async for result in backend.stream(audio(), SAMPLE_RATE):
+            if result.is_final:
+                finals.append(result.transcript)
+    except Exception as exc:
+        error = str(exc)
+
+    expected = [word for _, _, words in utterances for word in words]
+    recognized = [word for text in finals for word in _normalized_words(text)]
+    lost = duplicated = 0
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, expected, recognized, autojunk=False).get_opcodes():
+        if tag in {"delete", "replace"}:
+            lost += i2 - i1
+        if tag in {"insert", "replace"}:
+            duplicated += j2 - j1
+    return {
+        "audio_completed_s": round(sent["frames"] * FRAME_S, 1),
+        "audio_total_s": round(total_frames * FRAME_S, 1),
+        "error": error,
+        "finals": len(finals),
+        "expected_words": len(expected),
+        "lost_words": lost,
+        "duplicated_words": duplicated,
+        "streams": {name: round(value, 1) for name, value in stream_counters.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=90.0)
+    parser.add_argument("--speed", type=float, default=100.0)
+    parser.add_argument("--limit-seconds", type=float, default=305.0)
+    parser.add_argument("--rotate-seconds", type=float, default=240.0)
+    parser.add_argument("--max-seconds", type=float, default=290.0)
+    parser.add_argument("--replay-ms", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    utterances = _lecture(args.minutes, args.seed)
+    scale = args.speed
+    never = float("inf")
+    report = {"minutes": args.minutes, "speed": args.speed, "utterances": len(utterances)}
+    report["before_single_stream"] = asyncio.run(
+        _run(utterances, args, rotate_seconds=never, max_seconds=never, replay_ms=args.replay_ms, max_restarts=0)
+    )
+    report["after_rotation"] = asyncio.run(
+        _run(
+            utterances,
+            args,
+            rotate_seconds=args.rotate_seconds / scale,
+            max_seconds=args.max_seconds / scale,
+            replay_ms=args.replay_ms,
+        )
+    )
+    report["after_forced_rotation_only"] = asyncio.run(
+        _run(
+            utterances,
+            args,
+            rotate_seconds=never,
+            max_seconds=args.max_seconds / scale,
+            replay_ms=args.replay_ms,
+        )
+    )
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import random
+
+
+TOPICS = [
+    "binary search trees", "hash tables", "dynamic programming", "graph traversal", "recursion",
+    "sorting algorithms", "linked lists", "memory management", "process scheduling", "virtual memory",
+    "tcp congestion control", "dns resolution", "public key cryptography", "neural networks",
+    "gradient descent", "linear regression", "decision trees", "database indexing", "query optimization",
+    "transaction isolation", "photosynthesis", "cell division", "protein synthesis", "plate tectonics",
+    "the water cycle", "supply and demand", "inflation", "the french revolution", "world war one",
+    "thermodynamics", "electromagnetic induction", "quantum tunnelling", "organic chemistry",
+    "acid base reactions", "probability distributions", "hypothesis testing", "matrix multiplication",
+    "eigenvalues", "fourier transforms", "compiler design", "lexical analysis", "garbage collection",
+]
+
+ASPECTS = [
+    "definition", "key properties", "worked example", "common mistakes", "time complexity",
+    "real world applications", "historical context", "comparison with alternatives", "summary",
+    "practice questions", "limitations", "implementation steps", "diagram walkthrough",
+]
+
+FILLER = [
+    "students should note", "in practice", "as we saw earlier", "the main idea is", "remember that",
+    "for the exam", "this explains why", "consider the case where", "importantly", "by contrast",
+]
+
+
+def synthetic_deck(num_slides: int, blocks_per_slide: int = 4, seed: int = 7) -> dict:
+    """Builds parsed slide data in the same shape as parsing.parse_ppt / parse_pdf."""
+    rng = random.Random(seed)
+    parsed_data = {}
+
+    for slide_id in range(1, num_slides + 1):
+        topic = TOPICS[(slide_id - 1) % len(TOPICS)]
+        aspect = rng.choice(ASPECTS)
+        title = f"{topic.title()}: {aspect.title()}"
+        objects = []
+        for block_index in range(blocks_per_slide):
+            detail = rng.choice(ASPECTS)
+            text = (
+                f"{rng.choice(FILLER).capitalize()}, the {detail} of {topic} "
+                f"{rng.choice(['relates to', 'depends on', 'is illustrated by', 'contrasts with'])} "
+                f"{rng.choice(TOPICS)} in lecture {slide_id}."
+            )
+            top = 0.15 + block_index * (0.8 / max(1, blocks_per_slide))
+            objects.append(
+                {
+                    "id": f"block_{block_index}",
+                    "type": "text",
+                    "text": text,
+                    "bbox": (0.08, round(top, 4), 0.84, 0.12),
+                }
+            )
+        parsed_data[slide_id] = {"title": title, "objects": objects}
+
+    return parsed_data
+
+
+def synthetic_queries(parsed_data: dict, count: int, seed: int = 11) -> list[dict]:
+    """Samples spoken-style queries paired with the slide they were drawn from."""
+    rng = random.Random(seed)
+    slide_ids = list(parsed_data)
+    queries = []
+
+    for _ in range(count):
+        slide_id = rng.choice(slide_ids)
+        slide = parsed_data[slide_id]
+        block = rng.choice(slide["objects"])
+        words = [word.strip(".,:").lower() for word in block["text"].split() if len(word) > 3]
+        rng.shuffle(words)
+        queries.append(
+            {
+                "query": " ".join(words[:5]),
+                "slide": slide_id,
+            }
+        )
+
+    return queries
+
+
+def synthetic_speech(seconds: float, sample_rate: int = 48000, speech_ratio: float = 0.6, seed: int = 7):
+    """
+    Mono int16 samples that alternate voiced bursts (harmonics with a wandering pitch) and room-noise pauses.
+
+    Returns (samples, voiced_mask) where voiced_mask marks the samples inside speech bursts.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    samples = rng.normal(0, 60, total)
+    voiced = np.zeros(total, dtype=bool)
+
+    position = int(rng.uniform(0.2, 0.6) * sample_rate)
+    while position < total:
+        burst = int(rng.uniform(0.6, 2.4) * sample_rate)
+        end = min(total, position + burst)
+        t = np.arange(end - position) / sample_rate
+        pitch = rng.uniform(100, 220) * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+        tone = sum(np.sin(harmonic * phase) / harmonic for harmonic in range(1, 12))
+        envelope = np.clip(np.sin(np.pi * np.arange(end - position) / max(1, end - position)) * 3, 0, 1)
+        syllables = 0.55 + 0.45 * np.sin(2 * np.pi * rng.uniform(3, 6) * t) ** 2
+        samples[position:end] += tone * envelope * syllables * rng.uniform(2500, 6000)
+        samples[position:end] += rng.normal(0, 400, end - position) * envelope
+        voiced[position:end] = True
+        pause = burst * (1 - speech_ratio) / speech_ratio
+        position = end + int(rng.uniform(0.5, 1.5) * pause)
+
+    return np.clip(samples, -32768, 32767).astype("<i2"), voiced
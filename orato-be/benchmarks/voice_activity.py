@@ -0,0 +1,103 @@
+"""How much STT audio the voice activity gate suppresses, and how much speech it keeps.
+
+Synthetic lectures alternate voiced bursts and room-noise pauses at several speech ratios and noise
+levels, optionally with mains hum. The 16 kHz audio is coalesced into recognizer frames and passed through
+`VoiceActivityGate`; the report gives the suppressed fraction, recognizer requests per minute with and
+without the gate, the share of speech frames forwarded and how many speech onsets had their first frame
+forwarded. Every scenario, sparse (0.3) and dense (0.6) speech alike, must keep nearly all speech while
+dropping most of the pauses, or the run fails.
+
+Usage (from orato-be/):
+    python -m benchmarks.voice_activity --seconds 300 --speech-ratios 0.3 0.6 --noise-levels 60 400
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import print_report
+from benchmarks.synthetic import synthetic_speech
+
+
+SAMPLE_RATE = 16000
+MIN_SPEECH_FRAMES_SENT = 0.99
+MIN_ONSET_FRAMES_SENT = 0.95
+# Hangover and pre-roll surround every pause, so dense speech with short pauses forwards the most silence.
+MAX_SILENT_FRAMES_SENT = 0.35
+
+
+def _run(samples: np.ndarray, voiced: np.ndarray, frame_ms: int) -> dict:
+    from audio_pipeline import FrameCoalescer, VoiceActivityGate, _suppressed_fraction
+
+    coalescer = FrameCoalescer(SAMPLE_RATE, frame_ms)
+    gate = VoiceActivityGate(SAMPLE_RATE, frame_ms)
+    frames = coalescer.push(samples.tobytes()) + coalescer.flush()
+
+    frame_samples = coalescer.frame_bytes // 2
+    index_of = {id(frame): index for index, frame in enumerate(frames)}
+    sent = np.zeros(len(frames), dtype=bool)
+    counters = {"bytes_out": 0, "bytes_suppressed": 0}
+
+    started_at = time.perf_counter()
+    for frame in frames:
+        kept, dropped = gate.push(frame)
+        for item in kept:
+            sent[index_of[id(item)]] = True
+        counters["bytes_out"] += sum(len(item) for item in kept)
+        counters["bytes_suppressed"] += sum(len(item) for item in dropped)
+    counters["bytes_suppressed"] += sum(len(item) for item in gate.flush())
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+
+    speech_frames = np.array(
+        [voiced[index * frame_samples : (index + 1) * frame_samples].any() for index in range(len(frames))]
+    )
+    onsets = np.flatnonzero(speech_frames[1:] & ~speech_frames[:-1]) + 1
+    minutes = len(samples) / SAMPLE_RATE / 60
+    return {
+        "suppressed_fraction": _suppressed_fraction(counters),
+        "speech_fraction": round(float(speech_frames.mean()), 3),
+        "requests_per_minute_without_gate": round(len(frames) / minutes, 1),
+        "requests_per_minute_with_gate": round(int(sent.sum()) / minutes, 1),
+        "speech_frames_sent": round(float(sent[speech_frames].mean()), 4) if speech_frames.any() else None,
+        "silent_frames_sent": round(float(sent[~speech_frames].mean()), 4) if (~speech_frames).any() else None,
+        "onsets": len(onsets),
+        # The gate usually fires a frame or two after the true onset; pre-roll is what makes these sent.
+        "onset_frames_sent": int(sent[onsets].sum()),
+        "gate_us_per_frame": round(elapsed_ms * 1000 / len(frames), 2),
+    }
+
+
+def _check(name: str, result: dict):
+    assert result["speech_frames_sent"] >= MIN_SPEECH_FRAMES_SENT, f"{name}: gate dropped speech: {result}"
+    assert result["onset_frames_sent"] >= MIN_ONSET_FRAMES_SENT * result["onsets"], f"{name}: onsets clipped: {result}"
+    assert result["silent_frames_sent"] <= MAX_SILENT_FRAMES_SENT, f"{name}: too much silence forwarded: {result}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=300.0)
+    parser.add_argument("--frame-ms", type=int, default=100)
+    parser.add_argument("--speech-ratios", type=float, nargs="+", default=[0.3, 0.6])
+    parser.add_argument("--noise-levels", type=float, nargs="+", default=[60, 400])
+    parser.add_argument("--hum", action="store_true", help="Add 50 Hz mains hum at about -45 dBFS.")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    scenarios = {}
+    for ratio in args.speech_ratios:
+        speech, voiced = synthetic_speech(args.seconds, SAMPLE_RATE, speech_ratio=ratio, seed=args.seed)
+        for noise in args.noise_levels:
+            samples = speech.astype(np.float64) + rng.normal(0, noise, len(speech))
+            if args.hum:
+                samples += 250 * np.sin(2 * np.pi * 50 * np.arange(len(speech)) / SAMPLE_RATE)
+            samples = np.clip(samples, -32768, 32767).astype("<i2")
+            scenarios[f"speech_{ratio}_noise_{noise:g}"] = _run(samples, voiced, args.frame_ms)
+
+    print_report({"audio_seconds": args.seconds, "frame_ms": args.frame_ms, "hum": args.hum, "scenarios": scenarios})
+    for name, result in scenarios.items():
+        _check(name, result)
+
+
+if __name__ == "__main__":
+    main()
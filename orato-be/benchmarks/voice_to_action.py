@@ -0,0 +1,165 @@
+"""Offline end-to-end run of the STT socket: audio stage, replay recognizer, session pipeline and viewer actions.
+
+`stt_endpoint` runs unchanged against an in-memory socket. The socket streams synthetic 48 kHz speech in
+the frontend's 4096-sample messages, and the replay backend emits a recorded transcript on its own
+timestamps. Actions arrive on an in-memory viewer connection. By default, preview and retrieval are
+stand-ins that sleep like the Chroma calls. Pass `--doc-id` to use the real retrieval tools against an
+indexed document. The report covers the time from each final to its action, from each interim to its
+preview, and the audio stage counters.
+
+Usage (from orato-be/):
+    python -m benchmarks.voice_to_action --script benchmarks/transcripts/sample_lecture.jsonl --speed 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import print_report, summarize_latencies
+from benchmarks.synthetic import synthetic_speech
+
+
+CLIENT_SAMPLE_RATE = 48000
+CLIENT_CHUNK_SAMPLES = 4096
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent: list[tuple[float, dict]] = []
+
+    async def send_text(self, text: str):
+        self.sent.append((time.perf_counter(), json.loads(text)))
+
+
+class _ClientState:
+    name = "CONNECTED"
+
+
+class AudioSocket:
+    """Plays PCM messages in real time (divided by speed), then disconnects like a closed browser tab."""
+
+    def __init__(self, messages: list[bytes], speed: float):
+        self.messages = messages
+        self.interval = CLIENT_CHUNK_SAMPLES / CLIENT_SAMPLE_RATE / speed
+        self.client_state = _ClientState()
+        self.started_at = None
+        self.index = 0
+
+    async def accept(self):
+        self.started_at = time.perf_counter()
+
+    async def receive_bytes(self) -> bytes:
+        from fastapi import WebSocketDisconnect
+
+        if self.index >= len(self.messages):
+            raise WebSocketDisconnect(code=1000)
+        delay = self.started_at + self.index * self.interval - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.index += 1
+        return self.messages[self.index - 1]
+
+    async def close(self):
+        self.client_state.name = "DISCONNECTED"
+
+
+def _stand_in_tools(preview_ms: float, retrieve_ms: float):
+    def plan_command(transcript, state, prefer_llm):
+        return {"intent": "highlight", "refers_to_document": True}, False
+
+    def preview_highlight(transcript, vector_db, k, current_slide, state):
+        time.sleep(preview_ms / 1000)
+        return {"intent": "highlight", "slide": 1, "bbox": [0, 0, 1, 1], "section": "", "title": transcript}
+
+    def retrieve(transcript, vector_db, k, current_slide, state, analysis):
+        time.sleep(retrieve_ms / 1000)
+        return {"intent": "highlight", "slide": 2, "bbox": [0, 0, 1, 1], "section": "", "title": transcript}
+
+    return plan_command, None, preview_highlight, retrieve
+
+
+async def _run(args: argparse.Namespace) -> dict:
+    import websocket_routes
+    from audio_pipeline import audio_totals
+    from stt_backends import ReplaySpeechBackend, load_replay_script
+
+    script = load_replay_script(args.script)
+    emitted: list[tuple[float, bool, str]] = []
+
+    class TimedReplayBackend(ReplaySpeechBackend):
+        async def stream(self, audio, sample_rate):
+            async for result in super().stream(audio, sample_rate):
+                emitted.append((time.perf_counter(), result.is_final, result.transcript))
+                yield result
+
+    websocket_routes.create_speech_backend = lambda: TimedReplayBackend(script, args.speed)
+    if not args.doc_id:
+        tools = _stand_in_tools(args.preview_ms, args.retrieve_ms)
+        websocket_routes._load_retrieval_tools = lambda: tools
+
+        async def _ready_index(doc_id):
+            return object()
+
+        websocket_routes._prefetch_document_index = _ready_index
+
+    client_id = f"bench_{args.doc_id or 'offline'}"
+    viewer = RecordingSocket()
+    websocket_routes.active_connections[client_id] = websocket_routes.ViewerConnection(viewer, "json")
+    websocket_routes.client_states[client_id] = websocket_routes._new_client_state()
+
+    seconds = script[-1]["at"] + 1.5 if script else 1.0
+    speech, _ = synthetic_speech(seconds, CLIENT_SAMPLE_RATE, seed=args.seed)
+    messages = [
+        speech[start : start + CLIENT_CHUNK_SAMPLES].tobytes() for start in range(0, len(speech), CLIENT_CHUNK_SAMPLES)
+    ]
+
+    started_at = time.perf_counter()
+    await websocket_routes.stt_endpoint(AudioSocket(messages, args.speed), client_id)
+    elapsed_s = time.perf_counter() - started_at
+
+    final_to_action_ms, interim_to_preview_ms = [], []
+    for emitted_at, is_final, transcript in emitted:
+        matches = [
+            sent_at
+            for sent_at, payload in viewer.sent
+            if payload.get("title") == transcript and bool(payload.get("preview")) != is_final and sent_at >= emitted_at
+        ]
+        if matches:
+            (final_to_action_ms if is_final else interim_to_preview_ms).append((matches[0] - emitted_at) * 1000)
+
+    finals = sum(1 for _, is_final, _ in emitted if is_final)
+    return {
+        "script_events": len(script),
+        "speed": args.speed,
+        "elapsed_s": round(elapsed_s, 2),
+        "finals": finals,
+        "finals_with_action": len(final_to_action_ms),
+        "interims": len(emitted) - finals,
+        "interims_with_preview": len(interim_to_preview_ms),
+        "final_to_action": summarize_latencies(final_to_action_ms),
+        "interim_to_preview": summarize_latencies(interim_to_preview_ms),
+        "viewer_messages": len(viewer.sent),
+        "stt_audio": dict(audio_totals),
+        "stt_pipeline": websocket_routes._pipeline_metrics(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", default="benchmarks/transcripts/sample_lecture.jsonl")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--doc-id", default="", help="Use the real retrieval tools against this indexed document.")
+    parser.add_argument("--preview-ms", type=float, default=120.0)
+    parser.add_argument("--retrieve-ms", type=float, default=250.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # The rolling summary would call the LLM when the socket closes; it is not part of this path.
+    os.environ.setdefault("ROLLING_SUMMARY_ENABLED", "false")
+    report = asyncio.run(_run(args))
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import numpy as np
+
+
+SUPPORTED_PRECISIONS = {"float16", "int8"}
+
+
+class CompactVectorIndex:
+    """In-memory copy of a document index with float16 or int8 (per-vector scale) vectors.
+
+    Searches return squared L2 distances (lower is closer), the metric Chroma's default space uses,
+    so they rank the same way as `similarity_search_with_score` on the full-precision collection.
+    """
+
+    block_rows = 4096
+
+    def __init__(self, contents, metadatas, embeddings, precision: str = "float16", embedding_model=None):
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(f"Unsupported compact precision: {precision}")
+
+        from langchain_core.documents import Document
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(contents):
+            raise ValueError("Embeddings do not match the stored documents")
+
+        self.precision = precision
+        self.embedding_model = embedding_model
+        self.documents = [
+            Document(page_content=content or "", metadata=metadata or {})
+            for content, metadata in zip(contents, metadatas)
+        ]
+        self.slides = np.asarray([int((metadata or {}).get("slide") or 0) for metadata in metadatas], dtype=np.int32)
+        self.norms_sq = np.einsum("ij,ij->i", vectors, vectors).astype(np.float32)
+
+        if precision == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        else:
+            self.vectors = vectors.astype(np.float16)
+            self.scales = None
+
+    @classmethod
+    def from_chroma(cls, vector_db, precision: str = "float16", embedding_model=None):
+        stored = vector_db.get(include=["documents", "metadatas", "embeddings"])
+        return cls(
+            stored.get("documents") or [],
+            stored.get("metadatas") or [],
+            stored.get("embeddings") if stored.get("embeddings") is not None else [],
+            precision=precision,
+            embedding_model=embedding_model,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        scales_bytes = self.scales.nbytes if self.scales is not None else 0
+        return self.vectors.nbytes + scales_bytes + self.norms_sq.nbytes + self.slides.nbytes
+
+    @property
+    def float32_nbytes(self) -> int:
+        return self.vectors.size * 4 + self.norms_sq.nbytes + self.slides.nbytes
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def _candidate_rows(self, filter: dict | None):
+        slide_filter = (filter or {}).get("slide")
+        if slide_filter is None:
+            return None
+        if isinstance(slide_filter, dict):
+            wanted = slide_filter.get("$in") or []
+        else:
+            wanted = [slide_filter]
+        return np.flatnonzero(np.isin(self.slides, np.asarray(wanted, dtype=np.int32)))
+
+    def _dot_products(self, query: np.ndarray, rows) -> np.ndarray:
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        scales = self.scales if rows is None or self.scales is None else self.scales[rows]
+        dots = np.empty(len(vectors), dtype=np.float32)
+
+        # Widen one block at a time so the float32 scratch space stays small and BLAS does the dot products.
+        for start in range(0, len(vectors), self.block_rows):
+            block = vectors[start:start + self.block_rows].astype(np.float32)
+            dots[start:start + len(block)] = block @ query
+
+        if scales is not None:
+            dots *= scales
+        return dots
+
+    def similarity_search_by_vector_with_distances(self, embedding, k: int = 4, filter: dict | None = None):
+        if not self.documents:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        rows = self._candidate_rows(filter)
+        if rows is not None and not len(rows):
+            return []
+
+        norms_sq = self.norms_sq if rows is None else self.norms_sq[rows]
+        # Quantization can push an exact match a hair below zero.
+        distances = np.maximum(norms_sq + float(query @ query) - 2.0 * self._dot_products(query, rows), 0.0)
+
+        k = min(max(1, k), len(distances))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        row_ids = top if rows is None else rows[top]
+        return [(self.documents[int(row)], float(distances[index])) for row, index in zip(row_ids, top)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict | None = None):
+        return self.similarity_search_by_vector_with_distances(
+            self.embedding_model.embed_query(query),
+            k=k,
+            filter=filter,
+        )
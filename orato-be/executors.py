@@ -0,0 +1,155 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from metrics import register_metrics_source
+
+
+LIVE_EXECUTOR_WORKERS = int(os.getenv("LIVE_EXECUTOR_WORKERS", str(min(8, (os.cpu_count() or 2) + 2))))
+# "thread" shares this interpreter's GIL and its already-loaded models. "process" moves parsing and embedding of
+# uploads off the GIL, but each spawned worker imports torch and loads its own MiniLM copy (roughly 0.5-1 GB
+# resident per worker), so only opt in on hosts with memory to spare.
+INGESTION_EXECUTOR_KIND = os.getenv("INGESTION_EXECUTOR_KIND", "thread").strip().lower() or "thread"
+INGESTION_EXECUTOR_WORKERS = int(os.getenv("INGESTION_EXECUTOR_WORKERS", "1"))
+INGESTION_EXECUTOR_START_METHOD = os.getenv("INGESTION_EXECUTOR_START_METHOD", "spawn").strip() or "spawn"
+BACKGROUND_EXECUTOR_WORKERS = int(os.getenv("BACKGROUND_EXECUTOR_WORKERS", "2"))
+# Linux nice value applied to ingestion and background workers so the scheduler favours live threads.
+BACKGROUND_EXECUTOR_NICE = int(os.getenv("BACKGROUND_EXECUTOR_NICE", "10"))
+
+
+def _lower_priority(nice: int, per_thread: bool):
+    if nice <= 0:
+        return
+    try:
+        if per_thread:
+            # On Linux every thread is its own schedulable task, so this leaves the event loop thread alone.
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+        else:
+            os.nice(nice)
+    except (AttributeError, OSError):
+        pass
+
+
+def _timed_call(fn, args: tuple):
+    # Wall-clock start so a worker process can report when it picked the job up.
+    return time.time(), fn(*args)
+
+
+def _percentile_ms(values, pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(int(len(ordered) * pct), len(ordered) - 1)], 3)
+
+
+class NamedExecutor:
+    """A sized pool for one class of work, reporting queue depth, wait time and run time."""
+
+    def __init__(self, name: str, kind: str, workers: int, nice: int = 0):
+        if kind not in {"thread", "process"}:
+            raise ValueError(f"Unsupported executor kind for {name}: {kind}")
+        self.name = name
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.nice = nice
+        self.executor: Executor | None = None
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_queued = 0
+        self.counters = {"submitted": 0, "completed": 0, "failed": 0}
+        self.wait_ms: deque[float] = deque(maxlen=512)
+        self.run_ms: deque[float] = deque(maxlen=512)
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.kind == "process"
+
+    def _get_executor(self) -> Executor:
+        with self.lock:
+            if self.executor is None:
+                if self.uses_processes:
+                    self.executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(INGESTION_EXECUTOR_START_METHOD),
+                        initializer=_lower_priority,
+                        initargs=(self.nice, False),
+                    )
+                else:
+                    self.executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix=f"orato-{self.name}",
+                        initializer=_lower_priority,
+                        initargs=(self.nice, True),
+                    )
+            return self.executor
+
+    async def run(self, fn, *args):
+        """Runs fn(*args) on this pool; for process pools fn and args must be picklable."""
+        loop = asyncio.get_running_loop()
+        submitted_at = time.time()
+        self.counters["submitted"] += 1
+        self.in_flight += 1
+        self.max_queued = max(self.max_queued, self.in_flight - self.workers)
+        try:
+            started_at, result = await loop.run_in_executor(self._get_executor(), _timed_call, fn, args)
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        finished_at = time.time()
+        self.counters["completed"] += 1
+        self.wait_ms.append(max(started_at - submitted_at, 0.0) * 1000)
+        self.run_ms.append((finished_at - started_at) * 1000)
+        return result
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+    def metrics(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            **self.counters,
+            "in_flight": self.in_flight,
+            "queued": max(self.in_flight - self.workers, 0),
+            "max_queued": max(self.max_queued, 0),
+            "wait_p50_ms": _percentile_ms(self.wait_ms, 0.5),
+            "wait_p95_ms": _percentile_ms(self.wait_ms, 0.95),
+            "run_p50_ms": _percentile_ms(self.run_ms, 0.5),
+            "run_p95_ms": _percentile_ms(self.run_ms, 0.95),
+        }
+
+
+# Voice commands, previews and interactive searches: never queued behind uploads or exports.
+LIVE_EXECUTOR = NamedExecutor("live", "thread", LIVE_EXECUTOR_WORKERS)
+INGESTION_EXECUTOR = NamedExecutor(
+    "ingestion",
+    INGESTION_EXECUTOR_KIND,
+    INGESTION_EXECUTOR_WORKERS,
+    BACKGROUND_EXECUTOR_NICE,
+)
+# Summary export, PDF rendering, warmup and library maintenance.
+BACKGROUND_EXECUTOR = NamedExecutor("background", "thread", BACKGROUND_EXECUTOR_WORKERS, BACKGROUND_EXECUTOR_NICE)
+
+EXECUTORS = {executor.name: executor for executor in (LIVE_EXECUTOR, INGESTION_EXECUTOR, BACKGROUND_EXECUTOR)}
+
+
+def shutdown_executors():
+    for executor in EXECUTORS.values():
+        executor.shutdown()
+
+
+def _executor_metrics() -> dict:
+    return {name: executor.metrics() for name, executor in EXECUTORS.items()}
+
+
+register_metrics_source("executors", _executor_metrics)
@@ -3,7 +3,6 @@ from datetime import datetime, timezone
 from pathlib import Path
 import shutil
 import os
-import asyncio # <-- IMPORT ASYNCIO
 from io import BytesIO
 from urllib.parse import parse_qs, unquote, urlparse
 from bson import ObjectId
@@ -17,6 +16,8 @@ from database import UserCollection, db
 from models import UserCreate, UserLogin, UserResponse, Token
 from auth import get_password_hash, verify_password, create_access_token, get_current_user
 from settings import UPLOAD_DIR, get_chroma_path
+from executors import BACKGROUND_EXECUTOR, INGESTION_EXECUTOR, LIVE_EXECUTOR
+from lecture_summary import current_summary
 
 http_router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -27,10 +28,14 @@ class WebSearchRequest(BaseModel):
     query: str
 
 
-def _get_session_states() -> dict:
-    from websocket_routes import client_states
+async def _read_session_state(doc_id: str, current_user: dict) -> dict:
+    from websocket_routes import read_client_state
 
-    return client_states
+    for client_id in (f"{current_user['id']}_{doc_id}", f"client_{doc_id}"):
+        state = await read_client_state(client_id)
+        if state:
+            return state
+    return {}
 
 
 def _get_summary_reasoner():
@@ -45,10 +50,49 @@ def _load_vector_db_for_doc(doc_id: str):
     return load_vector_db(doc_id)
 
 
-def _process_document(file_path: str, doc_id: str):
+def _invalidate_document_caches(doc_id: str):
+    from retreival_pipeline import invalidate_document
+
+    invalidate_document(doc_id)
+
+
+def _process_document(file_path: str, doc_id: str, owner_id: str | None = None):
+    from ingestion_pipeline import process_document_pipeline
+
+    return process_document_pipeline(file_path, doc_id, owner_id)
+
+
+def _backfill_user_library(doc_id: str, owner_id: str) -> int:
+    from library_index import backfill_document
+
+    return backfill_document(doc_id, owner_id)
+
+
+async def _ingest_document(file_path: str, doc_id: str, owner_id: str):
+    if not INGESTION_EXECUTOR.uses_processes:
+        await INGESTION_EXECUTOR.run(_process_document, file_path, doc_id, owner_id)
+        return
+
+    # A worker process builds the document's own index. The library write stays in this process
+    # so the library index it already has open sees the new blocks.
     from ingestion_pipeline import process_document_pipeline
 
-    return process_document_pipeline(file_path, doc_id)
+    await INGESTION_EXECUTOR.run(process_document_pipeline, file_path, doc_id)
+    if os.path.exists(get_chroma_path(doc_id)):
+        count = await BACKGROUND_EXECUTOR.run(_backfill_user_library, doc_id, owner_id)
+        print(f"📚 Added {count} blocks of doc {doc_id} to library of user {owner_id}")
+
+
+def _search_user_library(owner_id: str, query: str, k: int) -> list[dict]:
+    from library_index import search_library
+
+    return search_library(owner_id, query, k)
+
+
+def _remove_from_user_library(doc_id: str, owner_id: str):
+    from library_index import remove_document_from_library
+
+    remove_document_from_library(doc_id, owner_id)
 
 
 def _normalize_search_query(query: str) -> str:
@@ -84,13 +128,6 @@ def _normalize_search_query(query: str) -> str:
     return query
 
 
-def _build_session_search_context(doc_id: str, current_user: dict) -> dict:
-    primary_client_id = f"{current_user['id']}_{doc_id}"
-    fallback_client_id = f"client_{doc_id}"
-    client_states = _get_session_states()
-    return client_states.get(primary_client_id) or client_states.get(fallback_client_id) or {}
-
-
 def _resolve_contextual_web_query(raw_query: str, doc_title: str, session_state: dict) -> str:
     normalized = _normalize_search_query(raw_query)
     lowered = normalized.lower()
@@ -398,9 +435,9 @@ def _build_fallback_summary(document_title: str, transcript_history: list[str],
     return "\n".join(sections).strip()
 
 
-def _build_summary_text(document_title: str, transcript_history: list[str], document_context: str) -> str:
+async def _build_summary_text(document_title: str, transcript_history: list[str], document_context: str) -> str:
     teacher_speech = "\n".join(_dedupe_lines(transcript_history, 24))
-    llm_summary = _get_summary_reasoner().summarize_lecture(
+    llm_summary = await _get_summary_reasoner().asummarize_lecture(
         document_title=document_title,
         teacher_speech=teacher_speech,
         document_context=document_context,
@@ -558,10 +595,11 @@ async def upload_document(
     doc_id = str(result.inserted_id)
     
     # 🔥 AWAIT INGESTION SYNCHRONOUSLY
-    # asyncio.to_thread runs the heavy CPU parsing in a separate thread 
+    # The ingestion executor runs the heavy CPU parsing outside the live command pool
     # so it doesn't freeze your entire FastAPI server for other users, 
     # but the API response WILL wait here until it finishes!
-    await asyncio.to_thread(_process_document, str(file_path), doc_id)
+    await _ingest_document(str(file_path), doc_id, current_user["id"])
+    _invalidate_document_caches(doc_id)
     
     return {"id": doc_id, "filename": file.filename}
 
@@ -577,10 +615,41 @@ async def get_my_documents(current_user: dict = Depends(get_current_user)):
         })
     return docs
 
+@http_router.get("/library-search")
+async def search_my_library(q: str, k: int = 10, current_user: dict = Depends(get_current_user)):
+    query = " ".join((q or "").split())
+    if not query:
+        return {"query": "", "results": []}
+
+    try:
+        hits = await LIVE_EXECUTOR.run(_search_user_library, current_user["id"], query, max(1, min(k, 50)))
+    except Exception as exc:
+        print(f"Library search unavailable for {current_user['id']}: {exc}")
+        hits = []
+
+    doc_ids = {hit["docId"] for hit in hits if hit.get("docId") and ObjectId.is_valid(hit["docId"])}
+    filenames = {}
+    if doc_ids:
+        cursor = db.documents.find(
+            {"_id": {"$in": [ObjectId(doc_id) for doc_id in doc_ids]}, "owner_id": current_user["id"]},
+            {"filename": 1},
+        )
+        async for doc in cursor:
+            filenames[str(doc["_id"])] = doc["filename"]
+
+    results = [
+        {**hit, "filename": filenames[hit["docId"]]}
+        for hit in hits
+        if hit.get("docId") in filenames
+    ]
+    return {"query": query, "results": results}
+
 @http_router.get("/doc/{doc_id}")
 async def get_document_meta(doc_id: str, current_user: dict = Depends(get_current_user)):
     doc = await db.documents.find_one({"_id": ObjectId(doc_id), "owner_id": current_user["id"]})
     if not doc: raise HTTPException(status_code=404)
+    # Startup warmup preloads the most recently opened documents first.
+    await db.documents.update_one({"_id": doc["_id"]}, {"$set": {"last_opened_at": datetime.now(timezone.utc)}})
     return {"filename": doc["filename"]}
 
 @http_router.get("/view-doc/{doc_id}")
@@ -597,29 +666,28 @@ async def export_lecture_summary_pdf(doc_id: str, current_user: dict = Depends(g
     if not doc or not os.path.exists(doc["storage_path"]):
         raise HTTPException(status_code=404, detail="Document not found")
 
-    primary_client_id = f"{current_user['id']}_{doc_id}"
-    fallback_client_id = f"client_{doc_id}"
-    client_states = _get_session_states()
-    session_state = client_states.get(primary_client_id) or client_states.get(fallback_client_id) or {}
-    transcript_history = [
-        line.strip()
-        for line in (session_state.get("transcript_history") or [])
-        if str(line).strip()
-    ]
-
-    document_context = await asyncio.to_thread(
-        _extract_document_context,
-        doc_id,
-        doc["storage_path"],
-        transcript_history,
-    )
-    summary_text = await asyncio.to_thread(
-        _build_summary_text,
-        doc["filename"],
-        transcript_history,
-        document_context,
-    )
-    pdf_buffer = await asyncio.to_thread(
+    session_state = await _read_session_state(doc_id, current_user)
+
+    # The rolling summary is kept current during the session, so exporting needs no LLM round trip.
+    summary_text = current_summary(session_state)
+    if summary_text is None:
+        transcript_history = [
+            line.strip()
+            for line in (session_state.get("transcript_history") or [])
+            if str(line).strip()
+        ]
+        document_context = await BACKGROUND_EXECUTOR.run(
+            _extract_document_context,
+            doc_id,
+            doc["storage_path"],
+            transcript_history,
+        )
+        summary_text = await _build_summary_text(
+            doc["filename"],
+            transcript_history,
+            document_context,
+        )
+    pdf_buffer = await BACKGROUND_EXECUTOR.run(
         _render_summary_pdf,
         doc["filename"],
         summary_text,
@@ -640,7 +708,7 @@ async def web_search_document_context(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    session_state = _build_session_search_context(doc_id, current_user)
+    session_state = await _read_session_state(doc_id, current_user)
     resolved_query = _resolve_contextual_web_query(request.query, doc["filename"], session_state)
     provider, results = await _perform_web_search(resolved_query)
 
@@ -700,6 +768,13 @@ async def delete_document(doc_id: str, current_user: dict = Depends(get_current_
         except Exception as e:
             print(f"⚠️ Error cleaning up Chroma DB: {e}")
     
+    _invalidate_document_caches(doc_id)
+
+    try:
+        await BACKGROUND_EXECUTOR.run(_remove_from_user_library, doc_id, current_user["id"])
+    except Exception as e:
+        print(f"⚠️ Error removing doc {doc_id} from library index: {e}")
+
     # 3. Remove from MongoDB
     await db.documents.delete_one({"_id": ObjectId(doc_id)})
     
@@ -1,5 +1,8 @@
 import os
+from functools import lru_cache
+
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # Assumes your parsing.py is in the same directory
@@ -7,12 +10,30 @@ from parsing import parse_ppt, parse_pdf
 from settings import get_chroma_path
 
 
+@lru_cache(maxsize=1)
 def _get_embedding_model():
     from langchain_huggingface import HuggingFaceEmbeddings
 
     return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
 
 
+class ReusableEmbeddings(Embeddings):
+    """Embeds each distinct text once, so the document index and the user library share the same vectors."""
+
+    def __init__(self, model, vectors: dict[str, list[float]] | None = None):
+        self.model = model
+        self.vectors = dict(vectors or {})
+
+    def embed_documents(self, texts):
+        missing = [text for text in dict.fromkeys(texts) if text not in self.vectors]
+        if missing:
+            self.vectors.update(zip(missing, self.model.embed_documents(missing)))
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text):
+        return self.model.embed_query(text)
+
+
 def _get_chroma_class():
     from langchain_chroma import Chroma
 
@@ -85,6 +106,29 @@ def convert_to_documents(parsed_data):
     return documents
 
 
+def build_slide_documents(parsed_data):
+    """Builds one aggregate document per slide (title plus all of its blocks) for coarse retrieval."""
+    slide_documents = []
+    for slide_id, slide in parsed_data.items():
+        title = slide["title"] or f"Slide {slide_id}"
+        blocks = [obj["text"] for obj in slide["objects"] if obj.get("text")]
+        if not blocks:
+            continue
+
+        slide_documents.append(
+            Document(
+                page_content="\n".join([title, *blocks]),
+                metadata={
+                    "slide": int(slide_id),
+                    "title": str(title),
+                    "blocks": len(blocks),
+                },
+            )
+        )
+
+    return slide_documents
+
+
 def chunk_documents(documents):
     """Chunks text while injecting the slide title into split orphans for semantic retention."""
     splitter = RecursiveCharacterTextSplitter(
@@ -119,9 +163,9 @@ def chunk_documents(documents):
     return chunked_docs
 
 
-def create_vector_db(documents, doc_id):
+def create_vector_db(documents, doc_id, embedding_model=None):
     """Creates a unique vector DB in an isolated folder for the specific document."""
-    embedding_model = _get_embedding_model()
+    embedding_model = embedding_model or _get_embedding_model()
 
     vector_store = _get_chroma_class().from_documents(
         documents=documents,
@@ -133,7 +177,20 @@ def create_vector_db(documents, doc_id):
     print(f"✅ Vector DB created successfully for Doc ID: {doc_id}")
     return vector_store
 
-def process_document_pipeline(file_path: str, doc_id: str):
+
+def create_slide_index(slide_documents, doc_id):
+    """Stores one aggregate vector per slide next to the block collection of the document."""
+    slide_index = _get_chroma_class().from_documents(
+        documents=slide_documents,
+        embedding=_get_embedding_model(),
+        collection_name=f"doc_{doc_id}_slides",
+        persist_directory=get_chroma_path(doc_id)
+    )
+
+    print(f"✅ Slide index created with {len(slide_documents)} slides for Doc ID: {doc_id}")
+    return slide_index
+
+def process_document_pipeline(file_path: str, doc_id: str, owner_id: str | None = None):
     """Entry point for FastAPI Background Tasks."""
     try:
         print(f"⚙️ Starting ingestion for: {file_path}")
@@ -149,7 +206,14 @@ def process_document_pipeline(file_path: str, doc_id: str):
             print(f"⚠️ Warning: No extractable text or images found in {file_path}. Skipping Vector DB creation.")
             return
 
-        create_vector_db(chunked_docs, doc_id)
+        embeddings = ReusableEmbeddings(_get_embedding_model())
+        create_vector_db(chunked_docs, doc_id, embedding_model=embeddings)
+        create_slide_index(build_slide_documents(parsed_data), doc_id)
+
+        if owner_id:
+            from library_index import add_document_to_library
+
+            add_document_to_library(chunked_docs, doc_id, owner_id, embedding_model=embeddings)
         print(f"🎉 Finished ingestion for doc: {doc_id}")
     except Exception as e:
         print(f"❌ Error ingesting document {doc_id}: {e}")
@@ -0,0 +1,320 @@
+import argparse
+import atexit
+import json
+import os
+import queue
+import random
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from settings import BASE_DIR
+
+
+INTENT_CLASSIFIER_PATH = Path(
+    os.getenv("INTENT_CLASSIFIER_PATH", "").strip() or BASE_DIR / "db" / "intent_classifier.joblib"
+).resolve()
+INTENT_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("INTENT_CLASSIFIER_MIN_CONFIDENCE", "0.85"))
+# When set, every final command decision is appended here as JSONL training data for `train`.
+DECISION_LOG_PATH = os.getenv("DECISION_LOG_PATH", "").strip()
+# Label sources `train` learns from; "classifier" and "fallback" records are our own guesses.
+TRAINING_SOURCES = {"llm", "regex"}
+# Hash buckets per n-gram block. Command transcripts are short, so 2**14 collides rarely and keeps the
+# saved model at a few MB instead of the ~38 MB that 2**18 float64 coefficients took.
+INTENT_HASH_FEATURES = 2**14
+# Models saved before the feature count was recorded used this size.
+_LEGACY_HASH_FEATURES = 2**18
+
+_DECISION_LOG_LOCK = threading.Lock()
+# Decisions are logged from the event loop, so the file appends happen on a writer thread.
+_DECISION_LOG_QUEUE: queue.SimpleQueue = queue.SimpleQueue()
+_DECISION_LOG_WRITER: threading.Thread | None = None
+
+
+def _features_text(transcript: str, doc_focus_score: int = 0) -> str:
+    # The focus score decides many chatter-vs-document calls, so it is fed in as a pseudo-token.
+    return f"{' '.join(str(transcript or '').lower().split())} __focus{int(doc_focus_score or 0)}"
+
+
+def _build_vectorizers(n_features: int = INTENT_HASH_FEATURES):
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    word_vectorizer = HashingVectorizer(
+        analyzer="word",
+        ngram_range=(1, 2),
+        n_features=n_features,
+        alternate_sign=False,
+        norm="l2",
+    )
+    char_vectorizer = HashingVectorizer(
+        analyzer="char_wb",
+        ngram_range=(3, 5),
+        n_features=n_features,
+        alternate_sign=False,
+        norm="l2",
+    )
+    return word_vectorizer, char_vectorizer
+
+
+class IntentClassifier:
+    """Hashed word/char n-grams with two linear heads: intent and refers_to_document."""
+
+    def __init__(self, intent_model=None, document_model=None, n_features: int = INTENT_HASH_FEATURES):
+        self.n_features = n_features
+        self.word_vectorizer, self.char_vectorizer = _build_vectorizers(n_features)
+        self.intent_model = intent_model
+        self.document_model = document_model
+
+    def _transform(self, texts: list[str]):
+        from scipy.sparse import hstack
+
+        return hstack([self.word_vectorizer.transform(texts), self.char_vectorizer.transform(texts)]).tocsr()
+
+    def fit(self, texts: list[str], intents: list[str], refers: list[bool]):
+        from sklearn.linear_model import LogisticRegression
+
+        features = self._transform(texts)
+        self.intent_model = LogisticRegression(max_iter=1000, C=4.0).fit(features, intents)
+        if len(set(refers)) > 1:
+            self.document_model = LogisticRegression(max_iter=1000, C=4.0).fit(features, refers)
+        else:
+            self.document_model = bool(refers[0])
+        return self
+
+    def predict(self, transcript: str, doc_focus_score: int = 0) -> tuple[str, bool, float]:
+        """Returns (intent, refers_to_document, confidence); confidence is the weaker of the two heads."""
+        features = self._transform([_features_text(transcript, doc_focus_score)])
+
+        intent_probabilities = self.intent_model.predict_proba(features)[0]
+        intent_index = int(intent_probabilities.argmax())
+        intent = str(self.intent_model.classes_[intent_index])
+        confidence = float(intent_probabilities[intent_index])
+
+        if isinstance(self.document_model, bool):
+            refers_to_document = self.document_model
+        else:
+            document_probabilities = self.document_model.predict_proba(features)[0]
+            document_index = int(document_probabilities.argmax())
+            refers_to_document = bool(self.document_model.classes_[document_index])
+            confidence = min(confidence, float(document_probabilities[document_index]))
+
+        return intent, refers_to_document, confidence
+
+    def save(self, path: Path):
+        import joblib
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        for model in (self.intent_model, self.document_model):
+            _shrink_coefficients(model)
+        joblib.dump(
+            {
+                "intent_model": self.intent_model,
+                "document_model": self.document_model,
+                "n_features": self.n_features,
+            },
+            path,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "IntentClassifier":
+        import joblib
+
+        state = joblib.load(path)
+        return cls(
+            state["intent_model"],
+            state["document_model"],
+            state.get("n_features", _LEGACY_HASH_FEATURES),
+        )
+
+
+def _shrink_coefficients(model):
+    # float32 weights halve the file and the resident copy; the probabilities move by less than 1e-6.
+    if hasattr(model, "coef_"):
+        model.coef_ = model.coef_.astype("float32")
+        model.intercept_ = model.intercept_.astype("float32")
+
+
+@lru_cache(maxsize=1)
+def load_intent_classifier() -> IntentClassifier | None:
+    if not INTENT_CLASSIFIER_PATH.is_file():
+        return None
+
+    try:
+        classifier = IntentClassifier.load(INTENT_CLASSIFIER_PATH)
+    except Exception as exc:
+        print(f"Intent classifier unavailable, using the LLM for ambiguous commands: {exc}")
+        return None
+
+    print(f"✅ Loaded intent classifier from {INTENT_CLASSIFIER_PATH}")
+    return classifier
+
+
+def _drain_decision_log(block: bool) -> list[str]:
+    lines = []
+    try:
+        if block:
+            lines.append(_DECISION_LOG_QUEUE.get())
+        while True:
+            lines.append(_DECISION_LOG_QUEUE.get_nowait())
+    except queue.Empty:
+        pass
+    return lines
+
+
+def _append_decision_lines(lines: list[str]):
+    if not lines:
+        return
+    try:
+        with _DECISION_LOG_LOCK:
+            path = Path(DECISION_LOG_PATH)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as handle:
+                handle.writelines(lines)
+    except OSError as exc:
+        print(f"Could not write {len(lines)} decision log records: {exc}")
+
+
+def _write_decision_log():
+    while True:
+        _append_decision_lines(_drain_decision_log(block=True))
+
+
+def flush_decision_log():
+    """Writes any queued records on the calling thread; runs at exit so the last decisions are kept."""
+    _append_decision_lines(_drain_decision_log(block=False))
+
+
+def _ensure_decision_log_writer():
+    global _DECISION_LOG_WRITER
+    if _DECISION_LOG_WRITER is not None:
+        return
+    with _DECISION_LOG_LOCK:
+        if _DECISION_LOG_WRITER is None:
+            _DECISION_LOG_WRITER = threading.Thread(target=_write_decision_log, name="orato-decision-log", daemon=True)
+            _DECISION_LOG_WRITER.start()
+            atexit.register(flush_decision_log)
+
+
+def log_decision(
+    transcript: str,
+    session_state: dict | None,
+    regex_decision: dict,
+    final_decision: dict,
+    routed_to_llm: bool,
+    fallback: bool = False,
+):
+    """
+    Queues one decision for the training log. `fallback` marks a regex answer used because the LLM
+    failed or was unavailable; it is logged for the record but never trained on.
+    """
+    if not DECISION_LOG_PATH:
+        return
+
+    record = {
+        "at": round(time.time(), 3),
+        "transcript": transcript,
+        "doc_focus_score": int((session_state or {}).get("doc_focus_score", 0)),
+        "routed_to_llm": routed_to_llm,
+        "source": "fallback" if fallback else final_decision.get("reasoning_source", "regex"),
+        "intent": final_decision.get("intent"),
+        "refers_to_document": bool(final_decision.get("refers_to_document", True)),
+        "confidence": final_decision.get("confidence"),
+        "regex_intent": regex_decision.get("intent"),
+        "regex_refers_to_document": bool(regex_decision.get("refers_to_document", True)),
+    }
+    _DECISION_LOG_QUEUE.put(json.dumps(record) + "\n")
+    _ensure_decision_log_writer()
+
+
+def _load_training_records(log_path: str) -> list[dict]:
+    records = []
+    for line in Path(log_path).read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        # Classifier and fallback labels are our own output; training on them would only reinforce mistakes.
+        if record.get("transcript") and record.get("intent") and record.get("source") in TRAINING_SOURCES:
+            records.append(record)
+    return records
+
+
+def _evaluate(classifier: IntentClassifier, records: list[dict], min_confidence: float) -> dict:
+    llm_records = [record for record in records if record.get("source") == "llm"]
+    routed_records = [record for record in records if record.get("routed_to_llm")]
+
+    agreement = {"intent": 0, "refers_to_document": 0, "both": 0}
+    for record in llm_records:
+        intent, refers, _ = classifier.predict(record["transcript"], record.get("doc_focus_score", 0))
+        intent_ok = intent == record["intent"]
+        refers_ok = refers == record["refers_to_document"]
+        agreement["intent"] += intent_ok
+        agreement["refers_to_document"] += refers_ok
+        agreement["both"] += intent_ok and refers_ok
+
+    avoided = 0
+    avoided_agreeing = 0
+    latencies_ms = []
+    for record in routed_records:
+        started_at = time.perf_counter()
+        intent, refers, confidence = classifier.predict(record["transcript"], record.get("doc_focus_score", 0))
+        latencies_ms.append((time.perf_counter() - started_at) * 1000)
+        if confidence >= min_confidence:
+            avoided += 1
+            avoided_agreeing += intent == record["intent"] and refers == record["refers_to_document"]
+
+    latencies_ms.sort()
+    return {
+        "llm_labelled": len(llm_records),
+        "agreement_with_llm": {
+            name: round(count / len(llm_records), 4) if llm_records else None
+            for name, count in agreement.items()
+        },
+        "routed_to_llm": len(routed_records),
+        "llm_calls_avoided": round(avoided / len(routed_records), 4) if routed_records else None,
+        "agreement_when_avoided": round(avoided_agreeing / avoided, 4) if avoided else None,
+        "predict_p50_ms": round(latencies_ms[len(latencies_ms) // 2], 4) if latencies_ms else None,
+    }
+
+
+def train(log_path: str, output_path: Path, min_confidence: float, holdout: float, seed: int) -> dict:
+    records = _load_training_records(log_path)
+    intents = {record["intent"] for record in records}
+    if len(records) < 10 or len(intents) < 2:
+        raise ValueError(f"Need at least 10 logged decisions covering 2+ intents, found {len(records)}")
+
+    random.Random(seed).shuffle(records)
+    holdout_size = int(len(records) * holdout)
+    eval_records, train_records = records[:holdout_size], records[holdout_size:]
+
+    def _fit(fit_records: list[dict]) -> IntentClassifier:
+        return IntentClassifier().fit(
+            [_features_text(record["transcript"], record.get("doc_focus_score", 0)) for record in fit_records],
+            [record["intent"] for record in fit_records],
+            [bool(record["refers_to_document"]) for record in fit_records],
+        )
+
+    report = {"records": len(records), "train": len(train_records), "holdout": len(eval_records)}
+    if eval_records and len({record["intent"] for record in train_records}) > 1:
+        report["holdout_eval"] = _evaluate(_fit(train_records), eval_records, min_confidence)
+
+    classifier = _fit(records)
+    classifier.save(output_path)
+    report["saved_to"] = str(output_path)
+    report["min_confidence"] = min_confidence
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the local intent classifier from logged decisions.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser("train")
+    train_parser.add_argument("--log", default=DECISION_LOG_PATH or str(BASE_DIR / "db" / "decision_log.jsonl"))
+    train_parser.add_argument("--out", default=str(INTENT_CLASSIFIER_PATH))
+    train_parser.add_argument("--min-confidence", type=float, default=INTENT_CLASSIFIER_MIN_CONFIDENCE)
+    train_parser.add_argument("--holdout", type=float, default=0.2)
+    train_parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    print(json.dumps(train(args.log, Path(args.out), args.min_confidence, args.holdout, args.seed), indent=2))
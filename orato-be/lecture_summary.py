@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time
+
+
+SUMMARY_SEGMENT_UTTERANCES = int(os.getenv("SUMMARY_SEGMENT_UTTERANCES", "12"))
+SUMMARY_INTERVAL_SECONDS = float(os.getenv("SUMMARY_INTERVAL_SECONDS", "90"))
+SUMMARY_CHECK_SECONDS = float(os.getenv("SUMMARY_CHECK_SECONDS", "5"))
+# Once this many segment notes pile up, the oldest half is folded into a single note.
+SUMMARY_MAX_SEGMENT_NOTES = int(os.getenv("SUMMARY_MAX_SEGMENT_NOTES", "12"))
+ROLLING_SUMMARY_ENABLED = os.getenv("ROLLING_SUMMARY_ENABLED", "true").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+}
+
+summary_tasks: dict[str, asyncio.Task] = {}
+final_fold_tasks: set[asyncio.Task] = set()
+
+
+def _get_session_states() -> dict:
+    from websocket_routes import client_states
+
+    return client_states
+
+
+async def _save_session_state(client_id: str):
+    # Other workers serve the export, so each fold is written back to the shared session store.
+    from websocket_routes import _push_client_state
+
+    await _push_client_state(client_id)
+
+
+def _get_summary_reasoner():
+    from llm_reasoner import LLMCommandReasoner
+
+    return LLMCommandReasoner()
+
+
+def _summary_state(state: dict) -> dict:
+    return state.setdefault(
+        "lecture_summary",
+        {
+            "pending": [],
+            "notes": [],
+            "summary_text": "",
+            "utterances": 0,
+            "folded_utterances": 0,
+            # Wall-clock, since session state is shared with other workers through the session store.
+            "folded_at": time.time(),
+            "updated_at": None,
+            "document": None,
+        },
+    )
+
+
+def note_utterance(state: dict, transcript: str):
+    """Queues a final utterance for the next fold; unlike transcript_history this is never truncated."""
+    transcript = " ".join((transcript or "").split())
+    if not transcript:
+        return
+
+    summary = _summary_state(state)
+    summary["pending"].append(transcript)
+    summary["utterances"] += 1
+
+
+def _fallback_notes(lines: list[str], limit: int = 6) -> str:
+    from http_routes import _dedupe_lines
+
+    return "\n".join(f"- {line.lstrip('- ')}" for line in _dedupe_lines(lines, limit))
+
+
+async def _condense(reasoner, document_title: str, lines: list[str]) -> str:
+    condensed = await reasoner.asummarize_segment(document_title, "\n".join(lines))
+    return condensed or _fallback_notes(lines)
+
+
+async def _load_document(doc_id: str) -> dict:
+    from bson import ObjectId
+
+    from database import db
+
+    try:
+        doc = await db.documents.find_one({"_id": ObjectId(doc_id)})
+    except Exception as exc:
+        print(f"Rolling summary could not load document {doc_id}: {exc}")
+        doc = None
+    return {"title": (doc or {}).get("filename", ""), "storage_path": (doc or {}).get("storage_path", "")}
+
+
+async def fold_pending(state: dict, doc_id: str, reasoner=None) -> bool:
+    """Map step over new utterances, reduce step over accumulated notes, then a refreshed lecture summary."""
+    from executors import BACKGROUND_EXECUTOR
+    from http_routes import _build_fallback_summary, _extract_document_context
+
+    summary = _summary_state(state)
+    if not summary["pending"]:
+        return False
+
+    # Snapshot the segment; utterances arriving meanwhile wait for the next fold. Nothing is removed
+    # from pending until the fold has finished, so a cancelled or failed fold loses no speech.
+    segment = list(summary["pending"])
+    summary["folded_at"] = time.time()
+
+    reasoner = reasoner or _get_summary_reasoner()
+    if summary["document"] is None:
+        summary["document"] = await _load_document(doc_id)
+    document_title = summary["document"]["title"]
+
+    started_at = time.perf_counter()
+    notes = summary["notes"] + [await _condense(reasoner, document_title, segment)]
+    if len(notes) > SUMMARY_MAX_SEGMENT_NOTES:
+        oldest = notes[: len(notes) // 2]
+        merged = await _condense(reasoner, document_title, [line for note in oldest for line in note.splitlines()])
+        notes[: len(oldest)] = [merged]
+
+    note_lines = [line for note in notes for line in note.splitlines() if line.strip()]
+    document_context = await BACKGROUND_EXECUTOR.run(
+        _extract_document_context,
+        doc_id,
+        summary["document"]["storage_path"],
+        note_lines,
+    )
+    lecture_summary = await reasoner.asummarize_lecture(
+        document_title=document_title,
+        teacher_speech="\n".join(note_lines),
+        document_context=document_context,
+    )
+
+    if summary["pending"][: len(segment)] == segment:
+        del summary["pending"][: len(segment)]
+    else:
+        # The list was refreshed from the session store meanwhile; drop the folded lines wherever they are.
+        for line in segment:
+            if line in summary["pending"]:
+                summary["pending"].remove(line)
+    summary["notes"] = notes
+    summary["folded_utterances"] += len(segment)
+    summary["summary_text"] = lecture_summary or _build_fallback_summary(document_title, note_lines, document_context)
+    summary["updated_at"] = time.time()
+    print(
+        f"Rolling summary for doc {doc_id} folded {len(segment)} utterances "
+        f"({summary['folded_utterances']} total) in {(time.perf_counter() - started_at) * 1000:.0f} ms"
+    )
+    return True
+
+
+def _fold_due(summary: dict) -> bool:
+    pending = len(summary["pending"])
+    if pending >= SUMMARY_SEGMENT_UTTERANCES:
+        return True
+    return pending > 0 and time.time() - summary["folded_at"] >= SUMMARY_INTERVAL_SECONDS
+
+
+async def run_rolling_summary(client_id: str, doc_id: str):
+    reasoner = _get_summary_reasoner()
+    while True:
+        await asyncio.sleep(SUMMARY_CHECK_SECONDS)
+        # Look the state up each time: the viewer socket replaces the dict when it reconnects.
+        state = _get_session_states().get(client_id)
+        if state is not None and _fold_due(_summary_state(state)):
+            try:
+                if await fold_pending(state, doc_id, reasoner):
+                    await _save_session_state(client_id)
+            except Exception as exc:
+                print(f"Rolling summary fold failed for doc {doc_id}: {exc}")
+
+
+def start_rolling_summary(client_id: str, doc_id: str) -> asyncio.Task | None:
+    """Keeps one background summarizer per client; it lives across STT reconnects of the same session."""
+    if not ROLLING_SUMMARY_ENABLED:
+        return None
+
+    task = summary_tasks.get(client_id)
+    if task is not None and not task.done():
+        return task
+
+    task = asyncio.create_task(run_rolling_summary(client_id, doc_id))
+    summary_tasks[client_id] = task
+    return task
+
+
+async def _final_fold(client_id: str, state: dict, doc_id: str):
+    try:
+        if await fold_pending(state, doc_id):
+            await _save_session_state(client_id)
+    except Exception as exc:
+        print(f"Final rolling summary fold failed for doc {doc_id}: {exc}")
+
+
+def stop_rolling_summary(client_id: str, doc_id: str):
+    """Stops the cadence loop and folds whatever was said since the last fold in the background."""
+    task = summary_tasks.pop(client_id, None)
+    if task is not None:
+        task.cancel()
+
+    if not ROLLING_SUMMARY_ENABLED:
+        return
+
+    state = _get_session_states().get(client_id)
+    if not state or not (state.get("lecture_summary") or {}).get("pending"):
+        return
+
+    final_fold = asyncio.create_task(_final_fold(client_id, state, doc_id))
+    final_fold_tasks.add(final_fold)
+    final_fold.add_done_callback(final_fold_tasks.discard)
+
+
+def current_summary(state: dict) -> str | None:
+    """The latest rolling summary plus any utterances not folded in yet, or None before the first fold."""
+    summary = (state or {}).get("lecture_summary")
+    if not summary or not summary.get("summary_text"):
+        return None
+
+    text = summary["summary_text"]
+    if summary["pending"]:
+        text = f"{text}\n\nLatest Remarks\n{_fallback_notes(summary['pending'], 8)}"
+    return text
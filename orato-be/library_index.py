@@ -0,0 +1,131 @@
+import asyncio
+import os
+import sys
+import threading
+
+from settings import get_chroma_path, get_library_chroma_path
+
+
+_LIBRARY_CACHE: dict[str, object] = {}
+_LIBRARY_LOCK = threading.Lock()
+
+
+def _get_chroma_class():
+    from langchain_chroma import Chroma
+
+    return Chroma
+
+
+def _get_query_embedding_model():
+    from retreival_pipeline import _get_embedding_model
+
+    return _get_embedding_model()
+
+
+def _library_store(owner_id: str, embedding_model=None):
+    return _get_chroma_class()(
+        collection_name=f"library_{owner_id}",
+        persist_directory=get_library_chroma_path(owner_id),
+        embedding_function=embedding_model,
+        collection_metadata={"hnsw:space": "cosine"},
+    )
+
+
+def load_library(owner_id: str):
+    """Loads the single per-user index that holds the blocks of every document the user owns."""
+    owner_id = str(owner_id)
+    with _LIBRARY_LOCK:
+        if owner_id not in _LIBRARY_CACHE:
+            _LIBRARY_CACHE[owner_id] = _library_store(owner_id, _get_query_embedding_model())
+        return _LIBRARY_CACHE[owner_id]
+
+
+def _library_collection(owner_id: str):
+    # Writes always carry precomputed vectors, so they do not need a query embedding model loaded.
+    return _library_store(str(owner_id))._collection
+
+
+def add_document_to_library(documents, doc_id: str, owner_id: str, embedding_model):
+    """Adds the chunks of a freshly ingested document, reusing the vectors computed for its own index."""
+    if not documents:
+        return
+
+    texts = [doc.page_content for doc in documents]
+    _library_collection(owner_id).upsert(
+        ids=[f"{doc_id}:{index}" for index in range(len(documents))],
+        embeddings=embedding_model.embed_documents(texts),
+        documents=texts,
+        metadatas=[{**doc.metadata, "doc_id": str(doc_id)} for doc in documents],
+    )
+    print(f"📚 Added {len(documents)} blocks of doc {doc_id} to library of user {owner_id}")
+
+
+def remove_document_from_library(doc_id: str, owner_id: str):
+    _library_collection(owner_id).delete(where={"doc_id": str(doc_id)})
+
+
+def search_library(owner_id: str, query: str, k: int = 10) -> list[dict]:
+    """Ranks blocks across all of a user's documents with one ANN query."""
+    query = " ".join((query or "").split())
+    if not query:
+        return []
+
+    library = load_library(owner_id)
+    results = library.similarity_search_with_score(query, k=max(1, k))
+    hits = []
+    for match, distance in results:
+        snippet = " ".join(str(match.page_content).split())
+        hits.append(
+            {
+                "docId": match.metadata.get("doc_id"),
+                "slide": match.metadata.get("slide"),
+                "bbox": match.metadata.get("bbox", [0, 0, 0, 0]),
+                "title": match.metadata.get("title", "Untitled"),
+                "type": match.metadata.get("type", "text"),
+                "imageInd": match.metadata.get("image_ind", 0),
+                "snippet": snippet[:280],
+                "score": round(1.0 - float(distance), 4),
+            }
+        )
+    return hits
+
+
+def backfill_document(doc_id: str, owner_id: str) -> int:
+    """Copies an already ingested document index into the owner's library without re-embedding it."""
+    stored = _get_chroma_class()(
+        collection_name=f"doc_{doc_id}",
+        persist_directory=get_chroma_path(doc_id),
+    ).get(include=["documents", "metadatas", "embeddings"])
+
+    texts = stored.get("documents") or []
+    if not texts:
+        return 0
+
+    _library_collection(owner_id).upsert(
+        ids=[f"{doc_id}:{index}" for index in range(len(texts))],
+        embeddings=stored["embeddings"],
+        documents=texts,
+        metadatas=[{**(metadata or {}), "doc_id": str(doc_id)} for metadata in stored.get("metadatas") or []],
+    )
+    return len(texts)
+
+
+async def _backfill_all():
+    from database import db
+
+    async for doc in db.documents.find({}, {"_id": 1, "owner_id": 1}):
+        doc_id = str(doc["_id"])
+        if not os.path.exists(get_chroma_path(doc_id)):
+            continue
+        try:
+            count = await asyncio.to_thread(backfill_document, doc_id, doc["owner_id"])
+            print(f"Backfilled {count} blocks of doc {doc_id} for user {doc['owner_id']}")
+        except Exception as exc:
+            print(f"Could not backfill doc {doc_id}: {exc}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["backfill"]:
+        asyncio.run(_backfill_all())
+    else:
+        print("Usage: python library_index.py backfill")
@@ -1,13 +1,23 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import importlib.util
 import json
 import os
 import re
-from dataclasses import dataclass
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Optional
 
 import httpx
 from dotenv import load_dotenv
 
+from metrics import register_metrics_source
+
 
 load_dotenv(Path(__file__).with_name(".env"))
 
@@ -31,6 +41,29 @@ DEFAULT_BASE_URL = "https://api.openai.com/v1"
 DEFAULT_MODEL = "gpt-4o-mini"
 GEMINI_OPENAI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai"
 DEFAULT_GEMINI_MODEL = "gemini-2.5-flash"
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+LLM_DECISION_CACHE_SIZE = int(os.getenv("LLM_DECISION_CACHE_SIZE", "2048"))
+LLM_DECISION_CACHE_TTL_SECONDS = float(os.getenv("LLM_DECISION_CACHE_TTL_SECONDS", "1800"))
+LLM_DECISION_CACHE_MIN_CONFIDENCE = float(os.getenv("LLM_DECISION_CACHE_MIN_CONFIDENCE", "0.75"))
+LLM_STREAM_DECISIONS = os.getenv("LLM_STREAM_DECISIONS", "false").strip().lower() in {"1", "true", "yes"}
+# Streamed decisions stop reading once these fields are known and nothing else can change the action.
+# The prompt asks for them first, so confidence and direct_command are never cut off.
+EARLY_DECISION_FIELDS = ("intent", "confidence", "direct_command", "refers_to_document", "target_slide")
+DIRECT_INTENTS = {"clear", "next", "prev", "zoom_in", "zoom_out"}
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "8"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+LLM_ADAPTIVE_TIMEOUT_MIN_SECONDS = float(os.getenv("LLM_ADAPTIVE_TIMEOUT_MIN_SECONDS", "1.5"))
+LLM_ADAPTIVE_TIMEOUT_MULTIPLIER = float(os.getenv("LLM_ADAPTIVE_TIMEOUT_MULTIPLIER", "2.0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Slots background work (summaries) may never take, so live commands always find one free.
+LLM_LIVE_RESERVED_SLOTS = int(os.getenv("LLM_LIVE_RESERVED_SLOTS", "2"))
+LLM_RATE_LIMIT_PER_MINUTE = float(os.getenv("LLM_RATE_LIMIT_PER_MINUTE", "120"))
+LLM_RATE_BURST = float(os.getenv("LLM_RATE_BURST", "10"))
 
 
 @dataclass
@@ -61,6 +94,144 @@ def _extract_json_object(value: str) -> str:
     return cleaned[start:end + 1]
 
 
+class IncrementalJSONFieldParser:
+    """Extracts top-level fields of a JSON object as soon as each value is complete in a token stream."""
+
+    _LITERAL_END = re.compile(r"[\s,}]")
+
+    def __init__(self):
+        self.buffer = ""
+        self.fields: dict = {}
+        self._pos = 0
+        self._started = False
+        self.finished = False
+
+    def feed(self, chunk: str) -> dict:
+        self.buffer += chunk or ""
+        if not self._started:
+            start = self.buffer.find("{", self._pos)
+            if start == -1:
+                self._pos = len(self.buffer)
+                return self.fields
+            self._started = True
+            self._pos = start + 1
+
+        while not self.finished:
+            next_pos = self._parse_member(self._pos)
+            if next_pos is None:
+                break
+            self._pos = next_pos
+        return self.fields
+
+    def close(self) -> dict:
+        """Flushes a trailing literal when the stream ends without the closing brace."""
+        if self._started and not self.finished:
+            try:
+                self.feed("}")
+            except ValueError:
+                pass
+        return self.fields
+
+    def _skip_space(self, pos: int) -> int:
+        while pos < len(self.buffer) and self.buffer[pos] in " \t\r\n,":
+            pos += 1
+        return pos
+
+    def _string_end(self, pos: int) -> Optional[int]:
+        index = pos + 1
+        while index < len(self.buffer):
+            char = self.buffer[index]
+            if char == "\\":
+                index += 2
+                continue
+            if char == '"':
+                return index + 1
+            index += 1
+        return None
+
+    def _nested_end(self, pos: int) -> Optional[int]:
+        depth = 0
+        index = pos
+        while index < len(self.buffer):
+            char = self.buffer[index]
+            if char == '"':
+                string_end = self._string_end(index)
+                if string_end is None:
+                    return None
+                index = string_end
+                continue
+            if char in "{[":
+                depth += 1
+            elif char in "}]":
+                depth -= 1
+                if depth == 0:
+                    return index + 1
+            index += 1
+        return None
+
+    def _parse_member(self, pos: int) -> Optional[int]:
+        pos = self._skip_space(pos)
+        if pos >= len(self.buffer):
+            return None
+        if self.buffer[pos] == "}":
+            self.finished = True
+            return pos + 1
+        if self.buffer[pos] != '"':
+            raise ValueError("Malformed JSON object in LLM stream")
+
+        key_end = self._string_end(pos)
+        if key_end is None:
+            return None
+        colon = self.buffer.find(":", key_end)
+        if colon == -1:
+            return None
+        value_start = colon + 1
+        while value_start < len(self.buffer) and self.buffer[value_start].isspace():
+            value_start += 1
+        if value_start >= len(self.buffer):
+            return None
+
+        first = self.buffer[value_start]
+        if first == '"':
+            value_end = self._string_end(value_start)
+        elif first in "{[":
+            value_end = self._nested_end(value_start)
+        else:
+            literal_end = self._LITERAL_END.search(self.buffer, value_start)
+            value_end = literal_end.start() if literal_end else None
+        if value_end is None:
+            return None
+
+        key = json.loads(self.buffer[pos:key_end])
+        self.fields[key] = json.loads(self.buffer[value_start:value_end])
+        return value_end
+
+
+def _decision_is_settled(fields: dict) -> bool:
+    """True once the streamed fields fully determine the action, so the rest of the completion can be dropped."""
+    if not all(name in fields for name in EARLY_DECISION_FIELDS):
+        return False
+    if not fields.get("refers_to_document", True):
+        return True
+
+    intent = _normalize_intent(fields.get("intent"))
+    if intent in DIRECT_INTENTS:
+        return True
+    # "Go to slide 5 and highlight X" is a navigate with a search_query, so wait for it to be empty.
+    return intent == "navigate" and isinstance(fields.get("target_slide"), int) and fields.get("search_query") == ""
+
+
+def _stream_delta(line: str) -> Optional[str]:
+    """Returns the content delta of one server-sent event line, or None for keep-alives and the [DONE] marker."""
+    if not line.startswith("data:"):
+        return None
+    data = line[len("data:"):].strip()
+    if not data or data == "[DONE]":
+        return None
+    choices = json.loads(data).get("choices") or [{}]
+    return (choices[0].get("delta") or {}).get("content")
+
+
 def _normalize_intent(value: Optional[str]) -> str:
     if not value:
         return "navigate"
@@ -104,6 +275,568 @@ def _normalize_target_type(value: Optional[str]) -> str:
     return normalized if normalized in ALLOWED_TARGET_TYPES else "auto"
 
 
+def _normalize_transcript(value: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9\s]", " ", (value or "").lower()).split())
+
+
+def _decision_key(model: str, transcript: str, current_slide: Optional[int], context: str) -> Optional[tuple]:
+    normalized = _normalize_transcript(transcript)
+    if not normalized:
+        return None
+    context_hash = hashlib.sha1((context or "").encode("utf-8")).hexdigest()[:16]
+    return (model, normalized, current_slide, context_hash)
+
+
+class LLMDecisionCache:
+    """TTL + LRU cache of confident command decisions, shared by every session in the process."""
+
+    def __init__(self, max_size: int, ttl_seconds: float, min_confidence: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.min_confidence = min_confidence
+        self._entries: OrderedDict[tuple, tuple[float, LLMCommandDecision]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "skipped_low_confidence": 0, "expired": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def make_key(self, model: str, transcript: str, current_slide: Optional[int], cache_context: str) -> Optional[tuple]:
+        if not self.enabled:
+            return None
+        return _decision_key(model, transcript, current_slide, cache_context)
+
+    def get(self, key: Optional[tuple]) -> Optional[LLMCommandDecision]:
+        if key is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return replace(entry[1])
+
+    def put(self, key: Optional[tuple], decision: Optional[LLMCommandDecision]):
+        if key is None or decision is None:
+            return
+
+        with self._lock:
+            if decision.confidence < self.min_confidence:
+                self._stats["skipped_low_confidence"] += 1
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, replace(decision))
+            self._entries.move_to_end(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "size": len(self._entries),
+                "capacity": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "min_confidence": self.min_confidence,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+DECISION_CACHE = LLMDecisionCache(
+    LLM_DECISION_CACHE_SIZE,
+    LLM_DECISION_CACHE_TTL_SECONDS,
+    LLM_DECISION_CACHE_MIN_CONFIDENCE,
+)
+register_metrics_source("llm_decision_cache", DECISION_CACHE.metrics)
+
+
+class LLMCircuitBreaker:
+    """Rolling error-rate breaker with a p95-based timeout for live command reasoning.
+
+    closed: calls go through. open: calls are skipped until the cooldown passes.
+    half_open: a single probe call decides whether to close again or reopen.
+    """
+
+    def __init__(
+        self,
+        window: int,
+        min_calls: int,
+        error_rate_threshold: float,
+        cooldown_seconds: float,
+        timeout_floor_seconds: float,
+        timeout_multiplier: float,
+    ):
+        self.min_calls = max(1, min_calls)
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.timeout_floor_seconds = timeout_floor_seconds
+        self.timeout_multiplier = timeout_multiplier
+        self.state = "closed"
+        self._outcomes: deque[tuple[bool, float]] = deque(maxlen=max(1, window))
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "failures": 0, "short_circuited": 0, "opened": 0, "probes": 0, "abandoned": 0}
+
+    def _cooldown_elapsed(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.cooldown_seconds
+
+    def allows_requests(self) -> bool:
+        """Non-consuming check used for routing decisions before a call is attempted."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and not self._cooldown_elapsed():
+                return False
+            return not self._probe_in_flight
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if (self.state == "open" and not self._cooldown_elapsed()) or self._probe_in_flight:
+                self._stats["short_circuited"] += 1
+                return False
+            self.state = "half_open"
+            self._probe_in_flight = True
+            self._stats["probes"] += 1
+            return True
+
+    def record(self, latency_ms: float, succeeded: bool):
+        with self._lock:
+            self._stats["calls"] += 1
+            if not succeeded:
+                self._stats["failures"] += 1
+
+            if self.state == "half_open":
+                self._probe_in_flight = False
+                if succeeded:
+                    print("LLM circuit breaker closed after a successful probe")
+                    self.state = "closed"
+                    self._outcomes.clear()
+                    self._outcomes.append((True, latency_ms))
+                else:
+                    self._open()
+                return
+
+            self._outcomes.append((succeeded, latency_ms))
+            if len(self._outcomes) >= self.min_calls and self._error_rate() >= self.error_rate_threshold:
+                self._open()
+
+    def abandon(self):
+        """Forgets a call that was cancelled before it finished; it says nothing about the provider's health."""
+        with self._lock:
+            self._stats["abandoned"] += 1
+            if self.state == "half_open":
+                # Free the probe slot so the next call probes instead of the breaker staying stuck half-open.
+                self._probe_in_flight = False
+
+    def _open(self):
+        if self.state != "open":
+            print(f"LLM circuit breaker opened; skipping LLM reasoning for {self.cooldown_seconds:.0f}s")
+        self.state = "open"
+        self._opened_at = time.monotonic()
+        self._stats["opened"] += 1
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for succeeded, _ in self._outcomes if not succeeded) / len(self._outcomes)
+
+    def _latency_p95_ms(self) -> Optional[float]:
+        latencies = sorted(latency for succeeded, latency in self._outcomes if succeeded)
+        if len(latencies) < self.min_calls:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(0.95 * (len(latencies) - 1))))]
+
+    def timeout_seconds(self, ceiling_seconds: float) -> float:
+        """Timeout for the next call: a multiple of the observed p95, never above the configured timeout."""
+        with self._lock:
+            p95_ms = self._latency_p95_ms()
+        if p95_ms is None:
+            return ceiling_seconds
+        adaptive = max(self.timeout_floor_seconds, p95_ms / 1000 * self.timeout_multiplier)
+        return min(ceiling_seconds, adaptive)
+
+    def reset(self):
+        with self._lock:
+            self.state = "closed"
+            self._outcomes.clear()
+            self._probe_in_flight = False
+
+    def metrics(self) -> dict:
+        with self._lock:
+            p95_ms = self._latency_p95_ms()
+            latencies = sorted(latency for succeeded, latency in self._outcomes if succeeded)
+            return {
+                **self._stats,
+                "state": self.state,
+                "window_calls": len(self._outcomes),
+                "window_error_rate": round(self._error_rate(), 4),
+                "latency_p50_ms": round(latencies[len(latencies) // 2], 3) if latencies else None,
+                "latency_p95_ms": round(p95_ms, 3) if p95_ms is not None else None,
+                "open_for_seconds": (
+                    round(max(0.0, self.cooldown_seconds - (time.monotonic() - self._opened_at)), 3)
+                    if self.state == "open"
+                    else 0.0
+                ),
+            }
+
+
+REASONING_BREAKER = LLMCircuitBreaker(
+    LLM_BREAKER_WINDOW,
+    LLM_BREAKER_MIN_CALLS,
+    LLM_BREAKER_ERROR_RATE,
+    LLM_BREAKER_COOLDOWN_SECONDS,
+    LLM_ADAPTIVE_TIMEOUT_MIN_SECONDS,
+    LLM_ADAPTIVE_TIMEOUT_MULTIPLIER,
+)
+
+
+def _breaker_metrics() -> dict:
+    return {
+        **REASONING_BREAKER.metrics(),
+        "timeout_seconds": round(REASONING_BREAKER.timeout_seconds(LLM_TIMEOUT_SECONDS), 3),
+    }
+
+
+register_metrics_source("llm_circuit_breaker", _breaker_metrics)
+
+
+class _SharedCall:
+    """One in-flight provider request and the number of callers still waiting for it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class LLMDispatcher:
+    """Shared gate for async LLM calls: single-flight coalescing, a priority concurrency limit and a rate budget.
+
+    Live reasoning (PRIORITY_LIVE) is admitted ahead of queued background work such as summaries,
+    and background work can never occupy the slots reserved for live commands.
+    """
+
+    PRIORITY_LIVE = 0
+    PRIORITY_BACKGROUND = 1
+
+    def __init__(self, max_concurrency: int, live_reserved_slots: int, rate_per_minute: float, burst: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.live_reserved_slots = max(0, min(live_reserved_slots, self.max_concurrency - 1))
+        self.rate_per_second = rate_per_minute / 60 if rate_per_minute > 0 else 0.0
+        self.burst = max(1.0, burst)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset_loop_state()
+        self._stats = {
+            "submitted": 0,
+            "coalesced": 0,
+            "started_live": 0,
+            "started_background": 0,
+            "queued": 0,
+            "rate_limited": 0,
+            "max_queue_wait_ms": 0.0,
+        }
+
+    def _reset_loop_state(self):
+        self._in_flight: dict[tuple, _SharedCall] = {}
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._active_background = 0
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+
+    def _bind_loop(self):
+        # Futures belong to one event loop; a new loop (tests, CLI runs) starts with fresh state.
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._reset_loop_state()
+        return loop
+
+    def _can_start(self, priority: int) -> bool:
+        if self._active >= self.max_concurrency:
+            return False
+        if priority == self.PRIORITY_LIVE:
+            return True
+        return self._active_background < self.max_concurrency - self.live_reserved_slots
+
+    def _start(self, priority: int):
+        self._active += 1
+        if priority == self.PRIORITY_LIVE:
+            self._stats["started_live"] += 1
+        else:
+            self._active_background += 1
+            self._stats["started_background"] += 1
+
+    def _release(self, priority: int):
+        self._active -= 1
+        if priority != self.PRIORITY_LIVE:
+            self._active_background -= 1
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        while self._waiters:
+            priority, _, waiter = self._waiters[0]
+            if waiter.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_start(priority):
+                break
+            heapq.heappop(self._waiters)
+            self._start(priority)
+            waiter.set_result(None)
+
+    async def _acquire_slot(self, priority: int):
+        if not self._waiters and self._can_start(priority):
+            self._start(priority)
+            return
+
+        waiter = self._loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        self._stats["queued"] += 1
+        queued_at = time.perf_counter()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(priority)
+            raise
+        wait_ms = (time.perf_counter() - queued_at) * 1000
+        self._stats["max_queue_wait_ms"] = max(self._stats["max_queue_wait_ms"], round(wait_ms, 3))
+
+    async def _take_rate_token(self):
+        if self.rate_per_second <= 0:
+            return
+
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate_per_second)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            self._stats["rate_limited"] += 1
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+
+    async def _run_limited(self, priority: int, call):
+        await self._acquire_slot(priority)
+        try:
+            await self._take_rate_token()
+            return await call()
+        finally:
+            self._release(priority)
+
+    async def run(self, key: Optional[tuple], priority: int, call):
+        """Runs `call()` under the limits; concurrent runs with the same key share one provider request.
+
+        A shared request runs in its own task, so a cancelled caller only stops waiting for it. The
+        request itself is cancelled once no caller is left.
+        """
+        loop = self._bind_loop()
+        self._stats["submitted"] += 1
+        if key is None:
+            return await self._run_limited(priority, call)
+
+        shared = self._in_flight.get(key)
+        if shared is None:
+            shared = _SharedCall(loop.create_task(self._run_limited(priority, call)))
+            self._in_flight[key] = shared
+            shared.task.add_done_callback(lambda _, key=key, shared=shared: self._forget(key, shared))
+        else:
+            self._stats["coalesced"] += 1
+
+        shared.waiters += 1
+        try:
+            return await asyncio.shield(shared.task)
+        except asyncio.CancelledError:
+            if not shared.task.done():
+                shared.waiters -= 1
+                if not shared.waiters:
+                    self._forget(key, shared)
+                    shared.task.cancel()
+            raise
+
+    def _forget(self, key: tuple, shared: "_SharedCall"):
+        if self._in_flight.get(key) is shared:
+            self._in_flight.pop(key, None)
+
+    def metrics(self) -> dict:
+        return {
+            **self._stats,
+            "active": self._active,
+            "active_background": self._active_background,
+            "waiting": sum(1 for _, _, waiter in self._waiters if not waiter.done()),
+            "in_flight_keys": len(self._in_flight),
+            "max_concurrency": self.max_concurrency,
+            "live_reserved_slots": self.live_reserved_slots,
+            "rate_tokens": round(self._tokens, 3),
+        }
+
+
+DISPATCHER = LLMDispatcher(
+    LLM_MAX_CONCURRENCY,
+    LLM_LIVE_RESERVED_SLOTS,
+    LLM_RATE_LIMIT_PER_MINUTE,
+    LLM_RATE_BURST,
+)
+register_metrics_source("llm_dispatcher", DISPATCHER.metrics)
+
+
+_SYNC_CLIENT: Optional[httpx.Client] = None
+_SYNC_CLIENT_LOCK = threading.Lock()
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+_ASYNC_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def _client_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _get_sync_client() -> httpx.Client:
+    """Returns the process-wide keep-alive client used by the blocking API (CLI, worker threads)."""
+    global _SYNC_CLIENT
+    with _SYNC_CLIENT_LOCK:
+        if _SYNC_CLIENT is None or _SYNC_CLIENT.is_closed:
+            _SYNC_CLIENT = httpx.Client(limits=_client_limits(), http2=_http2_available())
+        return _SYNC_CLIENT
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """Returns the long-lived pooled client for the running event loop, so each call reuses warm connections."""
+    global _ASYNC_CLIENT, _ASYNC_CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    if _ASYNC_CLIENT is None or _ASYNC_CLIENT.is_closed or _ASYNC_CLIENT_LOOP is not loop:
+        _ASYNC_CLIENT = httpx.AsyncClient(limits=_client_limits(), http2=_http2_available())
+        _ASYNC_CLIENT_LOOP = loop
+    return _ASYNC_CLIENT
+
+
+async def close_shared_clients():
+    global _SYNC_CLIENT, _ASYNC_CLIENT, _ASYNC_CLIENT_LOOP
+    if _ASYNC_CLIENT is not None and _ASYNC_CLIENT_LOOP is asyncio.get_running_loop():
+        await _ASYNC_CLIENT.aclose()
+    _ASYNC_CLIENT = None
+    _ASYNC_CLIENT_LOOP = None
+
+    with _SYNC_CLIENT_LOCK:
+        if _SYNC_CLIENT is not None:
+            _SYNC_CLIENT.close()
+        _SYNC_CLIENT = None
+
+
+REASON_SYSTEM_PROMPT = (
+    "You convert spoken presenter commands into structured JSON for a live slide controller. "
+    "Return only one JSON object with keys in this order: intent, confidence, direct_command, refers_to_document, target_slide, search_query, target_type. "
+    "Allowed intents: navigate, search, web_search, highlight, zoom, inspect, next, prev, zoom_in, zoom_out, clear. "
+    "Allowed target_type values: auto, text, image. "
+    "Use direct_command=true only for immediate UI controls like clear/next/prev/zoom_in/zoom_out, "
+    "or pure slide navigation with an explicit slide number and no semantic lookup needed. "
+    "Use web_search when the speaker explicitly wants an internet lookup, says google/search the web/look this up/search this online, "
+    "or wants external web information embedded next to the document. "
+    "Use inspect only when the speaker clearly wants to view or open a visual element such as a diagram, chart, figure, picture, graph, or image in more detail. "
+    "If the speaker is referring to ordinary slide text or concepts rather than explicitly asking to see a visual, do not use inspect. Prefer highlight or search instead. "
+    "If the speaker refers to something like 'this', 'here', 'current slide', or 'on this page', use the provided current slide context. "
+    "Use the provided session context to decide whether the speaker is currently discussing slide content or just talking conversationally to students. "
+    "If the speaker is talking to students conversationally, asking classroom-management questions, or saying something not meant to control or reference slide content, set refers_to_document=false. "
+    "If the utterance is about text or visuals on the slide, or is clearly asking to point out something from the document, set refers_to_document=true. "
+    "search_query should be short, focused, and useful for semantic document retrieval. "
+    "If no extra query is needed for a direct command or for non-document speech, use an empty string. "
+    "confidence must be a number between 0 and 1."
+)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You create concise, accurate lecture summaries for students. "
+    "Use both the teacher's spoken lecture transcript and the provided document context. "
+    "Return plain text only, no markdown code fences. "
+    "Use these section headings exactly: Lecture Overview, Key Concepts, Teacher Emphasis, Document Connections, Study Notes. "
+    "Keep the output compact but useful, with short bullet-style lines under each heading. "
+    "Do not invent facts that are not grounded in the supplied speech or document context."
+)
+
+SEGMENT_SYSTEM_PROMPT = (
+    "You condense part of a live lecture into notes for a running summary. "
+    "Return at most 6 short plain-text lines, each starting with '- '. "
+    "Keep concepts, definitions and anything the teacher stressed; drop greetings and classroom chatter. "
+    "Do not invent facts that are not in the supplied text."
+)
+
+
+def _completion_content(data: dict) -> str:
+    return data["choices"][0]["message"]["content"]
+
+
+def _decision_fields(content: str) -> dict:
+    return json.loads(_extract_json_object(content))
+
+
+def _feed_decision_line(parser: IncrementalJSONFieldParser, line: str) -> bool:
+    """Feeds one server-sent event line; True once the rest of the stream can be dropped."""
+    fields = parser.feed(_stream_delta(line) or "")
+    return parser.finished or _decision_is_settled(fields)
+
+
+def _streamed_decision_fields(parser: IncrementalJSONFieldParser) -> dict:
+    parser.close()
+    if "intent" not in parser.fields:
+        raise ValueError("No decision fields found in LLM stream")
+    return parser.fields
+
+
+@dataclass
+class _ReasonRequest:
+    transcript: str
+    current_slide: Optional[int]
+    session_context: str
+    cache_key: Optional[tuple]
+    cached: Optional[LLMCommandDecision]
+
+
+class _BreakerCall:
+    """Times one reasoning call and records its outcome on REASONING_BREAKER.
+
+    Provider errors are logged and swallowed, so the caller falls back to the regex parser. A cancelled
+    (superseded) call is not an outcome: it only releases a half-open probe slot, then propagates.
+    """
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> bool:
+        if exc_type is not None and not issubclass(exc_type, Exception):
+            REASONING_BREAKER.abandon()
+            return False
+        REASONING_BREAKER.record((time.perf_counter() - self.started_at) * 1000, exc_type is None)
+        if exc_type is not None and issubclass(exc_type, Exception):
+            print(f"LLM reasoning unavailable, falling back to regex parser: {exc}")
+            return True
+        return False
+
+
 class LLMCommandReasoner:
     def __init__(self):
         self.enabled = os.getenv("LLM_REASONING_ENABLED", "true").strip().lower() not in {
@@ -136,83 +869,116 @@ class LLMCommandReasoner:
             or os.getenv("LLM_REASONING_EFFORT")
             or ("low" if self.using_gemini else "")
         ).strip().lower()
-        self.timeout_seconds = float(os.getenv("LLM_TIMEOUT_SECONDS", "8"))
+        self.timeout_seconds = LLM_TIMEOUT_SECONDS
+        self.stream_decisions = LLM_STREAM_DECISIONS
 
     @property
     def is_available(self) -> bool:
         return self.enabled and bool(self.api_key)
 
-    def reason(
-        self,
-        transcript: str,
-        current_slide: Optional[int] = None,
-        session_context: str = "",
-    ) -> Optional[LLMCommandDecision]:
-        transcript = (transcript or "").strip()
-        if not transcript or not self.is_available:
-            return None
+    @property
+    def can_reason(self) -> bool:
+        """False while the circuit breaker is open, so callers go straight to the regex parser."""
+        return self.is_available and REASONING_BREAKER.allows_requests()
 
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+    def _chat_payload(self, system_prompt: str, user_prompt: str, temperature: float) -> dict:
         payload = {
             "model": self.model,
-            "temperature": 0,
+            "temperature": temperature,
             "messages": [
-                {
-                        "role": "system",
-                        "content": (
-                            "You convert spoken presenter commands into structured JSON for a live slide controller. "
-                            "Return only one JSON object with keys intent, direct_command, target_slide, search_query, target_type, confidence, refers_to_document. "
-                            "Allowed intents: navigate, search, web_search, highlight, zoom, inspect, next, prev, zoom_in, zoom_out, clear. "
-                            "Allowed target_type values: auto, text, image. "
-                            "Use direct_command=true only for immediate UI controls like clear/next/prev/zoom_in/zoom_out, "
-                            "or pure slide navigation with an explicit slide number and no semantic lookup needed. "
-                            "Use web_search when the speaker explicitly wants an internet lookup, says google/search the web/look this up/search this online, "
-                            "or wants external web information embedded next to the document. "
-                            "Use inspect only when the speaker clearly wants to view or open a visual element such as a diagram, chart, figure, picture, graph, or image in more detail. "
-                            "If the speaker is referring to ordinary slide text or concepts rather than explicitly asking to see a visual, do not use inspect. Prefer highlight or search instead. "
-                            "If the speaker refers to something like 'this', 'here', 'current slide', or 'on this page', use the provided current slide context. "
-                            "Use the provided session context to decide whether the speaker is currently discussing slide content or just talking conversationally to students. "
-                            "If the speaker is talking to students conversationally, asking classroom-management questions, or saying something not meant to control or reference slide content, set refers_to_document=false. "
-                            "If the utterance is about text or visuals on the slide, or is clearly asking to point out something from the document, set refers_to_document=true. "
-                            "search_query should be short, focused, and useful for semantic document retrieval. "
-                            "If no extra query is needed for a direct command or for non-document speech, use an empty string. "
-                            "confidence must be a number between 0 and 1."
-                        ),
-                    },
-                {
-                    "role": "user",
-                    "content": (
-                        f"Current slide: {current_slide if current_slide else 'unknown'}\n"
-                        f"Session context: {session_context or 'none'}\n"
-                        f"Transcript: {transcript}"
-                    ),
-                },
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
             ],
         }
-
         if self.reasoning_effort:
             payload["reasoning_effort"] = self.reasoning_effort
+        return payload
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+    def _post_completion(self, payload: dict, timeout_seconds: float) -> str:
+        response = _get_sync_client().post(
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json=payload,
+            timeout=timeout_seconds,
+        )
+        response.raise_for_status()
+        return _completion_content(response.json())
 
-        try:
-            with httpx.Client(timeout=self.timeout_seconds) as client:
-                response = client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                )
-                response.raise_for_status()
-
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            parsed = json.loads(_extract_json_object(content))
-        except Exception as exc:
-            print(f"LLM reasoning unavailable, falling back to regex parser: {exc}")
-            return None
+    async def _apost_completion(self, payload: dict, timeout_seconds: float) -> str:
+        response = await _get_async_client().post(
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json=payload,
+            timeout=timeout_seconds,
+        )
+        response.raise_for_status()
+        return _completion_content(response.json())
+
+    def _build_reason_payload(
+        self,
+        transcript: str,
+        current_slide: Optional[int] = None,
+        session_context: str = "",
+    ) -> dict:
+        return self._chat_payload(
+            REASON_SYSTEM_PROMPT,
+            (
+                f"Current slide: {current_slide if current_slide else 'unknown'}\n"
+                f"Session context: {session_context or 'none'}\n"
+                f"Transcript: {transcript}"
+            ),
+            temperature=0,
+        )
+
+    def _decision_cache_key(
+        self,
+        transcript: str,
+        current_slide: Optional[int],
+        session_context: str,
+        cache_context: Optional[str],
+    ) -> Optional[tuple]:
+        # Callers pass the stable slice of the session context; the full context is the safe default.
+        context = session_context if cache_context is None else cache_context
+        return DECISION_CACHE.make_key(self.model, transcript, current_slide, context)
+
+    def _stream_decision_fields(self, payload: dict, timeout_seconds: float) -> dict:
+        parser = IncrementalJSONFieldParser()
+        with _get_sync_client().stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json={**payload, "stream": True},
+            timeout=timeout_seconds,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if _feed_decision_line(parser, line):
+                    break
+        return _streamed_decision_fields(parser)
+
+    async def _astream_decision_fields(self, payload: dict, timeout_seconds: float) -> dict:
+        """Reads the completion as server-sent events and closes the stream as soon as the decision is settled."""
+        parser = IncrementalJSONFieldParser()
+        async with _get_async_client().stream(
+            "POST",
+            f"{self.base_url}/chat/completions",
+            headers=self._headers(),
+            json={**payload, "stream": True},
+            timeout=timeout_seconds,
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if _feed_decision_line(parser, line):
+                    break
+        return _streamed_decision_fields(parser)
 
+    def _parse_decision(self, parsed: dict) -> LLMCommandDecision:
         target_slide = parsed.get("target_slide")
         if isinstance(target_slide, str) and target_slide.strip().isdigit():
             target_slide = int(target_slide.strip())
@@ -235,63 +1001,174 @@ class LLMCommandReasoner:
             refers_to_document=bool(parsed.get("refers_to_document", True)),
         )
 
-    def summarize_lecture(
+    def _prepare_reason(
+        self,
+        transcript: str,
+        current_slide: Optional[int],
+        session_context: str,
+        cache_context: Optional[str],
+    ) -> Optional[_ReasonRequest]:
+        """Shared start of `reason` and `areason`; None when there is nothing to ask the model."""
+        transcript = (transcript or "").strip()
+        if not transcript or not self.is_available:
+            return None
+
+        cache_key = self._decision_cache_key(transcript, current_slide, session_context, cache_context)
+        return _ReasonRequest(transcript, current_slide, session_context, cache_key, DECISION_CACHE.get(cache_key))
+
+    def _admit_reason(self, request: _ReasonRequest) -> Optional[tuple[dict, float]]:
+        """Takes a breaker slot and returns the payload and timeout for one provider call, or None while the breaker is open."""
+        if not REASONING_BREAKER.acquire():
+            return None
+        payload = self._build_reason_payload(request.transcript, request.current_slide, request.session_context)
+        return payload, REASONING_BREAKER.timeout_seconds(self.timeout_seconds)
+
+    def _accept_decision(self, request: _ReasonRequest, parsed: Optional[dict]) -> Optional[LLMCommandDecision]:
+        if parsed is None:
+            return None
+        decision = self._parse_decision(parsed)
+        DECISION_CACHE.put(request.cache_key, decision)
+        return decision
+
+    def reason(
+        self,
+        transcript: str,
+        current_slide: Optional[int] = None,
+        session_context: str = "",
+        cache_context: Optional[str] = None,
+    ) -> Optional[LLMCommandDecision]:
+        request = self._prepare_reason(transcript, current_slide, session_context, cache_context)
+        if request is None or request.cached is not None:
+            return request.cached if request else None
+
+        admitted = self._admit_reason(request)
+        if admitted is None:
+            return None
+        payload, timeout_seconds = admitted
+
+        parsed = None
+        with _BreakerCall():
+            if self.stream_decisions:
+                parsed = self._stream_decision_fields(payload, timeout_seconds)
+            else:
+                parsed = _decision_fields(self._post_completion(payload, timeout_seconds))
+        return self._accept_decision(request, parsed)
+
+    async def areason(
+        self,
+        transcript: str,
+        current_slide: Optional[int] = None,
+        session_context: str = "",
+        cache_context: Optional[str] = None,
+    ) -> Optional[LLMCommandDecision]:
+        """Async counterpart of `reason` on the shared pooled client; it does not hold a worker thread.
+
+        Calls go through DISPATCHER at live priority, so concurrent identical commands share one request.
+        """
+        request = self._prepare_reason(transcript, current_slide, session_context, cache_context)
+        if request is None or request.cached is not None:
+            return request.cached if request else None
+
+        context = session_context if cache_context is None else cache_context
+        request_key = _decision_key(self.model, request.transcript, current_slide, context)
+        decision = await DISPATCHER.run(
+            ("reason",) + request_key if request_key else None,
+            DISPATCHER.PRIORITY_LIVE,
+            lambda: self._areason_request(request),
+        )
+        return replace(decision) if decision is not None else None
+
+    async def _areason_request(self, request: _ReasonRequest) -> Optional[LLMCommandDecision]:
+        admitted = self._admit_reason(request)
+        if admitted is None:
+            return None
+        payload, timeout_seconds = admitted
+
+        parsed = None
+        with _BreakerCall():
+            if self.stream_decisions:
+                parsed = await self._astream_decision_fields(payload, timeout_seconds)
+            else:
+                parsed = _decision_fields(await self._apost_completion(payload, timeout_seconds))
+        return self._accept_decision(request, parsed)
+
+    def _build_summary_payload(
         self,
         document_title: str,
         teacher_speech: str,
         document_context: str,
-    ) -> Optional[str]:
+    ) -> Optional[dict]:
+        """The lecture summary request, or None when the LLM is unavailable or there is nothing to summarize."""
         teacher_speech = (teacher_speech or "").strip()
         document_context = (document_context or "").strip()
         if not self.is_available or (not teacher_speech and not document_context):
             return None
 
-        payload = {
-            "model": self.model,
-            "temperature": 0.2,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "You create concise, accurate lecture summaries for students. "
-                        "Use both the teacher's spoken lecture transcript and the provided document context. "
-                        "Return plain text only, no markdown code fences. "
-                        "Use these section headings exactly: Lecture Overview, Key Concepts, Teacher Emphasis, Document Connections, Study Notes. "
-                        "Keep the output compact but useful, with short bullet-style lines under each heading. "
-                        "Do not invent facts that are not grounded in the supplied speech or document context."
-                    ),
-                },
-                {
-                    "role": "user",
-                    "content": (
-                        f"Document title: {document_title or 'Untitled document'}\n\n"
-                        f"Teacher speech:\n{teacher_speech or 'No teacher speech captured.'}\n\n"
-                        f"Document context:\n{document_context or 'No document context available.'}"
-                    ),
-                },
-            ],
-        }
+        return self._chat_payload(
+            SUMMARY_SYSTEM_PROMPT,
+            (
+                f"Document title: {document_title or 'Untitled document'}\n\n"
+                f"Teacher speech:\n{teacher_speech or 'No teacher speech captured.'}\n\n"
+                f"Document context:\n{document_context or 'No document context available.'}"
+            ),
+            temperature=0.2,
+        )
 
-        if self.reasoning_effort:
-            payload["reasoning_effort"] = self.reasoning_effort
+    @property
+    def summary_timeout_seconds(self) -> float:
+        return max(self.timeout_seconds, 20.0)
 
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
+    def summarize_lecture(
+        self,
+        document_title: str,
+        teacher_speech: str,
+        document_context: str,
+    ) -> Optional[str]:
+        payload = self._build_summary_payload(document_title, teacher_speech, document_context)
+        if payload is None:
+            return None
+
+        try:
+            return _strip_code_fences(self._post_completion(payload, self.summary_timeout_seconds))
+        except Exception as exc:
+            print(f"LLM lecture summarization unavailable, falling back to heuristic summary: {exc}")
+            return None
+
+    async def asummarize_lecture(
+        self,
+        document_title: str,
+        teacher_speech: str,
+        document_context: str,
+    ) -> Optional[str]:
+        payload = self._build_summary_payload(document_title, teacher_speech, document_context)
+        if payload is None:
+            return None
+        return await self._adispatch_summary(payload)
+
+    async def asummarize_segment(self, document_title: str, segment_text: str) -> Optional[str]:
+        """Condenses one slice of the running lecture (or a run of earlier notes) for the rolling summary."""
+        segment_text = (segment_text or "").strip()
+        if not self.is_available or not segment_text:
+            return None
+
+        payload = self._chat_payload(
+            SEGMENT_SYSTEM_PROMPT,
+            f"Document title: {document_title or 'Untitled document'}\n\nLecture segment:\n{segment_text}",
+            temperature=0.2,
+        )
+        return await self._adispatch_summary(payload)
+
+    async def _adispatch_summary(self, payload: dict) -> Optional[str]:
+        payload_key = hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+        return await DISPATCHER.run(
+            ("summary", payload_key),
+            DISPATCHER.PRIORITY_BACKGROUND,
+            lambda: self._asummarize_request(payload),
+        )
 
+    async def _asummarize_request(self, payload: dict) -> Optional[str]:
         try:
-            with httpx.Client(timeout=max(self.timeout_seconds, 20.0)) as client:
-                response = client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                )
-                response.raise_for_status()
-
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            return _strip_code_fences(content)
+            return _strip_code_fences(await self._apost_completion(payload, self.summary_timeout_seconds))
         except Exception as exc:
             print(f"LLM lecture summarization unavailable, falling back to heuristic summary: {exc}")
             return None
@@ -1,13 +1,37 @@
+from contextlib import asynccontextmanager
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import os
 import uvicorn
 from fastapi.staticfiles import StaticFiles
 from http_routes import http_router
+from llm_reasoner import close_shared_clients
+from executors import shutdown_executors
+from metrics import collect_metrics
+from runtime_monitor import start_event_loop_monitor, stop_event_loop_monitor
+from session_store import SESSION_STORE
 from websocket_routes import websocket_router
 from settings import UPLOAD_DIR, get_cors_origin_regex, get_cors_origins
+from warmup import run_warmup, warmup_state
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the process can answer /ready (with 503) while it loads.
+    warmup_task = asyncio.create_task(run_warmup())
+    start_event_loop_monitor()
+    yield
+    stop_event_loop_monitor()
+    if not warmup_task.done():
+        warmup_task.cancel()
+    await close_shared_clients()
+    await SESSION_STORE.close()
+    shutdown_executors()
+
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +49,16 @@ app.include_router(websocket_router)
 def health_check():
     return {"status": "ok", "message": "Orato Backend is Running!"}
 
+@app.get("/ready")
+def readiness_check():
+    if not warmup_state["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming_up", **warmup_state})
+    return {"status": "ready", **warmup_state}
+
+@app.get("/metrics")
+def metrics_snapshot():
+    return collect_metrics()
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
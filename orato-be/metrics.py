@@ -0,0 +1,19 @@
+from typing import Callable
+
+
+_METRIC_SOURCES: dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics_source(name: str, collect: Callable[[], dict]):
+    """Registers a callable whose snapshot is reported under `name` by the /metrics endpoint."""
+    _METRIC_SOURCES[name] = collect
+
+
+def collect_metrics() -> dict:
+    snapshot = {}
+    for name, collect in list(_METRIC_SOURCES.items()):
+        try:
+            snapshot[name] = collect()
+        except Exception as exc:
+            snapshot[name] = {"error": str(exc)}
+    return snapshot
@@ -1,7 +1,12 @@
+import os
 import re
+import threading
+from collections import OrderedDict
 from functools import lru_cache
 
-from llm_reasoner import LLMCommandReasoner
+from intent_classifier import INTENT_CLASSIFIER_MIN_CONFIDENCE, load_intent_classifier, log_decision
+from llm_reasoner import ALLOWED_INTENTS, DIRECT_INTENTS, LLMCommandDecision, LLMCommandReasoner
+from metrics import register_metrics_source
 from settings import get_chroma_path
 
 
@@ -242,9 +247,28 @@ CLASSROOM_BEHAVIOR_WORDS = {
 
 COMMAND_REASONER = LLMCommandReasoner()
 
+# Documents with at least this many slides are searched coarse-to-fine: slides first, then blocks.
+COARSE_RETRIEVAL_MIN_SLIDES = int(os.getenv("COARSE_RETRIEVAL_MIN_SLIDES", "80"))
+COARSE_RETRIEVAL_SLIDE_SHORTLIST = int(os.getenv("COARSE_RETRIEVAL_SLIDE_SHORTLIST", "6"))
+
+# Built action responses shared across sessions, so repeated commands on the same deck skip embedding and search.
+RESULT_CACHE_SIZE = int(os.getenv("RETRIEVAL_RESULT_CACHE_SIZE", "1024"))
+
+# "float16" or "int8" keeps warm document indexes as compact NumPy matrices instead of searching Chroma.
+COMPACT_VECTOR_INDEX = os.getenv("COMPACT_VECTOR_INDEX", "off").strip().lower()
+
+
+_EMBEDDING_MODEL_LOCK = threading.Lock()
+
 
-@lru_cache(maxsize=1)
 def _get_embedding_model():
+    # Prefetch, warmup and live sessions may all ask for the model at once; load it only once.
+    with _EMBEDDING_MODEL_LOCK:
+        return _load_embedding_model()
+
+
+@lru_cache(maxsize=1)
+def _load_embedding_model():
     from langchain_huggingface import HuggingFaceEmbeddings
 
     return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
@@ -257,21 +281,195 @@ def _get_chroma_class():
 
 
 _VECTOR_DB_CACHE: dict[str, object] = {}
+_SLIDE_INDEX_CACHE: dict[str, object | None] = {}
+_COMPACT_INDEX_CACHE: dict[str, object] = {}
+_VECTOR_DB_LOCK = threading.Lock()
+_VECTOR_DB_LOAD_LOCKS: dict[str, threading.Lock] = {}
 
 def load_vector_db(doc_id):
     """Loads the specific vector database for the requested document."""
     if doc_id in _VECTOR_DB_CACHE:
         return _VECTOR_DB_CACHE[doc_id]
 
-    vector_db = _get_chroma_class()(
-        collection_name=f"doc_{doc_id}",
-        persist_directory=get_chroma_path(doc_id),
-        embedding_function=_get_embedding_model(),
-    )
-    _VECTOR_DB_CACHE[doc_id] = vector_db
+    with _VECTOR_DB_LOCK:
+        load_lock = _VECTOR_DB_LOAD_LOCKS.setdefault(doc_id, threading.Lock())
+
+    # Single-flight per document: concurrent callers wait for the first load instead of repeating it.
+    with load_lock:
+        if doc_id in _VECTOR_DB_CACHE:
+            return _VECTOR_DB_CACHE[doc_id]
+
+        vector_db = _get_chroma_class()(
+            collection_name=f"doc_{doc_id}",
+            persist_directory=get_chroma_path(doc_id),
+            embedding_function=_get_embedding_model(),
+        )
+        _SLIDE_INDEX_CACHE[doc_id] = _load_slide_index(doc_id)
+        compact_index = _load_compact_index(doc_id, vector_db)
+        if compact_index is not None:
+            _COMPACT_INDEX_CACHE[doc_id] = compact_index
+        _VECTOR_DB_CACHE[doc_id] = vector_db
+        return vector_db
+
+
+def _cached_doc_id(vector_db) -> str | None:
+    """The doc_id a cached index was loaded for, matched by identity so a reused object id never resolves to another document."""
+    for doc_id, cached in list(_VECTOR_DB_CACHE.items()):
+        if cached is vector_db:
+            return doc_id
+    return None
+
+
+def invalidate_document(doc_id):
+    """Drops cached indexes and retrieval results for a document that was re-indexed or deleted."""
+    doc_id = str(doc_id)
+    with _VECTOR_DB_LOCK:
+        _VECTOR_DB_CACHE.pop(doc_id, None)
+        _SLIDE_INDEX_CACHE.pop(doc_id, None)
+        _COMPACT_INDEX_CACHE.pop(doc_id, None)
+        _INDEX_VERSIONS[doc_id] = _INDEX_VERSIONS.get(doc_id, 0) + 1
+
+    with _RESULT_CACHE_LOCK:
+        stale_keys = [key for key in _RESULT_CACHE if key[0] == doc_id]
+        for key in stale_keys:
+            del _RESULT_CACHE[key]
+        _RESULT_CACHE_STATS["invalidations"] += len(stale_keys)
+
+
+def prefetch_document(doc_id):
+    """Loads a document index and touches it once so the first live query does not pay for cold reads."""
+    if doc_id in _VECTOR_DB_CACHE:
+        return _VECTOR_DB_CACHE[doc_id]
+
+    vector_db = load_vector_db(doc_id)
+    _search_results(vector_db, "warmup", k=1)
     return vector_db
 
 
+_INDEX_VERSIONS: dict[str, int] = {}
+_RESULT_CACHE: OrderedDict[tuple, dict] = OrderedDict()
+_RESULT_CACHE_LOCK = threading.Lock()
+_RESULT_CACHE_STATS = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+
+def _result_cache_key(vector_db, intent, target_type, clean_query, k, target_slide=None, current_slide=None, explicit_jump=False):
+    doc_id = _cached_doc_id(vector_db)
+    if not doc_id or RESULT_CACHE_SIZE <= 0:
+        return None
+
+    # current_slide only matters when there is no target slide, through the same-slide score boost.
+    slide_scope = ("target", target_slide) if target_slide else ("current", current_slide)
+    return (
+        doc_id,
+        _INDEX_VERSIONS.get(doc_id, 0),
+        slide_scope,
+        intent,
+        target_type,
+        " ".join(_normalize_query(clean_query).split()),
+        bool(explicit_jump),
+        k,
+    )
+
+
+def _get_cached_result(cache_key):
+    if cache_key is None:
+        return None
+
+    with _RESULT_CACHE_LOCK:
+        cached = _RESULT_CACHE.get(cache_key)
+        if cached is None:
+            _RESULT_CACHE_STATS["misses"] += 1
+            return None
+        _RESULT_CACHE.move_to_end(cache_key)
+        _RESULT_CACHE_STATS["hits"] += 1
+
+    return {**cached, "bbox": list(cached.get("bbox") or [0, 0, 0, 0])}
+
+
+def _store_cached_result(cache_key, response):
+    if cache_key is None or not response:
+        return response
+
+    with _RESULT_CACHE_LOCK:
+        _RESULT_CACHE[cache_key] = {**response, "bbox": list(response.get("bbox") or [0, 0, 0, 0])}
+        _RESULT_CACHE.move_to_end(cache_key)
+        _RESULT_CACHE_STATS["stores"] += 1
+        while len(_RESULT_CACHE) > RESULT_CACHE_SIZE:
+            _RESULT_CACHE.popitem(last=False)
+            _RESULT_CACHE_STATS["evictions"] += 1
+
+    return response
+
+
+def _result_cache_metrics() -> dict:
+    with _RESULT_CACHE_LOCK:
+        lookups = _RESULT_CACHE_STATS["hits"] + _RESULT_CACHE_STATS["misses"]
+        return {
+            **_RESULT_CACHE_STATS,
+            "size": len(_RESULT_CACHE),
+            "capacity": RESULT_CACHE_SIZE,
+            "hit_rate": round(_RESULT_CACHE_STATS["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+
+register_metrics_source("retrieval_result_cache", _result_cache_metrics)
+
+
+def _load_compact_index(doc_id, vector_db):
+    if COMPACT_VECTOR_INDEX in {"", "off", "0", "false", "no"}:
+        return None
+
+    try:
+        from compact_index import CompactVectorIndex
+
+        compact_index = CompactVectorIndex.from_chroma(
+            vector_db,
+            precision=COMPACT_VECTOR_INDEX,
+            embedding_model=_get_embedding_model(),
+        )
+    except Exception as exc:
+        print(f"Compact index unavailable for {doc_id}, searching Chroma directly: {exc}")
+        return None
+
+    print(f"Compact {compact_index.precision} index for {doc_id}: {len(compact_index)} vectors, {compact_index.nbytes} bytes")
+    return compact_index
+
+
+def _compact_index_metrics() -> dict:
+    indexes = dict(_COMPACT_INDEX_CACHE)
+    return {
+        "precision": COMPACT_VECTOR_INDEX,
+        "documents": len(indexes),
+        "vectors": sum(len(index) for index in indexes.values()),
+        "bytes": sum(index.nbytes for index in indexes.values()),
+        "float32_bytes": sum(index.float32_nbytes for index in indexes.values()),
+        "bytes_per_document": {doc_id: index.nbytes for doc_id, index in indexes.items()},
+    }
+
+
+register_metrics_source("compact_vector_index", _compact_index_metrics)
+
+
+def _load_slide_index(doc_id):
+    """Loads the per-slide aggregate index, but only for documents large enough to benefit from it."""
+    try:
+        slide_index = _get_chroma_class()(
+            collection_name=f"doc_{doc_id}_slides",
+            persist_directory=get_chroma_path(doc_id),
+            embedding_function=_get_embedding_model(),
+        )
+        slide_count = slide_index._collection.count()
+    except Exception as exc:
+        print(f"Slide index unavailable for {doc_id}, using flat retrieval: {exc}")
+        return None
+
+    if slide_count < max(1, COARSE_RETRIEVAL_MIN_SLIDES):
+        return None
+
+    print(f"Coarse-to-fine retrieval enabled for {doc_id} ({slide_count} slides)")
+    return slide_index
+
+
 def _normalize_query(query: str) -> str:
     return re.sub(r"[^\w\s]", "", (query or "").lower().strip())
 
@@ -505,8 +703,60 @@ def _is_probably_classroom_chatter(query: str) -> bool:
 
 
 def _search_results(vector_db, clean_query: str, k: int = 8, slide: int | None = None):
+    doc_id = _cached_doc_id(vector_db)
+    # The compact index answers similarity_search_with_score with the same squared L2 distances as Chroma.
+    search_db = _COMPACT_INDEX_CACHE.get(doc_id) or vector_db
+
+    if not slide:
+        slide_index = _SLIDE_INDEX_CACHE.get(doc_id)
+        if slide_index is not None:
+            return _coarse_to_fine_search(search_db, slide_index, clean_query, k=k)
+
     filter_dict = {"slide": slide} if slide else None
-    return vector_db.similarity_search_with_score(clean_query, k=k, filter=filter_dict)
+    return search_db.similarity_search_with_score(clean_query, k=k, filter=filter_dict)
+
+
+def _search_by_vector(search_db, query_vector, k: int, filter_dict: dict | None = None):
+    """
+    Searches by a precomputed embedding and returns (doc, squared L2 distance) pairs, lower is closer:
+    the same contract as `similarity_search_with_score`, which `retrieve` and `preview_highlight` rank by.
+    """
+    collection = getattr(search_db, "_collection", None)
+    if collection is None:
+        # CompactVectorIndex computes the same squared L2 distances over its quantized copy.
+        return search_db.similarity_search_by_vector_with_distances(query_vector, k=k, filter=filter_dict)
+
+    from langchain_core.documents import Document
+
+    # Query the collection directly: the wrapper's "relevance scores" are distances or similarities
+    # depending on the langchain_chroma release.
+    results = collection.query(
+        query_embeddings=[query_vector],
+        n_results=k,
+        where=filter_dict,
+        include=["documents", "metadatas", "distances"],
+    )
+    return [
+        (Document(page_content=content, metadata=metadata or {}), float(distance))
+        for content, metadata, distance in zip(
+            results["documents"][0],
+            results["metadatas"][0],
+            results["distances"][0],
+        )
+        if content is not None
+    ]
+
+
+def _coarse_to_fine_search(vector_db, slide_index, clean_query: str, k: int = 8, shortlist_size: int | None = None):
+    """Shortlists the closest slides by their aggregate vector, then ranks blocks only within them."""
+    query_vector = _get_embedding_model().embed_query(clean_query)
+    shortlist = _search_by_vector(slide_index, query_vector, k=max(1, shortlist_size or COARSE_RETRIEVAL_SLIDE_SHORTLIST))
+    slides = sorted({int(doc.metadata["slide"]) for doc, _ in shortlist if doc.metadata.get("slide") is not None})
+    if not slides:
+        return _search_by_vector(vector_db, query_vector, k=k)
+
+    filter_dict = {"slide": slides[0]} if len(slides) == 1 else {"slide": {"$in": slides}}
+    return _search_by_vector(vector_db, query_vector, k=k, filter_dict=filter_dict)
 
 
 def _build_session_context(session_state: dict | None) -> str:
@@ -526,6 +776,15 @@ def _build_session_context(session_state: dict | None) -> str:
     return "; ".join(part for part in parts if part)
 
 
+def _build_decision_cache_context(session_state: dict | None) -> str:
+    """The part of the session context that may change a decision; recent utterances are left out so repeats can hit."""
+    if not session_state:
+        return ""
+
+    active_page = session_state.get("active_page")
+    return f"doc_focus_score={session_state.get('doc_focus_score', 0)}; active_page={active_page or ''}"
+
+
 def _has_explicit_document_signal(query: str, intent: str = "navigate", target_slide: int | None = None) -> bool:
     query_lower = _normalize_query(query)
     return any(
@@ -565,7 +824,7 @@ def _has_strong_document_signal(query: str, session_state: dict | None = None) -
 
 
 def _should_prefer_llm_for_final(query: str, session_state: dict | None = None) -> bool:
-    if not COMMAND_REASONER.is_available:
+    if not COMMAND_REASONER.can_reason:
         return False
 
     if _is_web_search_candidate(query):
@@ -853,10 +1112,8 @@ def parse_command(query, session_state: dict | None = None):
     }
 
 
-def _should_use_llm(query: str, regex_decision: dict, prefer_llm: bool = False) -> bool:
-    if not COMMAND_REASONER.is_available:
-        return False
-
+def _needs_reasoning(query: str, regex_decision: dict, prefer_llm: bool = False) -> bool:
+    """True when the regex decision is too ambiguous to act on without the classifier or the LLM."""
     if regex_decision.get("intent") == "web_search":
         return False
 
@@ -918,20 +1175,7 @@ def _is_local_highlight_candidate(query: str, parsed: dict) -> bool:
     return len(semantic_terms) >= 3 and parsed.get("intent") == "navigate"
 
 
-def reason_command(query, current_slide=None, session_state: dict | None = None, prefer_llm: bool = False):
-    regex_decision = parse_command(query, session_state=session_state)
-
-    if not _should_use_llm(query, regex_decision, prefer_llm=prefer_llm):
-        return regex_decision
-
-    llm_decision = COMMAND_REASONER.reason(
-        query,
-        current_slide=current_slide,
-        session_context=_build_session_context(session_state),
-    )
-    if not llm_decision:
-        return regex_decision
-
+def _merge_llm_decision(query, regex_decision: dict, llm_decision) -> dict:
     intent = llm_decision.intent
     target_slide = llm_decision.target_slide
     clean_query = llm_decision.search_query.strip()
@@ -975,6 +1219,97 @@ def reason_command(query, current_slide=None, session_state: dict | None = None,
     }
 
 
+def _classify_command(query, regex_decision: dict, session_state: dict | None = None):
+    """Answers a would-be LLM call with the local intent classifier when it is confident enough."""
+    classifier = load_intent_classifier()
+    if classifier is None:
+        return None
+
+    intent, refers_to_document, confidence = classifier.predict(
+        query,
+        (session_state or {}).get("doc_focus_score", 0),
+    )
+    if confidence < INTENT_CLASSIFIER_MIN_CONFIDENCE or intent not in ALLOWED_INTENTS:
+        return None
+
+    decision = _merge_llm_decision(
+        query,
+        regex_decision,
+        LLMCommandDecision(
+            intent=intent,
+            direct_command=intent in DIRECT_INTENTS,
+            target_slide=regex_decision.get("target_slide"),
+            search_query=(regex_decision.get("clean_query") or "").strip(),
+            confidence=confidence,
+            refers_to_document=refers_to_document,
+        ),
+    )
+    decision["reasoning_source"] = "classifier"
+    return decision
+
+
+def plan_command(query, session_state: dict | None = None, prefer_llm: bool = False):
+    """Returns the regex (or classifier) decision and whether the LLM should still be consulted."""
+    regex_decision = parse_command(query, session_state=session_state)
+
+    if not _needs_reasoning(query, regex_decision, prefer_llm=prefer_llm):
+        log_decision(query, session_state, regex_decision, regex_decision, routed_to_llm=False)
+        return regex_decision, False
+
+    classified = _classify_command(query, regex_decision, session_state)
+    if classified:
+        log_decision(query, session_state, regex_decision, classified, routed_to_llm=True)
+        return classified, False
+
+    if not COMMAND_REASONER.can_reason:
+        log_decision(query, session_state, regex_decision, regex_decision, routed_to_llm=True, fallback=True)
+        return regex_decision, False
+
+    return regex_decision, True
+
+
+def refine_command(query, regex_decision: dict, current_slide=None, session_state: dict | None = None):
+    llm_decision = COMMAND_REASONER.reason(
+        query,
+        current_slide=current_slide,
+        session_context=_build_session_context(session_state),
+        cache_context=_build_decision_cache_context(session_state),
+    )
+    decision = _merge_llm_decision(query, regex_decision, llm_decision) if llm_decision else regex_decision
+    log_decision(query, session_state, regex_decision, decision, routed_to_llm=True, fallback=llm_decision is None)
+    return decision
+
+
+async def refine_command_async(query, regex_decision: dict, current_slide=None, session_state: dict | None = None):
+    llm_decision = await COMMAND_REASONER.areason(
+        query,
+        current_slide=current_slide,
+        session_context=_build_session_context(session_state),
+        cache_context=_build_decision_cache_context(session_state),
+    )
+    decision = _merge_llm_decision(query, regex_decision, llm_decision) if llm_decision else regex_decision
+    log_decision(query, session_state, regex_decision, decision, routed_to_llm=True, fallback=llm_decision is None)
+    return decision
+
+
+def reason_command(query, current_slide=None, session_state: dict | None = None, prefer_llm: bool = False):
+    decision, needs_llm = plan_command(query, session_state=session_state, prefer_llm=prefer_llm)
+
+    if not needs_llm:
+        return decision
+
+    return refine_command(query, decision, current_slide, session_state)
+
+
+async def reason_command_async(query, current_slide=None, session_state: dict | None = None, prefer_llm: bool = False):
+    regex_decision, needs_llm = plan_command(query, session_state=session_state, prefer_llm=prefer_llm)
+
+    if not needs_llm:
+        return regex_decision
+
+    return await refine_command_async(query, regex_decision, current_slide, session_state)
+
+
 def analyze_query(query, current_slide=None, session_state: dict | None = None, prefer_llm: bool = False):
     return reason_command(
         query,
@@ -984,6 +1319,15 @@ def analyze_query(query, current_slide=None, session_state: dict | None = None,
     )
 
 
+async def analyze_query_async(query, current_slide=None, session_state: dict | None = None, prefer_llm: bool = False):
+    return await reason_command_async(
+        query,
+        current_slide=current_slide,
+        session_state=session_state,
+        prefer_llm=prefer_llm,
+    )
+
+
 def _filter_results(results_with_scores, intent: str, target_type: str):
     filtered_results = results_with_scores
 
@@ -1142,13 +1486,26 @@ def retrieve(query, vector_db, k=8, current_slide=None, session_state: dict | No
         target_type = "text"
         target_slide = current_slide
         clean_query = " ".join(_semantic_terms(query)).strip() or clean_query
-        results_with_scores = _search_results(vector_db, clean_query, k=k, slide=current_slide)
-    else:
-        results_with_scores = _search_results(vector_db, clean_query, k=k, slide=target_slide)
+
+    cache_key = _result_cache_key(
+        vector_db,
+        intent,
+        target_type,
+        clean_query,
+        k,
+        target_slide=target_slide,
+        current_slide=current_slide,
+        explicit_jump=explicit_jump,
+    )
+    cached_response = _get_cached_result(cache_key)
+    if cached_response is not None:
+        return cached_response
+
+    results_with_scores = _search_results(vector_db, clean_query, k=k, slide=target_slide)
 
     if not results_with_scores:
         if target_slide and explicit_jump:
-            return _build_direct_response("navigate", target_slide)
+            return _store_cached_result(cache_key, _build_direct_response("navigate", target_slide))
         return None
     
     filtered_results = _filter_results(results_with_scores, intent, target_type)
@@ -1157,23 +1514,12 @@ def retrieve(query, vector_db, k=8, current_slide=None, session_state: dict | No
         filtered_results = results_with_scores
 
     # 3. 🔥 DYNAMIC CONTEXT BOOSTING 🔥
-    best_match = None
-    best_adjusted_score = float('inf')
-
-    for doc, raw_score in filtered_results:
-        adjusted_score = raw_score
-        
-        if current_slide and not target_slide and doc.metadata.get("slide") == current_slide:
-            adjusted_score = raw_score * 0.75 
-
-        if adjusted_score < best_adjusted_score:
-            best_adjusted_score = adjusted_score
-            best_match = doc
+    best_match = _select_best_match(filtered_results, current_slide=current_slide, target_slide=target_slide)
 
     if local_highlight_mode:
         intent = "highlight"
 
-    return _build_match_response(intent, best_match)
+    return _store_cached_result(cache_key, _build_match_response(intent, best_match))
 
 if __name__ == "__main__":
     test_doc_id = input("Enter a doc_id to test local retrieval: ")
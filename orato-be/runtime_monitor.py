@@ -0,0 +1,77 @@
+import asyncio
+import os
+import resource
+import threading
+import time
+from collections import deque
+
+from metrics import register_metrics_source
+
+
+EVENT_LOOP_MONITOR_ENABLED = os.getenv("EVENT_LOOP_MONITOR_ENABLED", "true").strip().lower() not in {"0", "false", "no"}
+EVENT_LOOP_MONITOR_INTERVAL_MS = float(os.getenv("EVENT_LOOP_MONITOR_INTERVAL_MS", "100"))
+
+# Roughly the last minute of samples at the default interval.
+loop_lag_ms: deque[float] = deque(maxlen=600)
+monitor_state = {"task": None, "samples": 0, "max_lag_ms": 0.0, "started_at": time.time()}
+
+
+async def _watch_event_loop(interval_s: float):
+    """Sleeps for a fixed interval and records how late the loop woke it up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        due = loop.time() + interval_s
+        await asyncio.sleep(interval_s)
+        lag = max(0.0, (loop.time() - due) * 1000)
+        loop_lag_ms.append(lag)
+        monitor_state["samples"] += 1
+        monitor_state["max_lag_ms"] = max(monitor_state["max_lag_ms"], lag)
+
+
+def start_event_loop_monitor() -> asyncio.Task | None:
+    if not EVENT_LOOP_MONITOR_ENABLED:
+        return None
+    task = monitor_state["task"]
+    if task is None or task.done():
+        task = asyncio.create_task(_watch_event_loop(EVENT_LOOP_MONITOR_INTERVAL_MS / 1000))
+        monitor_state["task"] = task
+    return task
+
+
+def stop_event_loop_monitor():
+    task = monitor_state["task"]
+    if task is not None:
+        task.cancel()
+    monitor_state["task"] = None
+
+
+def _rss_mb() -> float | None:
+    try:
+        with open("/proc/self/statm", encoding="ascii") as handle:
+            resident_pages = int(handle.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _runtime_metrics() -> dict:
+    lags = sorted(loop_lag_ms)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        "pid": os.getpid(),
+        "uptime_s": round(time.time() - monitor_state["started_at"], 1),
+        "cpu_seconds": round(usage.ru_utime + usage.ru_stime, 3),
+        "rss_mb": _rss_mb(),
+        # ru_maxrss is in kilobytes on Linux.
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "threads": threading.active_count(),
+        "loop_lag_samples": monitor_state["samples"],
+        "loop_lag_p50_ms": round(lags[len(lags) // 2], 3) if lags else None,
+        "loop_lag_p95_ms": round(lags[int(len(lags) * 0.95)], 3) if lags else None,
+        "loop_lag_p99_ms": round(lags[min(int(len(lags) * 0.99), len(lags) - 1)], 3) if lags else None,
+        "loop_lag_window_max_ms": round(lags[-1], 3) if lags else None,
+        "loop_lag_max_ms": round(monitor_state["max_lag_ms"], 3),
+    }
+
+
+register_metrics_source("runtime", _runtime_metrics)
@@ -0,0 +1,256 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from dotenv import load_dotenv
+
+from metrics import register_metrics_source
+
+
+load_dotenv(Path(__file__).with_name(".env"))
+
+# Empty keeps sessions in this process; a redis:// URL shares them across workers and nodes.
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "").strip()
+SESSION_STATE_TTL_SECONDS = int(os.getenv("SESSION_STATE_TTL_SECONDS", "86400"))
+SESSION_PENDING_ACTIONS = int(os.getenv("SESSION_PENDING_ACTIONS", "8"))
+SESSION_KEY_PREFIX = os.getenv("SESSION_KEY_PREFIX", "orato").strip() or "orato"
+
+# Process-local bookkeeping (perf_counter timestamps, dedupe signatures) is meaningless to other workers.
+LOCAL_ONLY_FIELDS = {"last_preview_at", "last_preview_signature"}
+
+Deliver = Callable[[dict], Awaitable[None]]
+
+
+def _encode_field(value) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class InProcessSessionStore:
+    """Everything lives in this process: state dicts are shared by reference and actions go to local sockets."""
+
+    shared = False
+
+    def __init__(self):
+        self.pending: dict[str, list[dict]] = {}
+        self.counters = {"published": 0, "queued": 0, "flushed": 0, "dropped": 0}
+
+    async def pull(self, client_id: str, state: dict):
+        return None
+
+    async def push(self, client_id: str, state: dict):
+        return None
+
+    async def load(self, client_id: str) -> dict | None:
+        return None
+
+    async def publish(self, client_id: str, payload: dict) -> bool:
+        # Local sockets are served directly by the caller, so nobody else can be listening.
+        return False
+
+    async def queue_pending(self, client_id: str, payload: dict):
+        queued = self.pending.setdefault(client_id, [])
+        queued.append(payload)
+        self.counters["dropped"] += max(0, len(queued) - SESSION_PENDING_ACTIONS)
+        del queued[:-SESSION_PENDING_ACTIONS]
+        self.counters["queued"] += 1
+
+    async def take_pending(self, client_id: str) -> list[dict]:
+        queued = self.pending.pop(client_id, [])
+        self.counters["flushed"] += len(queued)
+        return queued
+
+    async def subscribe(self, client_id: str, deliver: Deliver):
+        return None
+
+    async def unsubscribe(self, client_id: str):
+        return None
+
+    async def close(self):
+        return None
+
+    def metrics(self) -> dict:
+        return {
+            "backend": "in_process",
+            **self.counters,
+            "pending_clients": len(self.pending),
+        }
+
+
+class RedisSessionStore:
+    """
+    Session state as one Redis hash per client (a JSON value per field) and action delivery over pub/sub.
+
+    Each worker keeps its own working copy of the state and only writes the fields it changed since
+    its last pull or push, so the viewer worker (active_page) and the STT worker (focus, history,
+    summary) do not clobber each other.
+    """
+
+    shared = True
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.url = url
+        # RESP2 keeps older Redis servers and compatible stores (and the benchmark stand-in) usable.
+        self.redis = redis.from_url(url, decode_responses=True, protocol=2)
+        self.pubsub = None
+        self.listener: asyncio.Task | None = None
+        self.handlers: dict[str, Deliver] = {}
+        self.snapshots: dict[str, dict[str, str]] = {}
+        self.counters = {
+            "pulls": 0,
+            "fields_pulled": 0,
+            "pushes": 0,
+            "fields_pushed": 0,
+            "published": 0,
+            "delivered_remote": 0,
+            "received": 0,
+            "queued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "errors": 0,
+        }
+
+    def _state_key(self, client_id: str) -> str:
+        return f"{SESSION_KEY_PREFIX}:session:{client_id}"
+
+    def _pending_key(self, client_id: str) -> str:
+        return f"{SESSION_KEY_PREFIX}:pending:{client_id}"
+
+    def _channel(self, client_id: str) -> str:
+        return f"{SESSION_KEY_PREFIX}:actions:{client_id}"
+
+    async def pull(self, client_id: str, state: dict):
+        """Copies fields another worker changed since our last sync into the local working copy."""
+        remote = await self.redis.hgetall(self._state_key(client_id))
+        snapshot = self.snapshots.setdefault(client_id, {})
+        self.counters["pulls"] += 1
+        for field, encoded in remote.items():
+            if snapshot.get(field) == encoded:
+                continue
+            state[field] = json.loads(encoded)
+            snapshot[field] = encoded
+            self.counters["fields_pulled"] += 1
+
+    async def push(self, client_id: str, state: dict):
+        snapshot = self.snapshots.setdefault(client_id, {})
+        changed = {}
+        for field, value in list(state.items()):
+            if field in LOCAL_ONLY_FIELDS:
+                continue
+            encoded = _encode_field(value)
+            if snapshot.get(field) != encoded:
+                changed[field] = encoded
+        if not changed:
+            return
+
+        key = self._state_key(client_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping=changed)
+            pipe.expire(key, SESSION_STATE_TTL_SECONDS)
+            await pipe.execute()
+        snapshot.update(changed)
+        self.counters["pushes"] += 1
+        self.counters["fields_pushed"] += len(changed)
+
+    async def load(self, client_id: str) -> dict | None:
+        remote = await self.redis.hgetall(self._state_key(client_id))
+        if not remote:
+            return None
+        return {field: json.loads(encoded) for field, encoded in remote.items()}
+
+    async def publish(self, client_id: str, payload: dict) -> bool:
+        """Returns True when a worker holding this client's viewer socket received the payload."""
+        receivers = await self.redis.publish(self._channel(client_id), json.dumps(payload))
+        self.counters["published"] += 1
+        if receivers:
+            self.counters["delivered_remote"] += 1
+        return bool(receivers)
+
+    async def queue_pending(self, client_id: str, payload: dict):
+        key = self._pending_key(client_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, json.dumps(payload))
+            pipe.ltrim(key, -SESSION_PENDING_ACTIONS, -1)
+            pipe.expire(key, SESSION_STATE_TTL_SECONDS)
+            length, _, _ = await pipe.execute()
+        self.counters["dropped"] += max(0, length - SESSION_PENDING_ACTIONS)
+        self.counters["queued"] += 1
+
+    async def take_pending(self, client_id: str) -> list[dict]:
+        key = self._pending_key(client_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lrange(key, 0, -1)
+            pipe.delete(key)
+            queued, _ = await pipe.execute()
+        self.counters["flushed"] += len(queued)
+        return [json.loads(item) for item in queued]
+
+    async def subscribe(self, client_id: str, deliver: Deliver):
+        channel = self._channel(client_id)
+        self.handlers[channel] = deliver
+        if self.pubsub is None:
+            self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(channel)
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self._listen())
+
+    async def unsubscribe(self, client_id: str):
+        channel = self._channel(client_id)
+        self.handlers.pop(channel, None)
+        if self.pubsub is not None:
+            await self.pubsub.unsubscribe(channel)
+
+    async def _listen(self):
+        while self.handlers:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.counters["errors"] += 1
+                print(f"Session store subscription error: {exc}")
+                await asyncio.sleep(1.0)
+                continue
+
+            if not message or message.get("type") != "message":
+                continue
+
+            deliver = self.handlers.get(message["channel"])
+            if deliver is None:
+                continue
+            self.counters["received"] += 1
+            try:
+                await deliver(json.loads(message["data"]))
+            except Exception as exc:
+                self.counters["errors"] += 1
+                print(f"Could not deliver action from {message['channel']}: {exc}")
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+        if self.pubsub is not None:
+            await self.pubsub.aclose()
+        await self.redis.aclose()
+
+    def metrics(self) -> dict:
+        return {
+            "backend": "redis",
+            **self.counters,
+            "subscribed_clients": len(self.handlers),
+            "tracked_sessions": len(self.snapshots),
+        }
+
+
+def create_session_store(url: str = SESSION_STORE_URL):
+    if not url:
+        return InProcessSessionStore()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url)
+    raise ValueError(f"Unsupported SESSION_STORE_URL scheme: {url}")
+
+
+SESSION_STORE = create_session_store()
+register_metrics_source("session_store", SESSION_STORE.metrics)
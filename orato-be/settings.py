@@ -17,6 +17,10 @@ def get_chroma_path(doc_id: str) -> str:
     return str((CHROMA_DIR / str(doc_id)).resolve())
 
 
+def get_library_chroma_path(owner_id: str) -> str:
+    return str((CHROMA_DIR / "library" / str(owner_id)).resolve())
+
+
 def get_cors_origins() -> list[str]:
     raw_value = os.getenv("CORS_ORIGINS", "")
     origins = [origin.strip() for origin in raw_value.split(",") if origin.strip()]
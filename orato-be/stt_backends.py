@@ -0,0 +1,479 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator
+
+from metrics import register_metrics_source
+
+
+# google (default) streams to Google Cloud Speech; replay emits a scripted transcript offline.
+STT_BACKEND = os.getenv("STT_BACKEND", "google").strip().lower()
+STT_REPLAY_SCRIPT = os.getenv(
+    "STT_REPLAY_SCRIPT",
+    str(Path(__file__).resolve().parent / "benchmarks" / "transcripts" / "sample_lecture.jsonl"),
+)
+STT_REPLAY_SPEED = float(os.getenv("STT_REPLAY_SPEED", "1.0"))
+STT_REPLAY_LOOP = os.getenv("STT_REPLAY_LOOP", "false").strip().lower() == "true"
+# Pacing for plain-text scripts, which carry no timestamps of their own.
+STT_REPLAY_WORDS_PER_SECOND = float(os.getenv("STT_REPLAY_WORDS_PER_SECOND", "2.6"))
+
+# Google caps a streaming recognize call at about 305 s. Streams are rotated after a final once they are
+# STT_STREAM_ROTATE_SECONDS old, and forced over at STT_STREAM_MAX_SECONDS even mid-utterance.
+STT_STREAM_ROTATE_SECONDS = float(os.getenv("STT_STREAM_ROTATE_SECONDS", "240"))
+STT_STREAM_MAX_SECONDS = float(os.getenv("STT_STREAM_MAX_SECONDS", "290"))
+# Recent audio replayed into the next stream, so words spoken during the hand-over are not lost.
+STT_STREAM_REPLAY_MS = int(os.getenv("STT_STREAM_REPLAY_MS", "5000"))
+# Consecutive stream failures (without a result in between) tolerated before the session gives up.
+STT_STREAM_MAX_RESTARTS = int(os.getenv("STT_STREAM_MAX_RESTARTS", "3"))
+
+_replay_scripts: dict[str, list[dict]] = {}
+stream_counters = {
+    "streams_opened": 0,
+    "rotations": 0,
+    "forced_rotations": 0,
+    "restarts_after_error": 0,
+    "stream_errors": 0,
+    "replayed_audio_s": 0.0,
+    "finals_deduplicated": 0,
+    "finals_trimmed": 0,
+}
+
+
+@dataclass
+class SpeechResult:
+    transcript: str
+    is_final: bool
+
+
+class SpeechBackend(ABC):
+    """
+    A speech recognizer for one STT socket.
+
+    `stream` consumes LINEAR16 audio chunks at `sample_rate` and yields interim and final results;
+    it ends once the audio ends.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def stream(self, audio: AsyncIterator[bytes], sample_rate: int) -> AsyncIterator[SpeechResult]:
+        ...
+
+
+def _load_google_types():
+    from google.cloud.speech_v1 import SpeechAsyncClient
+    from google.cloud.speech_v1.types import (
+        RecognitionConfig,
+        StreamingRecognitionConfig,
+        StreamingRecognizeRequest,
+    )
+
+    return (
+        SpeechAsyncClient,
+        RecognitionConfig,
+        StreamingRecognitionConfig,
+        StreamingRecognizeRequest,
+    )
+
+
+def _normalized_words(text: str) -> list[str]:
+    return [re.sub(r"[^\w']", "", word.lower()) for word in text.split()]
+
+
+def _merge_overlapping_final(transcript: str, other_stream_finals: list[tuple[list[str], bool]]) -> str:
+    """
+    Drops a final that repeats one the other stream of a hand-over already emitted, or trims the words
+    it shares with the end of that stream's latest final. `other_stream_finals` holds (normalized words,
+    finalized on half-close) pairs, newest last. Returns what is left to emit.
+    """
+    words = transcript.split()
+    normalized = _normalized_words(transcript)
+    if not normalized or not other_stream_finals:
+        return transcript
+
+    size = len(normalized)
+    for previous, _ in other_stream_finals:
+        if any(previous[start : start + size] == normalized for start in range(len(previous) - size + 1)):
+            stream_counters["finals_deduplicated"] += 1
+            return ""
+
+    # A half-closed stream finalizes mid-utterance, so even one shared word is a repeat; otherwise a
+    # single matching word is as likely to be a coincidence.
+    previous, half_closed = other_stream_finals[-1]
+    min_overlap = 1 if half_closed else 2
+    for overlap in range(min(len(previous), size - 1), min_overlap - 1, -1):
+        if previous[-overlap:] == normalized[:overlap]:
+            stream_counters["finals_trimmed"] += 1
+            return " ".join(words[overlap:])
+    return transcript
+
+
+class _AudioRing:
+    """The last `keep_ms` of session audio, with each frame's offset in seconds from the start of the session."""
+
+    def __init__(self, sample_rate: int, keep_ms: int):
+        self.bytes_per_second = sample_rate * 2
+        self.keep_s = keep_ms / 1000
+        self.frames: deque[tuple[float, bytes]] = deque()
+        self.total_s = 0.0
+
+    def append(self, frame: bytes):
+        self.frames.append((self.total_s, frame))
+        self.total_s += len(frame) / self.bytes_per_second
+        while self.frames and self.frames[0][0] < self.total_s - self.keep_s:
+            self.frames.popleft()
+
+    def since(self, offset_s: float) -> tuple[float, list[bytes]]:
+        """Frames that end after `offset_s`, and the session offset of the first one."""
+        frames = [
+            (start, frame) for start, frame in self.frames if start + len(frame) / self.bytes_per_second > offset_s
+        ]
+        return (frames[0][0] if frames else self.total_s), [frame for _, frame in frames]
+
+
+class _RecognitionStream:
+    def __init__(self, generation: int, start_offset_s: float, overlap_until_s: float | None):
+        self.generation = generation
+        # Session audio offset of this stream's first frame; result end times are relative to it.
+        self.start_offset_s = start_offset_s
+        # Replayed audio ends at this offset: the stream's first final, and any final ending before it,
+        # may repeat words the previous stream already emitted.
+        self.overlap_until_s = overlap_until_s
+        self.finals_seen = 0
+        self.frames: asyncio.Queue = asyncio.Queue()
+        self.opened_at = time.monotonic()
+        self.retiring = False
+        self.task: asyncio.Task | None = None
+
+    def close(self):
+        self.frames.put_nowait(None)
+
+
+class RotatingSpeechBackend(SpeechBackend):
+    """
+    Runs one session over a chain of recognition streams, each kept below the provider's duration limit.
+
+    A new stream is opened after a final once the current one is `rotate_seconds` old, or at
+    `max_seconds` regardless. It is primed with the audio since the last final (at most `replay_ms`).
+    The old stream is then half-closed so it can finalize what it already heard. Finals from the
+    overlap are de-duplicated against recent finals, and only the current stream's interims are passed
+    on. A failed stream is replaced the same way.
+    """
+
+    def __init__(
+        self,
+        rotate_seconds: float = STT_STREAM_ROTATE_SECONDS,
+        max_seconds: float = STT_STREAM_MAX_SECONDS,
+        replay_ms: int = STT_STREAM_REPLAY_MS,
+        max_restarts: int = STT_STREAM_MAX_RESTARTS,
+    ):
+        self.rotate_seconds = rotate_seconds
+        self.max_seconds = max_seconds
+        self.replay_ms = replay_ms
+        self.max_restarts = max_restarts
+
+    @abstractmethod
+    def _recognize(self, frames: asyncio.Queue, sample_rate: int) -> AsyncIterator[tuple[SpeechResult, float | None]]:
+        """One provider stream over `frames` until a None sentinel: results with their end time in stream audio seconds."""
+
+    async def _pump_results(self, stream: _RecognitionStream, sample_rate: int, results: asyncio.Queue):
+        try:
+            async for result, end_s in self._recognize(stream.frames, sample_rate):
+                await results.put((stream, result, end_s))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            await results.put((stream, exc, None))
+        finally:
+            results.put_nowait((stream, None, None))
+
+    async def stream(self, audio: AsyncIterator[bytes], sample_rate: int) -> AsyncIterator[SpeechResult]:
+        ring = _AudioRing(sample_rate, self.replay_ms)
+        results: asyncio.Queue = asyncio.Queue()
+        # (stream generation, normalized words, finalized on half-close) of recently emitted finals.
+        recent_finals: deque[tuple[int, list[str], bool]] = deque(maxlen=6)
+        live: set[_RecognitionStream] = set()
+        session = {"current": None, "generation": 0, "audio_ended": False, "last_final_end_s": 0.0}
+
+        def open_stream(replay_from_s: float | None) -> _RecognitionStream:
+            start_offset_s, replay = ring.since(replay_from_s) if replay_from_s is not None else (ring.total_s, [])
+            session["generation"] += 1
+            stream = _RecognitionStream(
+                session["generation"],
+                start_offset_s,
+                ring.total_s if replay_from_s is not None else None,
+            )
+            for frame in replay:
+                stream.frames.put_nowait(frame)
+            stream.task = asyncio.create_task(self._pump_results(stream, sample_rate, results))
+            live.add(stream)
+            stream_counters["streams_opened"] += 1
+            stream_counters["replayed_audio_s"] += ring.total_s - start_offset_s
+            return stream
+
+        def rotate(reason: str) -> _RecognitionStream:
+            previous = session["current"]
+            replay_from_s = max(session["last_final_end_s"], ring.total_s - self.replay_ms / 1000)
+            current = open_stream(replay_from_s)
+            session["current"] = current
+            if previous is not None:
+                previous.retiring = True
+                previous.close()
+            print(
+                f"Rotated STT stream to #{current.generation} ({reason}); "
+                f"replayed {ring.total_s - current.start_offset_s:.1f} s of audio"
+            )
+            return current
+
+        async def pump_audio():
+            try:
+                async for frame in audio:
+                    ring.append(frame)
+                    session["current"].frames.put_nowait(frame)
+            finally:
+                session["audio_ended"] = True
+                session["current"].close()
+
+        session["current"] = open_stream(None)
+        audio_task = asyncio.create_task(pump_audio())
+        failures = 0
+        try:
+            while live:
+                # Once the audio has ended the remaining streams are only finishing, so there is no deadline.
+                deadline = None
+                if not session["audio_ended"]:
+                    deadline = max(session["current"].opened_at + self.max_seconds - time.monotonic(), 0.001)
+                try:
+                    stream, result, end_s = await asyncio.wait_for(results.get(), timeout=deadline)
+                except asyncio.TimeoutError:
+                    if not session["audio_ended"]:
+                        stream_counters["forced_rotations"] += 1
+                        rotate("duration limit")
+                    continue
+
+                if result is None:
+                    live.discard(stream)
+                    if stream is session["current"] and not session["audio_ended"]:
+                        # The provider ended the stream on its own; carry on in a new one.
+                        rotate("stream ended")
+                    continue
+
+                if isinstance(result, Exception):
+                    stream_counters["stream_errors"] += 1
+                    failures += 1
+                    if failures > self.max_restarts:
+                        raise result
+                    print(f"STT stream #{stream.generation} failed: {result}")
+                    if stream is session["current"] and not session["audio_ended"]:
+                        stream_counters["restarts_after_error"] += 1
+                        rotate("error")
+                    continue
+
+                failures = 0
+                if not result.is_final:
+                    if stream is session["current"]:
+                        yield result
+                    continue
+
+                end_offset_s = stream.start_offset_s + end_s if end_s is not None else None
+                transcript = result.transcript
+                in_overlap = stream.retiring or (
+                    stream.overlap_until_s is not None
+                    and (not stream.finals_seen or end_offset_s is None or end_offset_s <= stream.overlap_until_s)
+                )
+                stream.finals_seen += 1
+                if in_overlap:
+                    # A recognizer never repeats itself, so only the other stream's finals can overlap.
+                    transcript = _merge_overlapping_final(
+                        transcript,
+                        [(words, half_closed) for generation, words, half_closed in recent_finals if generation != stream.generation],
+                    )
+                if end_offset_s is not None:
+                    session["last_final_end_s"] = max(session["last_final_end_s"], end_offset_s)
+                if transcript:
+                    recent_finals.append((stream.generation, _normalized_words(result.transcript), stream.retiring))
+                    yield SpeechResult(transcript, True)
+
+                age = time.monotonic() - session["current"].opened_at
+                if stream is session["current"] and age >= self.rotate_seconds and not session["audio_ended"]:
+                    stream_counters["rotations"] += 1
+                    rotate("after final")
+        finally:
+            audio_task.cancel()
+            for stream in live:
+                stream.close()
+                stream.task.cancel()
+
+
+class GoogleSpeechBackend(RotatingSpeechBackend):
+    name = "google"
+
+    def __init__(self, language_code: str = "en-US", **rotation):
+        super().__init__(**rotation)
+        self.language_code = language_code
+        self.client = None
+
+    async def _recognize(self, frames: asyncio.Queue, sample_rate: int) -> AsyncIterator[tuple[SpeechResult, float | None]]:
+        (
+            SpeechAsyncClient,
+            RecognitionConfig,
+            StreamingRecognitionConfig,
+            StreamingRecognizeRequest,
+        ) = _load_google_types()
+
+        if self.client is None:
+            self.client = SpeechAsyncClient()
+        config = RecognitionConfig(
+            encoding=RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate,
+            language_code=self.language_code,
+            enable_automatic_punctuation=True,
+        )
+        streaming_config = StreamingRecognitionConfig(
+            config=config,
+            interim_results=True,
+        )
+
+        async def requests():
+            yield StreamingRecognizeRequest(streaming_config=streaming_config)
+            while True:
+                chunk = await frames.get()
+                if chunk is None:
+                    return
+                yield StreamingRecognizeRequest(audio_content=chunk)
+
+        responses = await self.client.streaming_recognize(requests=requests())
+        async for response in responses:
+            if not response.results:
+                continue
+
+            result = response.results[0]
+            if not result.alternatives:
+                continue
+
+            end_time = getattr(result, "result_end_time", None)
+            yield (
+                SpeechResult(result.alternatives[0].transcript, result.is_final),
+                end_time.total_seconds() if end_time is not None else None,
+            )
+
+
+def _script_from_text(lines: list[str], words_per_second: float, seed: int = 7) -> list[dict]:
+    """Times one utterance per line the way Google streams it: growing interims, then the final."""
+    rng = random.Random(seed)
+    events, at = [], 0.8
+    for line in lines:
+        words = line.split()
+        if not words:
+            continue
+        spoken = 0
+        while spoken < len(words):
+            step = rng.randint(1, 3)
+            spoken = min(len(words), spoken + step)
+            at += step / words_per_second
+            if spoken < len(words):
+                events.append({"at": round(at, 3), "type": "interim", "text": " ".join(words[:spoken]).lower().rstrip(".,?!")})
+        at += rng.uniform(0.3, 0.6)
+        events.append({"at": round(at, 3), "type": "final", "text": " ".join(words)})
+        at += rng.uniform(0.6, 1.6)
+    return events
+
+
+def load_replay_script(path: str) -> list[dict]:
+    """
+    Interim/final events from a recorded JSONL transcript (STT_TRANSCRIPT_RECORD_DIR format) or a plain
+    text file with one utterance per line. Times start at zero; page events are left out.
+    """
+    if path in _replay_scripts:
+        return _replay_scripts[path]
+
+    text = Path(path).read_text(encoding="utf-8")
+    if path.endswith(".jsonl"):
+        events = [json.loads(line) for line in text.splitlines() if line.strip()]
+        events = [event for event in events if event.get("type") in {"interim", "final"}]
+        events.sort(key=lambda event: float(event.get("at", 0.0)))
+    else:
+        events = _script_from_text(text.splitlines(), STT_REPLAY_WORDS_PER_SECOND)
+
+    origin = float(events[0].get("at", 0.0)) if events else 0.0
+    script = [{**event, "at": float(event.get("at", 0.0)) - origin} for event in events]
+    _replay_scripts[path] = script
+    return script
+
+
+class ReplaySpeechBackend(SpeechBackend):
+    """
+    Emits a scripted transcript on its own timestamps (divided by `speed`) while draining the audio.
+
+    Results are only produced while audio keeps arriving, like a real recognizer: the stream ends as
+    soon as the client stops sending, and after the script unless `loop` is set.
+    """
+
+    name = "replay"
+
+    def __init__(self, script: list[dict], speed: float = 1.0, loop: bool = False):
+        self.script = script
+        self.speed = max(speed, 0.01)
+        self.loop = loop and bool(script)
+        self.audio_bytes = 0
+
+    async def stream(self, audio: AsyncIterator[bytes], sample_rate: int) -> AsyncIterator[SpeechResult]:
+        audio_ended = asyncio.Event()
+
+        async def drain():
+            try:
+                async for chunk in audio:
+                    self.audio_bytes += len(chunk)
+            finally:
+                audio_ended.set()
+
+        drainer = asyncio.create_task(drain())
+        event_loop = asyncio.get_running_loop()
+        started_at = event_loop.time()
+        duration = (self.script[-1]["at"] + 1.0) if self.script else 0.0
+        offset = 0.0
+        try:
+            while True:
+                for event in self.script:
+                    delay = started_at + (offset + event["at"]) / self.speed - event_loop.time()
+                    if delay > 0:
+                        try:
+                            await asyncio.wait_for(audio_ended.wait(), timeout=delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    if audio_ended.is_set():
+                        return
+                    yield SpeechResult(event["text"], event["type"] == "final")
+                if not self.loop:
+                    break
+                offset += duration
+            await audio_ended.wait()
+        finally:
+            drainer.cancel()
+
+
+def create_speech_backend() -> SpeechBackend:
+    if STT_BACKEND == "replay":
+        return ReplaySpeechBackend(load_replay_script(STT_REPLAY_SCRIPT), STT_REPLAY_SPEED, STT_REPLAY_LOOP)
+    return GoogleSpeechBackend()
+
+
+def warm_speech_backend():
+    if STT_BACKEND == "replay":
+        load_replay_script(STT_REPLAY_SCRIPT)
+    else:
+        _load_google_types()
+
+
+def _stream_metrics() -> dict:
+    return {name: round(value, 1) if isinstance(value, float) else value for name, value in stream_counters.items()}
+
+
+register_metrics_source("stt_streams", _stream_metrics)
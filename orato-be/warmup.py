@@ -0,0 +1,103 @@
+import os
+import time
+
+from executors import BACKGROUND_EXECUTOR
+from settings import get_chroma_path
+
+
+STARTUP_WARMUP_ENABLED = os.getenv("STARTUP_WARMUP_ENABLED", "true").strip().lower() not in {"0", "false", "no"}
+WARMUP_DOC_LIMIT = int(os.getenv("WARMUP_DOC_LIMIT", "3"))
+
+warmup_state = {
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "duration_ms": None,
+    "documents": [],
+    "failed_documents": [],
+    "errors": [],
+}
+
+
+def _warm_speech_client():
+    from stt_backends import warm_speech_backend
+
+    warm_speech_backend()
+
+
+def _warm_embedding_model():
+    from retreival_pipeline import _get_embedding_model
+
+    # The first encode call initializes torch kernels, so run one now rather than on the first command.
+    _get_embedding_model().embed_query("warmup")
+
+
+def _warm_intent_classifier():
+    from intent_classifier import load_intent_classifier
+
+    classifier = load_intent_classifier()
+    if classifier is not None:
+        classifier.predict("warmup")
+
+
+def _warm_document_index(doc_id: str):
+    from retreival_pipeline import prefetch_document
+
+    prefetch_document(doc_id)
+    return True
+
+
+async def _recent_document_ids(limit: int) -> list[str]:
+    from database import db
+
+    cursor = (
+        db.documents.find({}, {"_id": 1})
+        .sort([("last_opened_at", -1), ("uploaded_at", -1)])
+        .limit(limit * 3)
+    )
+    doc_ids = []
+    async for doc in cursor:
+        doc_id = str(doc["_id"])
+        if os.path.exists(get_chroma_path(doc_id)):
+            doc_ids.append(doc_id)
+        if len(doc_ids) >= limit:
+            break
+    return doc_ids
+
+
+async def _run_step(name: str, coroutine):
+    try:
+        return await coroutine
+    except Exception as exc:
+        print(f"⚠️ Warmup step '{name}' failed: {exc}")
+        warmup_state["errors"].append(f"{name}: {exc}")
+        return None
+
+
+async def run_warmup():
+    """Initializes the database and preloads models and recent indexes before reporting ready."""
+    started_at = time.perf_counter()
+    warmup_state["started_at"] = time.time()
+
+    from database import init_db
+
+    await _run_step("init_db", init_db())
+    # The classifier is a few MB, so it is loaded even when the heavier warmup is off; otherwise the first
+    # ambiguous command would pay for the sklearn import and joblib load.
+    await _run_step("intent_classifier", BACKGROUND_EXECUTOR.run(_warm_intent_classifier))
+
+    if STARTUP_WARMUP_ENABLED:
+        await _run_step("speech_client", BACKGROUND_EXECUTOR.run(_warm_speech_client))
+        await _run_step("embedding_model", BACKGROUND_EXECUTOR.run(_warm_embedding_model))
+
+        doc_ids = await _run_step("recent_documents", _recent_document_ids(WARMUP_DOC_LIMIT)) or []
+        for doc_id in doc_ids:
+            if await _run_step(f"document:{doc_id}", BACKGROUND_EXECUTOR.run(_warm_document_index, doc_id)):
+                warmup_state["documents"].append(doc_id)
+            else:
+                warmup_state["failed_documents"].append(doc_id)
+
+    warmup_state["finished_at"] = time.time()
+    warmup_state["duration_ms"] = round((time.perf_counter() - started_at) * 1000, 1)
+    warmup_state["ready"] = True
+    print(f"🔥 Warmup finished in {warmup_state['duration_ms']} ms ({len(warmup_state['documents'])} documents preloaded)")
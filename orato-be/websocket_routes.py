@@ -1,38 +1,159 @@
 import asyncio
 import json
+import os
 import time
+import uuid
+from pathlib import Path
+from collections import deque
 from typing import Dict
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
+from action_protocol import PROTOCOL_MSGPACK, encode_json, encode_msgpack_frame, negotiate_protocol
+from audio_pipeline import AudioPipeline, resolve_client_sample_rate
+from executors import BACKGROUND_EXECUTOR, LIVE_EXECUTOR
+from metrics import register_metrics_source
+from lecture_summary import note_utterance, start_rolling_summary, stop_rolling_summary
+from session_store import SESSION_STORE
+from stt_backends import create_speech_backend
+
 
 websocket_router = APIRouter()
 
-active_connections: Dict[str, WebSocket] = {}
+active_connections: Dict[str, "ViewerConnection"] = {}
+# This worker's working copies of session state; SESSION_STORE shares them when several workers run.
 client_states: Dict[str, dict] = {}
-pending_actions: Dict[str, list[dict]] = {}
+index_prefetch_tasks: Dict[str, asyncio.Task] = {}
+command_refinement_tasks: set[asyncio.Task] = set()
+
+STT_FINAL_QUEUE_SIZE = int(os.getenv("STT_FINAL_QUEUE_SIZE", "16"))
+# How long a closing STT socket waits for queued final commands before abandoning them.
+STT_PIPELINE_DRAIN_SECONDS = float(os.getenv("STT_PIPELINE_DRAIN_SECONDS", "10"))
+
+pipeline_counters = {
+    "finals_queued": 0,
+    "finals_processed": 0,
+    "finals_dropped": 0,
+    "final_failures": 0,
+    "max_final_queue_depth": 0,
+    "interims_started": 0,
+    "interims_cancelled": 0,
+    "interims_throttled": 0,
+}
+final_queue_wait_ms: deque[float] = deque(maxlen=512)
+
+# When set, interim/final transcripts and page changes are appended per client as JSONL
+# so they can be replayed with `python -m benchmarks.replay_transcript`.
+TRANSCRIPT_RECORD_DIR = os.getenv("STT_TRANSCRIPT_RECORD_DIR", "").strip()
+transcript_buffers: Dict[str, list[str]] = {}
+transcript_writers: Dict[str, asyncio.Task] = {}
 
 
 def _load_retrieval_tools():
-    from retreival_pipeline import analyze_query, load_vector_db, preview_highlight, retrieve
+    from retreival_pipeline import plan_command, preview_highlight, refine_command_async, retrieve
 
-    return analyze_query, load_vector_db, preview_highlight, retrieve
+    return plan_command, refine_command_async, preview_highlight, retrieve
 
 
-def _load_speech_types():
-    from google.cloud.speech_v1 import SpeechAsyncClient
-    from google.cloud.speech_v1.types import (
-        RecognitionConfig,
-        StreamingRecognitionConfig,
-        StreamingRecognizeRequest,
-    )
+def _doc_id_from_client_id(client_id: str) -> str:
+    parts = client_id.split("_")
+    return parts[-1] if len(parts) > 1 else client_id
 
-    return (
-        SpeechAsyncClient,
-        RecognitionConfig,
-        StreamingRecognitionConfig,
-        StreamingRecognizeRequest,
-    )
+
+def _prefetch_document_index(doc_id: str) -> asyncio.Task:
+    """Starts (or joins) a background load of the document index, embedding model and slide index."""
+    task = index_prefetch_tasks.get(doc_id)
+    if task is not None:
+        return task
+
+    from retreival_pipeline import prefetch_document
+
+    task = asyncio.create_task(LIVE_EXECUTOR.run(prefetch_document, doc_id))
+    index_prefetch_tasks[doc_id] = task
+
+    def _forget(finished: asyncio.Task):
+        if index_prefetch_tasks.get(doc_id) is finished:
+            index_prefetch_tasks.pop(doc_id, None)
+        if not finished.cancelled() and finished.exception():
+            print(f"Prefetch of vector DB for {doc_id} failed: {finished.exception()}")
+
+    task.add_done_callback(_forget)
+    return task
+
+
+def _new_client_state() -> dict:
+    return {
+        "active_page": 1,
+        "last_preview_transcript": "",
+        "last_preview_signature": None,
+        "last_preview_at": 0.0,
+        "recent_utterances": [],
+        "transcript_history": [],
+        "doc_focus_score": 0,
+        "viewer_mode": "document",
+        "last_focus_text": "",
+        "last_focus_title": "",
+        "last_focus_slide": 1,
+        "last_focus_type": "text",
+    }
+
+
+async def _pull_client_state(client_id: str) -> dict:
+    state = client_states.setdefault(client_id, _new_client_state())
+    try:
+        await SESSION_STORE.pull(client_id, state)
+    except Exception as exc:
+        print(f"Using local session state for {client_id}; store pull failed: {exc}")
+    return state
+
+
+async def _push_client_state(client_id: str):
+    state = client_states.get(client_id)
+    if state is None:
+        return
+    try:
+        await SESSION_STORE.push(client_id, state)
+    except Exception as exc:
+        print(f"Could not save session state for {client_id}: {exc}")
+
+
+async def read_client_state(client_id: str) -> dict | None:
+    """Session state for HTTP routes, which may run on a different worker than the session sockets."""
+    if client_id in client_states:
+        return await _pull_client_state(client_id)
+    try:
+        return await SESSION_STORE.load(client_id)
+    except Exception as exc:
+        print(f"Could not load session state for {client_id}: {exc}")
+        return None
+
+
+def _write_transcript_lines(client_id: str, lines: list[str]):
+    record_dir = Path(TRANSCRIPT_RECORD_DIR)
+    record_dir.mkdir(parents=True, exist_ok=True)
+    with (record_dir / f"{client_id}.jsonl").open("a", encoding="utf-8") as handle:
+        handle.writelines(lines)
+
+
+async def _drain_transcript_buffer(client_id: str):
+    # One writer per client keeps lines in order; events that arrive during a write go out in the next batch.
+    while transcript_buffers.get(client_id):
+        lines = transcript_buffers.pop(client_id)
+        try:
+            await BACKGROUND_EXECUTOR.run(_write_transcript_lines, client_id, lines)
+        except Exception as exc:
+            print(f"Could not record {len(lines)} transcript events for {client_id}: {exc}")
+    transcript_writers.pop(client_id, None)
+
+
+def _record_transcript_event(client_id: str, event: dict):
+    """Buffers the event with its arrival time; the file append runs on the background executor."""
+    if not TRANSCRIPT_RECORD_DIR:
+        return
+
+    transcript_buffers.setdefault(client_id, []).append(json.dumps({"at": round(time.time(), 3), **event}) + "\n")
+    if client_id not in transcript_writers:
+        transcript_writers[client_id] = asyncio.create_task(_drain_transcript_buffer(client_id))
 
 
 def _normalize_transcript(transcript: str) -> str:
@@ -76,6 +197,7 @@ def _append_recent_utterance(state: dict, transcript: str):
         history.append(raw_transcript)
         if len(history) > 80:
             del history[:-80]
+        note_utterance(state, raw_transcript)
 
     recent = state.setdefault("recent_utterances", [])
     recent.append(normalized)
@@ -108,7 +230,90 @@ def _remember_document_focus(state: dict, action_response: dict | None):
     state["last_focus_type"] = action_response.get("type")
 
 
-async def _send_action(client_id: str, action_response: dict, preview: bool = False):
+def _action_signature(action_response: dict | None):
+    if not action_response:
+        return None
+    return (
+        action_response.get("intent"),
+        action_response.get("slide"),
+        tuple(action_response.get("bbox") or ()),
+        action_response.get("imageInd", 0),
+        action_response.get("content") if action_response.get("intent") == "web_search" else None,
+    )
+
+
+class ViewerConnection:
+    """The viewer socket and the frame protocol it negotiated: one JSON text frame per message, or batched msgpack."""
+
+    def __init__(self, websocket: WebSocket, protocol: str):
+        self.websocket = websocket
+        self.protocol = protocol
+
+    @property
+    def batches_frames(self) -> bool:
+        return self.protocol == PROTOCOL_MSGPACK
+
+    async def send(self, payload: dict):
+        await self.send_many([payload])
+
+    async def send_many(self, payloads: list[dict]):
+        if self.batches_frames:
+            await self.websocket.send_bytes(encode_msgpack_frame(payloads))
+            return
+        for payload in payloads:
+            await self.websocket.send_text(encode_json(payload))
+
+
+async def _queue_payload(client_id: str, payload: dict):
+    try:
+        await SESSION_STORE.queue_pending(client_id, payload)
+    except Exception as exc:
+        print(f"Dropped action for {client_id}; could not queue it: {exc}")
+
+
+async def _send_payload(client_id: str, payload: dict):
+    target = active_connections.get(client_id)
+    if not target:
+        # The viewer may be connected to another worker; queue only when nobody received it.
+        try:
+            delivered = await SESSION_STORE.publish(client_id, payload)
+        except Exception as exc:
+            print(f"Could not publish action for {client_id}: {exc}")
+            delivered = False
+        if not delivered:
+            await _queue_payload(client_id, payload)
+        return
+
+    try:
+        await target.send(payload)
+    except Exception as exc:
+        print(f"Queued action for {client_id} after websocket send failure: {exc}")
+        await _queue_payload(client_id, payload)
+        if active_connections.get(client_id) is target:
+            active_connections.pop(client_id, None)
+
+
+async def _deliver_published_payload(client_id: str, payload: dict):
+    """Forwards an action published by another worker to the viewer socket held by this one."""
+    target = active_connections.get(client_id)
+    if not target:
+        await _queue_payload(client_id, payload)
+        return
+    try:
+        await target.send(payload)
+    except Exception as exc:
+        print(f"Queued published action for {client_id} after websocket send failure: {exc}")
+        await _queue_payload(client_id, payload)
+
+
+async def _send_action(
+    client_id: str,
+    action_response: dict,
+    preview: bool = False,
+    seq: int | None = None,
+    phase: str = "final",
+    epoch: str | None = None,
+):
     payload = {
         "type": "action",
         "intent": action_response["intent"],
@@ -121,48 +326,338 @@ async def _send_action(client_id: str, action_response: dict, preview: bool = Fa
         "targetType": action_response.get("type", "text"),
         "preview": preview,
     }
+    if seq is not None:
+        # Final actions carry the session's action sequence number and the epoch it counts within. phase is
+        # "provisional" (regex answer sent before the LLM), "correction" or "final".
+        payload["seq"] = seq
+        payload["phase"] = phase
+        payload["epoch"] = epoch
+
+    await _send_payload(client_id, payload)
+
+
+async def _refine_provisional_action(
+    client_id: str,
+    seq: int,
+    transcript: str,
+    regex_decision: dict,
+    provisional_action: dict | None,
+    current_slide: int,
+    user_state: dict,
+    session_vector_db,
+    refine_command_async,
+    retrieve,
+):
+    """Second phase of a two-phase command: confirms, corrects or reverts the provisional regex action."""
+    epoch = user_state.get("action_epoch")
+    started_at = time.perf_counter()
+    try:
+        analysis = await refine_command_async(transcript, regex_decision, current_slide, user_state)
+    except Exception as exc:
+        print(f"LLM refinement #{seq} failed for {client_id}: {exc}")
+        analysis = regex_decision
+
+    if user_state.get("action_seq") != seq:
+        print(f"Dropped LLM refinement #{seq}; a newer command superseded it")
+        return
+
+    _update_doc_focus_score(user_state, analysis.get("refers_to_document", True))
+    if analysis.get("reasoning_source") != "llm":
+        # The LLM fell back to the regex decision that phase one already acted on; retrieving again would
+        # only repeat that answer (or that miss).
+        if provisional_action:
+            await _send_payload(client_id, {"type": "action_confirm", "seq": seq, "epoch": epoch})
+        return
+
+    action_response = None
+    if analysis.get("refers_to_document", True):
+        action_response = await LIVE_EXECUTOR.run(
+            retrieve,
+            transcript,
+            session_vector_db,
+            8,
+            current_slide,
+            user_state,
+            analysis,
+        )
+        if user_state.get("action_seq") != seq:
+            print(f"Dropped LLM refinement #{seq}; a newer command superseded it")
+            return
+
+    refine_ms = (time.perf_counter() - started_at) * 1000
+    if not action_response:
+        if provisional_action:
+            print(f"LLM reverted provisional action #{seq} after {refine_ms:.1f} ms")
+            await _send_payload(client_id, {"type": "action_revert", "seq": seq, "epoch": epoch})
+        return
 
-    target_socket = active_connections.get(client_id)
-    if not target_socket:
-        queued = pending_actions.setdefault(client_id, [])
-        queued.append(payload)
-        del queued[:-8]
+    if _action_signature(action_response) == _action_signature(provisional_action):
+        print(f"LLM confirmed provisional action #{seq} after {refine_ms:.1f} ms")
+        await _send_payload(client_id, {"type": "action_confirm", "seq": seq, "epoch": epoch})
         return
 
+    print(f"LLM {'corrected' if provisional_action else 'resolved'} action #{seq} after {refine_ms:.1f} ms: {action_response}")
+    _remember_document_focus(user_state, action_response)
+    await _send_action(
+        client_id,
+        action_response,
+        preview=False,
+        seq=seq,
+        phase="correction" if provisional_action else "final",
+        epoch=epoch,
+    )
+
+
+async def _refine_and_save(client_id: str, *args):
     try:
-        await target_socket.send_json(payload)
-    except Exception as exc:
-        print(f"Queued action for {client_id} after websocket send failure: {exc}")
-        queued = pending_actions.setdefault(client_id, [])
-        queued.append(payload)
-        del queued[:-8]
-        if active_connections.get(client_id) is target_socket:
-            active_connections.pop(client_id, None)
+        await _refine_provisional_action(client_id, *args)
+    finally:
+        await _push_client_state(client_id)
+
+
+def _start_command_refinement(*args) -> asyncio.Task:
+    task = asyncio.create_task(_refine_and_save(*args))
+    command_refinement_tasks.add(task)
+    task.add_done_callback(command_refinement_tasks.discard)
+    return task
 
 
 async def _flush_pending_actions(client_id: str):
-    target_socket = active_connections.get(client_id)
-    queued = pending_actions.get(client_id) or []
-    if not target_socket or not queued:
+    target = active_connections.get(client_id)
+    if not target:
+        return
+
+    try:
+        queued = await SESSION_STORE.take_pending(client_id)
+    except Exception as exc:
+        print(f"Could not read pending actions for {client_id}: {exc}")
+        return
+    if not queued:
         return
 
-    while queued:
-        payload = queued.pop(0)
+    # A msgpack viewer gets the whole backlog in one frame; JSON viewers still get one frame per action.
+    batches = [queued] if target.batches_frames else [[payload] for payload in queued]
+    for index, batch in enumerate(batches):
         try:
-            await target_socket.send_json(payload)
+            await target.send_many(batch)
         except Exception as exc:
             print(f"Stopped pending action flush for {client_id}: {exc}")
-            queued.insert(0, payload)
-            if active_connections.get(client_id) is target_socket:
+            for unsent in [payload for remaining in batches[index:] for payload in remaining]:
+                await _queue_payload(client_id, unsent)
+            if active_connections.get(client_id) is target:
                 active_connections.pop(client_id, None)
             break
 
-    if not queued:
-        pending_actions.pop(client_id, None)
+
+class SessionPipeline:
+    """
+    Handles STT results for one session off the response loop, so a slow retrieval never stalls reading the stream.
+
+    Finals go through a bounded queue and run strictly in order on one worker task; when the queue is
+    full the oldest waiting final is dropped. Interim previews are latest-wins: a newer interim or any
+    final cancels the preview still in flight.
+    """
+
+    def __init__(
+        self,
+        client_id: str,
+        session_vector_db,
+        plan_command,
+        refine_command_async,
+        preview_highlight,
+        retrieve,
+    ):
+        self.client_id = client_id
+        self.session_vector_db = session_vector_db
+        self.plan_command = plan_command
+        self.refine_command_async = refine_command_async
+        self.preview_highlight = preview_highlight
+        self.retrieve = retrieve
+        self.finals: asyncio.Queue = asyncio.Queue(maxsize=STT_FINAL_QUEUE_SIZE)
+        self.final_worker: asyncio.Task | None = None
+        self.interim_task: asyncio.Task | None = None
+
+    def submit_final(self, transcript: str):
+        if not self.session_vector_db:
+            return
+
+        self._cancel_interim()
+        if self.finals.full():
+            dropped, _ = self.finals.get_nowait()
+            self.finals.task_done()
+            pipeline_counters["finals_dropped"] += 1
+            print(f"Dropped queued final for {self.client_id}; pipeline is {STT_FINAL_QUEUE_SIZE} commands behind: {dropped}")
+
+        self.finals.put_nowait((transcript, time.perf_counter()))
+        pipeline_counters["finals_queued"] += 1
+        pipeline_counters["max_final_queue_depth"] = max(pipeline_counters["max_final_queue_depth"], self.finals.qsize())
+        if self.final_worker is None or self.final_worker.done():
+            self.final_worker = asyncio.create_task(self._run_finals())
+
+    def submit_interim(self, transcript: str):
+        if not self.session_vector_db:
+            return
+
+        # The preview throttle only reads process-local fields, so it can gate before anything is cancelled.
+        user_state = client_states.setdefault(self.client_id, _new_client_state())
+        if not _should_process_interim_preview(user_state, transcript):
+            pipeline_counters["interims_throttled"] += 1
+            return
+
+        self._cancel_interim()
+        self.interim_task = asyncio.create_task(self._handle_interim(transcript))
+        pipeline_counters["interims_started"] += 1
+
+    def _cancel_interim(self):
+        if self.interim_task is not None and not self.interim_task.done():
+            # A preview already running in the thread pool finishes there, but its result is never sent.
+            self.interim_task.cancel()
+            pipeline_counters["interims_cancelled"] += 1
+        self.interim_task = None
+
+    async def _run_finals(self):
+        while True:
+            transcript, queued_at = await self.finals.get()
+            try:
+                if transcript is None:
+                    return
+                final_queue_wait_ms.append((time.perf_counter() - queued_at) * 1000)
+                await self._handle_final(transcript)
+                pipeline_counters["finals_processed"] += 1
+            except Exception as exc:
+                pipeline_counters["final_failures"] += 1
+                print(f"Final command failed for {self.client_id}: {exc}")
+            finally:
+                self.finals.task_done()
+
+    async def close(self):
+        """Cancels the pending preview and lets queued finals finish, up to STT_PIPELINE_DRAIN_SECONDS."""
+        self._cancel_interim()
+        if self.final_worker is None or self.final_worker.done():
+            return
+
+        await self.finals.put((None, time.perf_counter()))
+        try:
+            await asyncio.wait_for(asyncio.shield(self.final_worker), timeout=STT_PIPELINE_DRAIN_SECONDS)
+        except asyncio.TimeoutError:
+            print(f"Abandoned {self.finals.qsize()} queued finals for {self.client_id} after {STT_PIPELINE_DRAIN_SECONDS:.0f} s")
+            self.final_worker.cancel()
+
+    async def _handle_final(self, transcript: str):
+        client_id = self.client_id
+        # The viewer (and its active page) may live on another worker.
+        user_state = await _pull_client_state(client_id)
+        current_slide = user_state.get("active_page", 1)
+        _append_recent_utterance(user_state, transcript)
+        user_state["last_preview_transcript"] = ""
+        user_state["last_preview_signature"] = None
+        user_state["last_preview_at"] = 0.0
+
+        # Off the loop: the classifier fallback does sparse matrix work (and a joblib load on first use).
+        analysis, needs_llm = await LIVE_EXECUTOR.run(self.plan_command, transcript, user_state, False)
+        if not user_state.get("action_epoch"):
+            # A new counter gets a new epoch, so the viewer resets its seq instead of dropping the restarted numbers.
+            user_state["action_epoch"] = uuid.uuid4().hex[:12]
+            user_state["action_seq"] = 0
+        # Every final takes the next sequence number, so a direct command also supersedes a pending refinement.
+        seq = int(user_state.get("action_seq", 0)) + 1
+        user_state["action_seq"] = seq
+        if not needs_llm:
+            _update_doc_focus_score(user_state, analysis.get("refers_to_document", True))
+
+        action_response = None
+        if analysis.get("refers_to_document", True):
+            started_at = time.perf_counter()
+            action_response = await LIVE_EXECUTOR.run(
+                self.retrieve,
+                transcript,
+                self.session_vector_db,
+                8,
+                current_slide,
+                user_state,
+                analysis,
+            )
+            retrieval_ms = (time.perf_counter() - started_at) * 1000
+            print(f"Retrieval completed in {retrieval_ms:.1f} ms")
+        else:
+            print("Ignored non-document utterance")
+
+        if action_response:
+            print(f"{'Provisional action' if needs_llm else 'Action'}: {action_response}")
+            _remember_document_focus(user_state, action_response)
+            await _send_action(
+                client_id,
+                action_response,
+                preview=False,
+                seq=seq,
+                phase="provisional" if needs_llm else "final",
+                epoch=user_state["action_epoch"],
+            )
+
+        await _push_client_state(client_id)
+        if needs_llm:
+            # The regex decision was acted on right away; the LLM confirms or corrects it afterwards.
+            _start_command_refinement(
+                client_id,
+                seq,
+                transcript,
+                analysis,
+                action_response,
+                current_slide,
+                user_state,
+                self.session_vector_db,
+                self.refine_command_async,
+                self.retrieve,
+            )
+
+    async def _handle_interim(self, transcript: str):
+        client_id = self.client_id
+        user_state = await _pull_client_state(client_id)
+        current_slide = user_state.get("active_page", 1)
+        preview_started_at = time.perf_counter()
+        preview_response = await LIVE_EXECUTOR.run(
+            self.preview_highlight,
+            transcript,
+            self.session_vector_db,
+            2,
+            current_slide,
+            user_state,
+        )
+        preview_ms = (time.perf_counter() - preview_started_at) * 1000
+        print(f"Preview retrieval completed in {preview_ms:.1f} ms")
+
+        if not preview_response:
+            return
+
+        preview_signature = (
+            f"{preview_response['slide']}|"
+            f"{preview_response['bbox']}|"
+            f"{preview_response.get('title', '')}"
+        )
+        if preview_signature == user_state.get("last_preview_signature"):
+            return
+
+        user_state["last_preview_signature"] = preview_signature
+        print(f"Preview action: {preview_response}")
+        _remember_document_focus(user_state, preview_response)
+        await _send_action(client_id, preview_response, preview=True)
+        await _push_client_state(client_id)
+
+
+def _pipeline_metrics() -> dict:
+    waits = sorted(final_queue_wait_ms)
+    return {
+        **pipeline_counters,
+        "final_queue_wait_p50_ms": round(waits[len(waits) // 2], 3) if waits else None,
+        "final_queue_wait_p95_ms": round(waits[int(len(waits) * 0.95)], 3) if waits else None,
+    }
+
+
+register_metrics_source("stt_pipeline", _pipeline_metrics)
 
 
 @websocket_router.websocket("/ws/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str, token: str = None):
+async def websocket_endpoint(websocket: WebSocket, client_id: str, token: str = None, protocol: str = None):
     if not token:
         await websocket.close(code=4008)
         return
@@ -180,25 +675,24 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str, token: str =
         return
 
     await websocket.accept()
-    active_connections[client_id] = websocket
+    connection = ViewerConnection(websocket, negotiate_protocol(protocol))
+    active_connections[client_id] = connection
     existing_state = client_states.get(client_id, {})
-    client_states[client_id] = {
-        "active_page": 1,
-        "last_preview_transcript": "",
-        "last_preview_signature": None,
-        "last_preview_at": 0.0,
-        "recent_utterances": [],
-        "transcript_history": [],
-        "doc_focus_score": 0,
-        "viewer_mode": "document",
-        "last_focus_text": "",
-        "last_focus_title": "",
-        "last_focus_slide": 1,
-        "last_focus_type": "text",
-        **existing_state,
-    }
+    client_states[client_id] = {**_new_client_state(), **existing_state}
+    await _pull_client_state(client_id)
+    await _push_client_state(client_id)
+
+    async def _deliver(payload: dict):
+        await _deliver_published_payload(client_id, payload)
+
+    try:
+        await SESSION_STORE.subscribe(client_id, _deliver)
+    except Exception as exc:
+        print(f"Actions from other workers will be queued for {client_id}: {exc}")
 
-    print(f"Client '{client_id}' connected. Total: {len(active_connections)}")
+    print(f"Client '{client_id}' connected ({connection.protocol}). Total: {len(active_connections)}")
+    # Pay the index load while the presenter is still setting up, before the STT socket opens.
+    _prefetch_document_index(_doc_id_from_client_id(client_id))
     await _flush_pending_actions(client_id)
 
     try:
@@ -213,214 +707,93 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str, token: str =
                 message = json.loads(data)
                 if message.get("type") == "state_update":
                     new_page = message.get("activePage", 1)
-                    state = client_states.setdefault(
-                        client_id,
-                        {
-                            "active_page": 1,
-                            "last_preview_transcript": "",
-                            "last_preview_signature": None,
-                            "last_preview_at": 0.0,
-                            "recent_utterances": [],
-                            "transcript_history": [],
-                            "doc_focus_score": 0,
-                            "viewer_mode": "document",
-                            "last_focus_text": "",
-                            "last_focus_title": "",
-                            "last_focus_slide": 1,
-                            "last_focus_type": "text",
-                        },
-                    )
+                    state = client_states.setdefault(client_id, _new_client_state())
                     state["active_page"] = new_page
                     state["viewer_mode"] = str(message.get("viewerMode", state.get("viewer_mode", "document")) or "document")
                     state["last_preview_transcript"] = ""
                     state["last_preview_signature"] = None
                     state["last_preview_at"] = 0.0
                     print(f"Client {client_id} moved to slide {new_page}")
+                    _record_transcript_event(
+                        client_id,
+                        {"type": "page", "page": new_page, "viewerMode": state["viewer_mode"]},
+                    )
+                    await _push_client_state(client_id)
                     continue
             except json.JSONDecodeError:
                 pass
 
     except WebSocketDisconnect:
-        if active_connections.get(client_id) is websocket:
+        if active_connections.get(client_id) is connection:
             active_connections.pop(client_id, None)
+            try:
+                await SESSION_STORE.unsubscribe(client_id)
+            except Exception as exc:
+                print(f"Could not unsubscribe {client_id} from actions: {exc}")
         print(f"Client '{client_id}' disconnected")
 
 
 @websocket_router.websocket("/ws/stt/{client_id}")
-async def stt_endpoint(websocket: WebSocket, client_id: str):
+async def stt_endpoint(websocket: WebSocket, client_id: str, sample_rate: int | None = None):
     await websocket.accept()
-    print(f"STT audio stream connected for {client_id}")
+    audio = AudioPipeline(resolve_client_sample_rate(sample_rate))
+    print(
+        f"STT audio stream connected for {client_id} "
+        f"({audio.client_sample_rate} Hz in, {audio.output_sample_rate} Hz to recognizer)"
+    )
 
-    parts = client_id.split("_")
-    doc_id = parts[-1] if len(parts) > 1 else client_id
+    doc_id = _doc_id_from_client_id(client_id)
 
-    analyze_query, load_vector_db, preview_highlight, retrieve = _load_retrieval_tools()
-    (
-        SpeechAsyncClient,
-        RecognitionConfig,
-        StreamingRecognitionConfig,
-        StreamingRecognizeRequest,
-    ) = _load_speech_types()
+    plan_command, refine_command_async, preview_highlight, retrieve = _load_retrieval_tools()
+    backend = create_speech_backend()
 
     try:
-        session_vector_db = load_vector_db(doc_id)
+        session_vector_db = await asyncio.shield(_prefetch_document_index(doc_id))
         print(f"Successfully loaded vector DB for: {doc_id}")
     except Exception as exc:
         print(f"Warning: could not load vector DB: {exc}")
         session_vector_db = None
 
-    client = SpeechAsyncClient()
-    config = RecognitionConfig(
-        encoding=RecognitionConfig.AudioEncoding.LINEAR16,
-        sample_rate_hertz=48000,
-        language_code="en-US",
-        enable_automatic_punctuation=True,
-    )
-    streaming_config = StreamingRecognitionConfig(
-        config=config,
-        interim_results=True,
+    start_rolling_summary(client_id, doc_id)
+    pipeline = SessionPipeline(
+        client_id,
+        session_vector_db,
+        plan_command,
+        refine_command_async,
+        preview_highlight,
+        retrieve,
     )
 
-    async def audio_generator():
-        yield StreamingRecognizeRequest(streaming_config=streaming_config)
+    async def audio_chunks():
         try:
             while True:
                 data = await websocket.receive_bytes()
-                yield StreamingRecognizeRequest(audio_content=data)
+                for frame in audio.process(data):
+                    yield frame
         except WebSocketDisconnect:
             pass
+        for frame in audio.flush():
+            yield frame
 
     try:
-        requests = audio_generator()
-        responses = await client.streaming_recognize(requests=requests)
-
-        async for response in responses:
-            if not response.results:
-                continue
-
-            result = response.results[0]
-            if not result.alternatives:
-                continue
-
-            transcript = result.alternatives[0].transcript
+        async for result in backend.stream(audio_chunks(), audio.output_sample_rate):
+            transcript = result.transcript
 
             if result.is_final:
                 print(f"[FINAL] {transcript}")
-
-                if not session_vector_db:
-                    continue
-
-                user_state = client_states.setdefault(
-                    client_id,
-                    {
-                        "active_page": 1,
-                        "last_preview_transcript": "",
-                        "last_preview_signature": None,
-                        "last_preview_at": 0.0,
-                        "recent_utterances": [],
-                        "transcript_history": [],
-                        "doc_focus_score": 0,
-                        "viewer_mode": "document",
-                        "last_focus_text": "",
-                        "last_focus_title": "",
-                        "last_focus_slide": 1,
-                        "last_focus_type": "text",
-                    },
-                )
-                current_slide = user_state.get("active_page", 1)
-                _append_recent_utterance(user_state, transcript)
-                user_state["last_preview_transcript"] = ""
-                user_state["last_preview_signature"] = None
-                user_state["last_preview_at"] = 0.0
-
-                analysis = await asyncio.to_thread(
-                    analyze_query,
-                    transcript,
-                    current_slide,
-                    user_state,
-                    False,
-                )
-                _update_doc_focus_score(user_state, analysis.get("refers_to_document", True))
-                if not analysis.get("refers_to_document", True):
-                    print("Ignored non-document utterance")
-                    continue
-
-                started_at = time.perf_counter()
-                action_response = await asyncio.to_thread(
-                    retrieve,
-                    transcript,
-                    session_vector_db,
-                    8,
-                    current_slide,
-                    user_state,
-                    analysis,
-                )
-                retrieval_ms = (time.perf_counter() - started_at) * 1000
-                print(f"Retrieval completed in {retrieval_ms:.1f} ms")
-
-                if action_response:
-                    print(f"Action: {action_response}")
-                    _remember_document_focus(user_state, action_response)
-                    await _send_action(client_id, action_response, preview=False)
+                _record_transcript_event(client_id, {"type": "final", "text": transcript})
+                pipeline.submit_final(transcript)
             else:
                 print(f"[INTERIM] {transcript}")
-
-                if not session_vector_db:
-                    continue
-
-                user_state = client_states.setdefault(
-                    client_id,
-                    {
-                        "active_page": 1,
-                        "last_preview_transcript": "",
-                        "last_preview_signature": None,
-                        "last_preview_at": 0.0,
-                        "recent_utterances": [],
-                        "transcript_history": [],
-                        "doc_focus_score": 0,
-                        "viewer_mode": "document",
-                        "last_focus_text": "",
-                        "last_focus_title": "",
-                        "last_focus_slide": 1,
-                        "last_focus_type": "text",
-                    },
-                )
-                if not _should_process_interim_preview(user_state, transcript):
-                    continue
-
-                current_slide = user_state.get("active_page", 1)
-                preview_started_at = time.perf_counter()
-                preview_response = await asyncio.to_thread(
-                    preview_highlight,
-                    transcript,
-                    session_vector_db,
-                    2,
-                    current_slide,
-                    user_state,
-                )
-                preview_ms = (time.perf_counter() - preview_started_at) * 1000
-                print(f"Preview retrieval completed in {preview_ms:.1f} ms")
-
-                if not preview_response:
-                    continue
-
-                preview_signature = (
-                    f"{preview_response['slide']}|"
-                    f"{preview_response['bbox']}|"
-                    f"{preview_response.get('title', '')}"
-                )
-                if preview_signature == user_state.get("last_preview_signature"):
-                    continue
-
-                user_state["last_preview_signature"] = preview_signature
-                print(f"Preview action: {preview_response}")
-                _remember_document_focus(user_state, preview_response)
-                await _send_action(client_id, preview_response, preview=True)
+                _record_transcript_event(client_id, {"type": "interim", "text": transcript})
+                pipeline.submit_interim(transcript)
 
     except Exception as exc:
         print(f"\nSTT error for {client_id}: {exc}")
     finally:
-        print(f"\nSTT audio stream closed for {client_id}")
+        print(f"\nSTT audio stream closed for {client_id}: {audio.close()}")
+        await pipeline.close()
+        stop_rolling_summary(client_id, doc_id)
         try:
             if websocket.client_state.name != "DISCONNECTED":
                 await websocket.close()
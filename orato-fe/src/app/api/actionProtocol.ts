@@ -0,0 +1,90 @@
+// Decoder for the compact msgpack frames the backend sends on /ws/{clientId}?protocol=msgpack.
+// Each binary frame is an array of actions with short keys; text frames are still plain JSON.
+
+const EXPANDED_KEYS: Record<string, string> = {
+  t: "type",
+  i: "intent",
+  s: "slide",
+  b: "bbox",
+  c: "section",
+  h: "title",
+  x: "imageInd",
+  n: "content",
+  y: "targetType",
+  p: "preview",
+  q: "seq",
+  f: "phase",
+  e: "epoch",
+};
+
+export const ACTION_PROTOCOL: string = (import.meta as any).env.VITE_WS_PROTOCOL === "msgpack" ? "msgpack" : "json";
+
+const textDecoder = new TextDecoder();
+
+// Covers the subset of msgpack produced for action payloads: maps, arrays, strings, numbers, booleans and nil.
+const decodeValue = (view: DataView, bytes: Uint8Array, state: { offset: number }): any => {
+  const type = view.getUint8(state.offset++);
+
+  const readString = (length: number) => {
+    const value = textDecoder.decode(bytes.subarray(state.offset, state.offset + length));
+    state.offset += length;
+    return value;
+  };
+  const readArray = (length: number) => {
+    const items = [];
+    for (let index = 0; index < length; index++) items.push(decodeValue(view, bytes, state));
+    return items;
+  };
+  const readMap = (length: number) => {
+    const map: Record<string, any> = {};
+    for (let index = 0; index < length; index++) {
+      const key = decodeValue(view, bytes, state);
+      map[key] = decodeValue(view, bytes, state);
+    }
+    return map;
+  };
+  const read = (size: number, getter: (offset: number) => number) => {
+    const value = getter(state.offset);
+    state.offset += size;
+    return value;
+  };
+
+  if (type <= 0x7f) return type;
+  if (type >= 0xe0) return type - 0x100;
+  if ((type & 0xf0) === 0x80) return readMap(type & 0x0f);
+  if ((type & 0xf0) === 0x90) return readArray(type & 0x0f);
+  if ((type & 0xe0) === 0xa0) return readString(type & 0x1f);
+
+  switch (type) {
+    case 0xc0: return null;
+    case 0xc2: return false;
+    case 0xc3: return true;
+    case 0xca: return read(4, (offset) => view.getFloat32(offset));
+    case 0xcb: return read(8, (offset) => view.getFloat64(offset));
+    case 0xcc: return read(1, (offset) => view.getUint8(offset));
+    case 0xcd: return read(2, (offset) => view.getUint16(offset));
+    case 0xce: return read(4, (offset) => view.getUint32(offset));
+    case 0xcf: return read(8, (offset) => Number(view.getBigUint64(offset)));
+    case 0xd0: return read(1, (offset) => view.getInt8(offset));
+    case 0xd1: return read(2, (offset) => view.getInt16(offset));
+    case 0xd2: return read(4, (offset) => view.getInt32(offset));
+    case 0xd3: return read(8, (offset) => Number(view.getBigInt64(offset)));
+    case 0xd9: return readString(read(1, (offset) => view.getUint8(offset)));
+    case 0xda: return readString(read(2, (offset) => view.getUint16(offset)));
+    case 0xdb: return readString(read(4, (offset) => view.getUint32(offset)));
+    case 0xdc: return readArray(read(2, (offset) => view.getUint16(offset)));
+    case 0xdd: return readArray(read(4, (offset) => view.getUint32(offset)));
+    case 0xde: return readMap(read(2, (offset) => view.getUint16(offset)));
+    case 0xdf: return readMap(read(4, (offset) => view.getUint32(offset)));
+  }
+  throw new Error(`Unsupported msgpack type 0x${type.toString(16)}`);
+};
+
+export const decodeActionFrame = (data: ArrayBuffer): any[] => {
+  const bytes = new Uint8Array(data);
+  const decoded = decodeValue(new DataView(data), bytes, { offset: 0 });
+  const messages = Array.isArray(decoded) ? decoded : [decoded];
+  return messages.map((message) =>
+    Object.fromEntries(Object.entries(message).map(([key, value]) => [EXPANDED_KEYS[key] ?? key, value]))
+  );
+};
@@ -6,6 +6,7 @@ import { motion, AnimatePresence } from "framer-motion";
 import { Document, Page, pdfjs } from "react-pdf";
 import useAuthStore from "../store/authStore";
 import api from "../api/api";
+import { ACTION_PROTOCOL, decodeActionFrame } from "../api/actionProtocol";
 
 pdfjs.GlobalWorkerOptions.workerSrc = `//unpkg.com/pdfjs-dist@${pdfjs.version}/build/pdf.worker.min.mjs`;
 
@@ -70,6 +71,17 @@ type BboxOverlay = {
   preview?: boolean;
 };
 
+// What a provisional action may change, so an LLM revert can put the viewer back exactly as it was.
+type ViewerSnapshot = {
+  page: number;
+  viewerMode: "document" | "search";
+  zoomLevel: number;
+  modalImage: string | null;
+  bboxes: Record<number, BboxOverlay[]>;
+  activeBboxes: Record<number, number[][]>;
+  stickyIntent: string | null;
+};
+
 type WebSearchResult = {
   title: string;
   url: string;
@@ -188,10 +200,27 @@ export function Presentation() {
   const stickyIntentRef = useRef<string | null>(null);
   const activeBboxesRef = useRef<Record<number, number[][]>>({});
   const previewBboxesRef = useRef<Record<number, number[] | null>>({});
+  // Two-phase commands: the backend sends a provisional action first and an LLM confirm/correct/revert later.
+  // seq only orders actions within one epoch; the backend starts a new epoch whenever its counter restarts.
+  const latestActionEpochRef = useRef<string | null>(null);
+  const latestActionSeqRef = useRef(0);
+  const provisionalActionsRef = useRef<Record<number, { intent: string; slide?: number; bbox?: number[]; targetType: string; before: ViewerSnapshot }>>({});
+  const zoomLevelRef = useRef(zoomLevel);
+  const modalImageRef = useRef<string | null>(modalImage);
+  const bboxesRef = useRef<Record<number, BboxOverlay[]>>(bboxes);
   const viewerModeRef = useRef<"document" | "search">(viewerMode);
   const webSearchStateRef = useRef<WebSearchState | null>(webSearchState);
 
   useEffect(() => { activePageRef.current = activePage; }, [activePage]);
+  useEffect(() => { zoomLevelRef.current = zoomLevel; }, [zoomLevel]);
+  useEffect(() => { modalImageRef.current = modalImage; }, [modalImage]);
+  useEffect(() => { bboxesRef.current = bboxes; }, [bboxes]);
+
+  const resetActionSequence = (epoch: string | null = null) => {
+    latestActionEpochRef.current = epoch;
+    latestActionSeqRef.current = 0;
+    provisionalActionsRef.current = {};
+  };
   useEffect(() => { viewerModeRef.current = viewerMode; }, [viewerMode]);
   useEffect(() => { webSearchStateRef.current = webSearchState; }, [webSearchState]);
 
@@ -633,6 +662,37 @@ export function Presentation() {
     setTranscript("Cleared all effects");
   }, []);
 
+  const handleClearPreviews = useCallback(() => {
+    previewBboxesRef.current = {};
+    setBboxes(prev => Object.fromEntries(
+      Object.entries(prev).map(([slide, boxes]) => [slide, boxes.filter((box) => !box.preview)])
+    ));
+  }, []);
+
+  const captureViewerSnapshot = (): ViewerSnapshot => ({
+    page: activePageRef.current,
+    viewerMode: viewerModeRef.current,
+    zoomLevel: zoomLevelRef.current,
+    modalImage: modalImageRef.current,
+    // Previews are dropped on revert anyway; only committed overlays are restored.
+    bboxes: Object.fromEntries(
+      Object.entries(bboxesRef.current).map(([slide, boxes]) => [slide, boxes.filter((box) => !box.preview)])
+    ),
+    activeBboxes: { ...activeBboxesRef.current },
+    stickyIntent: stickyIntentRef.current,
+  });
+
+  const handleRestoreViewer = useCallback((snapshot: ViewerSnapshot) => {
+    previewBboxesRef.current = {};
+    activeBboxesRef.current = snapshot.activeBboxes;
+    stickyIntentRef.current = snapshot.stickyIntent;
+    setBboxes(snapshot.bboxes);
+    setViewerMode(snapshot.viewerMode);
+    setModalImage(snapshot.modalImage);
+    setZoomLevel(snapshot.zoomLevel);
+    if (snapshot.page !== activePageRef.current) handleNavigate(snapshot.page);
+  }, [handleNavigate]);
+
   const wsHandlersRef = useRef({
     navigate: handleNavigate, highlight: handleHighlight, zoom: handleZoom,
     inspect: handleInspect,
@@ -648,6 +708,8 @@ export function Presentation() {
     openSearchResult: handleOpenSelectedSearchResult,
     searchResultStep: handleSearchResultStep,
     clear: handleClear,
+    clearPreviews: handleClearPreviews,
+    restoreViewer: handleRestoreViewer,
     transcriptUpdater: setTranscript
   });
 
@@ -667,9 +729,11 @@ export function Presentation() {
       openSearchResult: handleOpenSelectedSearchResult,
       searchResultStep: handleSearchResultStep,
       clear: handleClear,
+      clearPreviews: handleClearPreviews,
+      restoreViewer: handleRestoreViewer,
       transcriptUpdater: setTranscript
     };
-  }, [handleNavigate, handleHighlight, handleZoom, handleInspect, handleWebSearch, handleOpenSelectedSearchResult, handleSearchResultStep, handleClear]);
+  }, [handleNavigate, handleHighlight, handleZoom, handleInspect, handleWebSearch, handleOpenSelectedSearchResult, handleSearchResultStep, handleClear, handleClearPreviews, handleRestoreViewer]);
 
   // =====================================================================
   // WEBSOCKET 1: MAIN CONTROL 
@@ -701,7 +765,9 @@ export function Presentation() {
     const connectControlSocket = () => {
       if (disposed) return;
 
-      const ws = new WebSocket(`${wsBase}/ws/${cId}?token=${token}`);
+      const protocolParam = ACTION_PROTOCOL === "msgpack" ? "&protocol=msgpack" : "";
+      const ws = new WebSocket(`${wsBase}/ws/${cId}?token=${token}${protocolParam}`);
+      ws.binaryType = "arraybuffer";
       wsRef.current = ws;
 
       ws.onopen = () => {
@@ -711,6 +777,8 @@ export function Presentation() {
         }
         clearReconnectTimer();
         wsReconnectAttemptsRef.current = 0;
+        // The reconnect may land on a restarted or different backend instance with its own action counter.
+        resetActionSequence();
         setIsConnected(true);
         ws.send(JSON.stringify({ type: "state_update", activePage: activePageRef.current, viewerMode: viewerModeRef.current }));
       };
@@ -734,10 +802,26 @@ export function Presentation() {
         } catch (_err) {}
       };
 
-      ws.onmessage = (event) => {
+      const handleMessage = (msg: any) => {
         try {
-          const msg = JSON.parse(event.data);
           const handlers = wsHandlersRef.current;
+
+          if (msg.type === "action_confirm" || msg.type === "action_revert") {
+            if ((msg.epoch ?? null) !== latestActionEpochRef.current) return;
+            const provisional = provisionalActionsRef.current[msg.seq];
+            delete provisionalActionsRef.current[msg.seq];
+            if (!provisional || msg.seq !== latestActionSeqRef.current) return;
+
+            if (msg.type === "action_confirm") {
+              if (provisional.intent === "highlight" && provisional.slide && provisional.bbox) {
+                handlers.highlight(provisional.slide, provisional.bbox, provisional.targetType, { navigate: false });
+              }
+            } else {
+              // Undo whatever the provisional action did: page, zoom, inspect modal, search mode and overlays.
+              handlers.restoreViewer(provisional.before);
+            }
+            return;
+          }
           
           const rawIntent = (msg.intent || msg.Intent || "").toLowerCase();
           let resolvedIntent = rawIntent;
@@ -745,7 +829,24 @@ export function Presentation() {
           const slide = msg.slide || msg.Slide;
           const bbox = msg.bbox || msg.BBOX;
           const targetType = (msg.targetType || msg.target_type || msg.contentType || msg.content_type || "text").toLowerCase();
-          const isPreview = Boolean(msg.preview ?? msg.isPreview ?? msg.Preview);
+          const phase = msg.phase as string | undefined;
+          if (typeof msg.seq === "number") {
+            // Every final action carries (epoch, seq): drop corrections that arrive after a newer command was applied.
+            if ((msg.epoch ?? null) !== latestActionEpochRef.current) resetActionSequence(msg.epoch ?? null);
+            if (msg.seq < latestActionSeqRef.current) return;
+            latestActionSeqRef.current = msg.seq;
+            if (phase === "provisional") {
+              provisionalActionsRef.current[msg.seq] = { intent: rawIntent, slide, bbox, targetType, before: captureViewerSnapshot() };
+            } else {
+              if (phase === "correction") handlers.clearPreviews();
+              delete provisionalActionsRef.current[msg.seq];
+            }
+          } else if (!msg.preview && !msg.isPreview) {
+            // A final action without a seq (older backend) still supersedes any pending provisional action.
+            provisionalActionsRef.current = {};
+          }
+          // Provisional highlights render in the lighter preview style until the LLM confirms them.
+          const isPreview = Boolean(msg.preview ?? msg.isPreview ?? msg.Preview) || (phase === "provisional" && rawIntent === "highlight");
           const imageInd = msg.imageind ?? msg.imageInd ?? msg.ImageInd ?? msg.imageIndex ?? msg.ImageIndex; 
           const textData = msg.content || msg.Content || msg.text || msg.Text;
 
@@ -793,6 +894,14 @@ export function Presentation() {
           }
         } catch (_err) {}
       };
+
+      ws.onmessage = (event) => {
+        try {
+          // msgpack viewers get binary frames that may batch several actions; JSON stays one action per frame.
+          const messages = event.data instanceof ArrayBuffer ? decodeActionFrame(event.data) : [JSON.parse(event.data)];
+          messages.forEach(handleMessage);
+        } catch (_err) {}
+      };
     };
 
     connectControlSocket();
@@ -823,7 +932,9 @@ export function Presentation() {
           ? apiBase.replace(/^https:\/\//, "wss://")
           : apiBase.replace(/^http:\/\//, "ws://");
         
-        sttWs = new WebSocket(`${wsBase}/ws/stt/${clientId}`);
+        // 16000 lets the browser resample the mic itself; the backend downsamples anything higher.
+        const sttSampleRate = Number((import.meta as any).env.VITE_STT_SAMPLE_RATE) || 48000;
+        sttWs = new WebSocket(`${wsBase}/ws/stt/${clientId}?sample_rate=${sttSampleRate}`);
         sttWsRef.current = sttWs;
 
         sttWs.onopen = async () => {
@@ -832,7 +943,7 @@ export function Presentation() {
           streamRef.current = stream;
 
           const AudioContextClass = window.AudioContext || (window as any).webkitAudioContext;
-          const audioContext = new AudioContextClass({ sampleRate: 48000 });
+          const audioContext = new AudioContextClass({ sampleRate: sttSampleRate });
           audioContextRef.current = audioContext;
 
           const source = audioContext.createMediaStreamSource(stream);